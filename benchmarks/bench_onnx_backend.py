@@ -0,0 +1,116 @@
+"""
+Сравнение скорости генерации LanguageModel (PyTorch) и OnnxLanguageModel (ONNX Runtime) на CPU.
+
+Пример запуска:
+    python benchmarks/bench_onnx_backend.py --model-path models/vikhr-gemma-2b-instruct --threads 8
+Без --model-path используется крошечная случайно инициализированная модель.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from free_vigilance_reduction.entity_recognition.language_model import LanguageModel
+from free_vigilance_reduction.entity_recognition.onnx_language_model import OnnxLanguageModel
+
+
+PROMPTS = [
+    "Пациент: Иванов Иван Иванович, дата рождения 01.01.1980",
+    "Адрес: г. Москва, ул. Пушкина, д. 10, кв. 5. Телефон: +7 (123) 456-78-90",
+    "Договор заключен между ООО Ромашка и Петровым Петром Петровичем",
+]
+
+
+def build_tiny_model(path):
+    """Создание крошечной генеративной модели со случайными весами."""
+    import torch
+    import transformers
+
+    cyrillic = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+    letters = cyrillic + cyrillic.upper() + "0123456789"
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list(letters + ".,:-[]()+") + ["##" + c for c in letters]
+    tokenizer = transformers.BertTokenizer(vocab={token: i for i, token in enumerate(vocab)}, do_lower_case=False)
+    tokenizer.save_pretrained(path)
+
+    config = transformers.LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=256, intermediate_size=688,
+        num_hidden_layers=4, num_attention_heads=8, num_key_value_heads=4,
+        eos_token_id=tokenizer.sep_token_id, pad_token_id=tokenizer.pad_token_id
+    )
+    torch.manual_seed(0)
+    transformers.LlamaForCausalLM(config).save_pretrained(path)
+    return path
+
+
+def measure(model, prompts, repeats):
+    """Замер времени генерации для набора промптов."""
+    model._generate_response(prompts[0])  # прогрев
+    latencies = []
+    for _ in range(repeats):
+        for prompt in prompts:
+            started = time.perf_counter()
+            model._generate_response(prompt)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "mean_s": sum(latencies) / len(latencies),
+        "p50_s": latencies[len(latencies) // 2],
+        "max_s": latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", help="Путь к модели. По умолчанию - крошечная случайная модель.")
+    parser.add_argument("--cache-dir", help="Каталог для ONNX-графа.")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="intra_op_num_threads для ONNX Runtime.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Файл для JSON-результатов.")
+    args = parser.parse_args()
+
+    import torch
+
+    workdir = tempfile.mkdtemp(prefix="fvr-bench-")
+    model_path = args.model_path or build_tiny_model(workdir)
+    cache_dir = args.cache_dir or os.path.join(workdir, "onnx")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # Жадная генерация фиксированной длины, чтобы обе реализации делали одинаковую работу
+    generation_kwargs = {"do_sample": False, "max_new_tokens": args.max_new_tokens}
+
+    torch_model = LanguageModel(model_path, generation_kwargs=generation_kwargs)
+    started = time.perf_counter()
+    onnx_model = OnnxLanguageModel(model_path, generation_kwargs=generation_kwargs,
+                                   cache_dir=cache_dir, intra_op_num_threads=args.threads)
+    onnx_load_s = time.perf_counter() - started
+
+    results = {
+        "model_path": model_path,
+        "max_new_tokens": args.max_new_tokens,
+        "threads": args.threads,
+        "onnx_load_s": onnx_load_s,
+        "torch": measure(torch_model, PROMPTS, args.repeats),
+        "onnx": measure(onnx_model, PROMPTS, args.repeats),
+        "outputs_match": all(
+            torch_model._generate_response(p) == onnx_model._generate_response(p) for p in PROMPTS
+        ),
+    }
+    results["speedup"] = results["torch"]["mean_s"] / results["onnx"]["mean_s"]
+
+    print(json.dumps(results, ensure_ascii=False, indent=4))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
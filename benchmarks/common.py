@@ -0,0 +1,198 @@
+"""
+Общие компоненты бенчмарков: регулярные выражения, детерминированная модель-заглушка и замер времени.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from free_vigilance_reduction.entity_recognition.model_backend import ModelBackend
+
+
+STANDARD_PATTERNS = {
+    "PHONE": r"\+7\s?\(\d{3}\)\s?\d{3}-\d{2}-\d{2}",
+    "EMAIL": r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",
+    "INN": r"\b\d{12}\b|\b\d{10}\b",
+    "SNILS": r"\b\d{3}-\d{3}-\d{3} \d{2}\b",
+    "PASSPORT": r"\b\d{2} \d{2} \d{6}\b",
+}
+
+
+class StubLanguageModel(ModelBackend):
+    """
+    Детерминированная заглушка языковой модели для бенчмарков без загрузки весов.
+    "Находит" последовательности из двух-трех слов с заглавной буквы как PER
+    и имитирует задержку инференса.
+    """
+
+    NAME_PATTERN = re.compile(r"[А-ЯЁ][а-яё]+(?: [А-ЯЁ][а-яё]+| [А-ЯЁ]\.[А-ЯЁ]\.){1,2}")
+
+    def __init__(self, window_size=1000, latency_per_window=0.0, latency_per_char=0.0):
+        """
+        Инициализация заглушки.
+
+        Args:
+            window_size (int, optional): Размер окна в символах.
+            latency_per_window (float, optional): Задержка на одно окно в секундах.
+            latency_per_char (float, optional): Задержка на один символ окна в секундах.
+        """
+        super().__init__(window_size)
+        self.latency_per_window = latency_per_window
+        self.latency_per_char = latency_per_char
+        self.windows_processed = 0
+        self.chars_processed = 0
+
+    def search_entities(self, text, entities, profile, windows=None):
+        """
+        Поиск сущностей заглушкой.
+
+        Args:
+            text (str): Текст для анализа.
+            entities (list): Список уже найденных сущностей.
+            profile (ConfigurationProfile): Профиль настроек.
+            windows (list, optional): Окна (смещение, текст).
+
+        Returns:
+            list: Обновленный список сущностей.
+        """
+        if windows is None:
+            windows = self._split_into_windows(text)
+
+        mentions = {}
+        for _, window in windows:
+            delay = self.latency_per_window + self.latency_per_char * len(window)
+            if delay:
+                time.sleep(delay)
+            self.windows_processed += 1
+            self.chars_processed += len(window)
+            if "PER" in profile.entity_types:
+                for match in self.NAME_PATTERN.finditer(window):
+                    mentions[("PER", match.group())] = None
+
+        entities.extend(self._propagate_mentions(list(mentions), text))
+        return entities
+
+
+def quiet_logging(level=logging.WARNING):
+    """
+    Понижение подробности логов библиотеки, чтобы вывод не искажал замеры.
+
+    Args:
+        level (int, optional): Минимальный уровень сообщений.
+    """
+    for name, logger in list(logging.Logger.manager.loggerDict.items()):
+        if name.startswith("free_vigilance_reduction") and isinstance(logger, logging.Logger):
+            logger.setLevel(level)
+
+
+def summarize(latencies, chars):
+    """
+    Сводная статистика замеров.
+
+    Args:
+        latencies (list): Длительности вызовов в секундах.
+        chars (int): Размер входа одного вызова в символах.
+
+    Returns:
+        dict: Количество вызовов, среднее, p50, p95 и пропускная способность.
+    """
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "total_s": total,
+        "mean_s": total / len(ordered),
+        "p50_s": ordered[len(ordered) // 2],
+        "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "chars_per_s": chars * len(ordered) / total if total else None,
+    }
+
+
+def measure(func, repeats, chars):
+    """
+    Многократный вызов функции с замером времени.
+
+    Args:
+        func (callable): Функция без аргументов.
+        repeats (int): Количество вызовов.
+        chars (int): Размер входа в символах.
+
+    Returns:
+        dict: Сводная статистика (см. summarize).
+    """
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies, chars)
+
+
+def current_rss():
+    """
+    Текущий объем резидентной памяти процесса.
+
+    Returns:
+        int: Байты или None, если /proc недоступен.
+    """
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class RssSampler:
+    """
+    Фоновый опрос резидентной памяти процесса с запоминанием пика.
+    Используется как контекстный менеджер вокруг замеряемого кода.
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        Инициализация.
+
+        Args:
+            interval (float, optional): Период опроса в секундах.
+        """
+        self.interval = interval
+        self.start_bytes = None
+        self.peak_bytes = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_bytes = self.peak_bytes = current_rss()
+        if self.start_bytes is not None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+    @property
+    def peak_growth(self):
+        """Прирост пикового RSS относительно начала замера в байтах или None."""
+        if self.start_bytes is None:
+            return None
+        return self.peak_bytes - self.start_bytes
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and rss > self.peak_bytes:
+            self.peak_bytes = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
@@ -0,0 +1,387 @@
+"""
+Оценка точности и скорости вариантов конвейера обнаружения сущностей на размеченном корпусе.
+
+Для каждого варианта (только регулярные выражения, выражения и словари, с языковой моделью
+при разных размерах окна и параметрах генерации) считаются точность и полнота по типам
+сущностей, пропускная способность, задержки p50/p95 на документ и пик резидентной памяти.
+Вариант с наибольшей пропускной способностью среди удовлетворяющих --recall-floor
+выводится как рекомендуемый. Варианты, в которых вместо модели работает заглушка,
+помечаются в таблице и результатах ("stub": true) и не рекомендуются.
+
+Пример запуска:
+    python benchmarks/evaluate.py --documents 20 --size 5000 --output evaluation.json
+    python benchmarks/evaluate.py --annotations labeled.jsonl --model-path models/vikhr-gemma-2b-instruct \\
+        --window-sizes 500,1000,2000 --recall-floor 0.95
+    python benchmarks/evaluate.py --variants variants.json --match exact
+
+Файл разметки (JSONL): по документу на строку,
+    {"id": "doc-1", "text": "...", "entities": [{"entity_type": "PER", "start_pos": 0, "end_pos": 11}]}
+вместо "text" можно указать "path" - путь к текстовому файлу относительно файла разметки.
+
+Файл вариантов (JSON): список объектов с полями name, regex, dictionaries, model
+(null, "stub", "generative", "onnx", "token_classification"), window_size, candidate_filter,
+generation_kwargs, constrained_decoding. Без --model-path вариант с моделью использует заглушку.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from free_vigilance_reduction.config.configuration import ConfigurationProfile
+from free_vigilance_reduction.entity_recognition.dictionary import Dictionary
+from free_vigilance_reduction.entity_recognition.entity import Entity
+from free_vigilance_reduction.entity_recognition.entity_recognizer import EntityRecognizer
+from free_vigilance_reduction.entity_recognition.model_backend import ModelBackend, create_backend
+
+from benchmarks.common import STANDARD_PATTERNS, RssSampler, StubLanguageModel, quiet_logging, summarize
+from benchmarks.run_benchmarks import CITIES_DICTIONARY
+from benchmarks.synthetic_corpus import SyntheticCorpusGenerator
+
+
+VARIANT_DEFAULTS = {
+    "regex": True,
+    "dictionaries": True,
+    "model": None,
+    "window_size": 1000,
+    "candidate_filter": True,
+    "generation_kwargs": {},
+    "constrained_decoding": False,
+}
+
+
+class NullModel(ModelBackend):
+    """
+    Модель, не находящая сущностей: вариант конвейера без языковой модели.
+    """
+
+    def search_entities(self, text, entities, profile, windows=None):
+        return entities
+
+
+def load_annotations(path):
+    """
+    Чтение размеченных документов.
+
+    Args:
+        path (str): Путь к файлу JSONL.
+
+    Returns:
+        list: Документы {"id", "text", "entities"}.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    documents = []
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "text" in record:
+                text = record["text"]
+            else:
+                with open(os.path.join(base, record["path"]), "r", encoding="utf-8") as document:
+                    text = document.read()
+
+            entities = []
+            for item in record.get("entities", []):
+                start, end = item["start_pos"], item["end_pos"]
+                if not 0 <= start < end <= len(text):
+                    raise ValueError(f"{path}:{number}: entity span {start}:{end} is outside the text")
+                if "text" in item and item["text"] != text[start:end]:
+                    raise ValueError(f"{path}:{number}: entity text {item['text']!r} does not match "
+                                     f"{text[start:end]!r} at {start}:{end}")
+                entities.append(Entity(text[start:end], item["entity_type"], start, end))
+            documents.append({"id": record.get("id", f"{os.path.basename(path)}:{number}"),
+                              "text": text, "entities": entities})
+    return documents
+
+
+def synthetic_documents(count, size, seed, pii_density):
+    """Размеченные документы генератора синтетического корпуса."""
+    generator = SyntheticCorpusGenerator(seed=seed, pii_density=pii_density)
+    return [
+        {"id": f"synthetic-{index}", "text": text, "entities": entities}
+        for index, (text, entities) in enumerate(generator.generate_corpus(count, size))
+    ]
+
+
+def default_variants(window_sizes, model):
+    """
+    Стандартный набор вариантов: только выражения, выражения и словари,
+    выражения, словари и модель для каждого размера окна.
+    """
+    variants = [
+        {"name": "regex", "dictionaries": False},
+        {"name": "regex+dict"},
+    ]
+    for window_size in window_sizes:
+        variants.append({"name": f"regex+dict+{model}@{window_size}", "model": model, "window_size": window_size})
+    return variants
+
+
+def build_model(spec, model_path, cache):
+    """
+    Создание или повторное использование модели варианта.
+    Загруженные модели кешируются по имени; размер окна и параметры
+    генерации задаются для каждого варианта.
+    """
+    name = spec["model"]
+    if name is None:
+        return NullModel(spec["window_size"])
+    if name == "stub" or model_path is None:
+        return StubLanguageModel(window_size=spec["window_size"])
+
+    model = cache.get(name)
+    if model is None:
+        model = cache[name] = create_backend(name, model_path)
+    model.window_size = spec["window_size"]
+    if hasattr(model, "generation_kwargs"):
+        model.generation_kwargs = dict(getattr(model, "DEFAULT_GENERATION_KWARGS", {}), **spec["generation_kwargs"])
+    if hasattr(model, "constrained_decoding"):
+        model.constrained_decoding = spec["constrained_decoding"]
+    return model
+
+
+def build_recognizer(spec, model):
+    """Создание распознавателя по описанию варианта."""
+    recognizer = EntityRecognizer(None, use_candidate_filter=spec["candidate_filter"], backend=model)
+    if spec["regex"]:
+        for entity_type, pattern in STANDARD_PATTERNS.items():
+            recognizer.register_pattern(entity_type, pattern)
+    if spec["dictionaries"]:
+        dictionary = Dictionary()
+        with open(CITIES_DICTIONARY, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    dictionary.add_term(line.strip(), "LOC")
+        recognizer.dictionary_manager.dictionaries["cities"] = dictionary
+    return recognizer
+
+
+def _count_covered(spans, others):
+    """Количество отрезков spans, пересекающихся хотя бы с одним отрезком others."""
+    others = sorted(others)
+    starts = [start for start, _ in others]
+    max_ends = []
+    for _, end in others:
+        max_ends.append(max(end, max_ends[-1]) if max_ends else end)
+    covered = 0
+    for start, end in spans:
+        index = bisect_left(starts, end)
+        if index and max_ends[index - 1] > start:
+            covered += 1
+    return covered
+
+
+def score_document(predicted, truth, match, counts):
+    """
+    Сопоставление найденных сущностей с разметкой.
+
+    Args:
+        predicted (list): Найденные сущности.
+        truth (list): Размеченные сущности.
+        match (str): "exact" - совпадение типа и границ; "overlap" - совпадение типа и пересечение.
+        counts (dict): Тип -> счетчики {"predicted", "predicted_matched", "gold", "gold_matched"},
+                       дополняемые результатами документа.
+    """
+    predicted_spans, gold_spans = defaultdict(list), defaultdict(list)
+    for entity in predicted:
+        predicted_spans[entity.entity_type].append((entity.start_pos, entity.end_pos))
+    for entity in truth:
+        gold_spans[entity.entity_type].append((entity.start_pos, entity.end_pos))
+
+    for entity_type in set(predicted_spans) | set(gold_spans):
+        spans, gold = predicted_spans[entity_type], gold_spans[entity_type]
+        if match == "exact":
+            common = len(set(spans) & set(gold))
+            predicted_matched = gold_matched = common
+        else:
+            predicted_matched = _count_covered(spans, gold)
+            gold_matched = _count_covered(gold, spans)
+        type_counts = counts[entity_type]
+        type_counts["predicted"] += len(spans)
+        type_counts["predicted_matched"] += predicted_matched
+        type_counts["gold"] += len(gold)
+        type_counts["gold_matched"] += gold_matched
+
+
+def quality(type_counts):
+    """Точность, полнота и F1 по счетчикам."""
+    precision = type_counts["predicted_matched"] / type_counts["predicted"] if type_counts["predicted"] else None
+    recall = type_counts["gold_matched"] / type_counts["gold"] if type_counts["gold"] else None
+    f1 = None
+    if precision is not None and recall is not None and precision + recall:
+        f1 = 2 * precision * recall / (precision + recall)
+    return {"precision": precision, "recall": recall, "f1": f1,
+            "support": type_counts["gold"], "predicted": type_counts["predicted"]}
+
+
+def evaluate_variant(spec, documents, profile, match, repeats, model_path, cache):
+    """
+    Прогон корпуса через вариант конвейера.
+
+    Returns:
+        dict: Качество по типам и в целом, задержки, пропускная способность и память.
+    """
+    model = build_model(spec, model_path, cache)
+    recognizer = build_recognizer(spec, model)
+    recognizer.detect_entities(documents[0]["text"], profile)  # прогрев
+
+    counts = defaultdict(lambda: {"predicted": 0, "predicted_matched": 0, "gold": 0, "gold_matched": 0})
+    latencies = []
+    with RssSampler() as memory:
+        for repeat in range(repeats):
+            for document in documents:
+                started = time.perf_counter()
+                predicted = recognizer.detect_entities(document["text"], profile)
+                latencies.append(time.perf_counter() - started)
+                if repeat == 0:
+                    score_document(predicted, document["entities"], match, counts)
+
+    total = {key: sum(c[key] for c in counts.values()) for key in
+             ("predicted", "predicted_matched", "gold", "gold_matched")}
+    chars = sum(len(document["text"]) for document in documents)
+    timing = summarize(latencies, chars / len(documents))
+    return {
+        "variant": spec,
+        "stub": isinstance(model, StubLanguageModel),
+        "overall": quality(total),
+        "per_type": {entity_type: quality(counts[entity_type]) for entity_type in sorted(counts)},
+        "documents": len(documents),
+        "chars": chars,
+        "p50_s": timing["p50_s"],
+        "p95_s": timing["p95_s"],
+        "mean_s": timing["mean_s"],
+        "chars_per_s": timing["chars_per_s"],
+        "peak_rss_mb": memory.peak_bytes / 2 ** 20 if memory.peak_bytes is not None else None,
+        "rss_growth_mb": memory.peak_growth / 2 ** 20 if memory.peak_growth is not None else None,
+    }
+
+
+def recommend(results, recall_floor):
+    """
+    Самый быстрый вариант с общей полнотой не ниже порога.
+    Варианты с заглушкой вместо модели не рассматриваются.
+
+    Returns:
+        str: Имя варианта или None.
+    """
+    passing = [
+        r for r in results
+        if not r["stub"] and r["overall"]["recall"] is not None and r["overall"]["recall"] >= recall_floor
+    ]
+    if not passing:
+        return None
+    return max(passing, key=lambda r: r["chars_per_s"] or 0)["variant"]["name"]
+
+
+def _format(value, pattern):
+    """Форматирование числа для таблицы; отсутствующее значение выводится как "-"."""
+    if value is None:
+        return "-".rjust(int(pattern.split(".")[0]))
+    return format(value, pattern)
+
+
+def print_tables(results, recommended):
+    """Вывод сводной таблицы и таблицы по типам сущностей."""
+    print(f"{'variant':32s} {'prec':>6s} {'recall':>6s} {'f1':>6s} {'chars/s':>11s} "
+          f"{'p50 ms':>9s} {'p95 ms':>9s} {'peak MB':>8s}")
+    for result in results:
+        overall = result["overall"]
+        marker = "  <- recommended" if result["variant"]["name"] == recommended else ""
+        if result["stub"]:
+            marker = "  (stub model)"
+        print(f"{result['variant']['name']:32s} {_format(overall['precision'], '6.3f')} "
+              f"{_format(overall['recall'], '6.3f')} {_format(overall['f1'], '6.3f')} "
+              f"{_format(result['chars_per_s'], '11.0f')} {result['p50_s'] * 1000:9.2f} "
+              f"{result['p95_s'] * 1000:9.2f} {_format(result['peak_rss_mb'], '8.1f')}{marker}")
+
+    print()
+    print(f"{'variant':32s} {'type':10s} {'prec':>6s} {'recall':>6s} {'support':>8s}")
+    for result in results:
+        for entity_type, metrics in result["per_type"].items():
+            print(f"{result['variant']['name']:32s} {entity_type:10s} {_format(metrics['precision'], '6.3f')} "
+                  f"{_format(metrics['recall'], '6.3f')} {metrics['support']:8d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--annotations", action="append", default=[], help="Файл разметки JSONL (можно повторять).")
+    parser.add_argument("--documents", type=int, default=10, help="Количество синтетических документов (0 - без них).")
+    parser.add_argument("--size", type=int, default=5000, help="Размер синтетического документа в символах.")
+    parser.add_argument("--pii-density", type=float, default=0.3, help="Доля предложений с персональными данными.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variants", help="JSON-файл со списком вариантов конвейера.")
+    parser.add_argument("--window-sizes", default="1000", help="Размеры окна для стандартных вариантов с моделью.")
+    parser.add_argument("--model-path", help="Путь к модели. Без него вместо модели используется заглушка.")
+    parser.add_argument("--backend", default="generative", choices=["generative", "onnx", "token_classification"])
+    parser.add_argument("--match", default="overlap", choices=["overlap", "exact"],
+                        help="Критерий совпадения с разметкой.")
+    parser.add_argument("--repeats", type=int, default=1, help="Количество прогонов корпуса для замера задержек.")
+    parser.add_argument("--recall-floor", type=float, default=0.9, help="Минимальная допустимая общая полнота.")
+    parser.add_argument("--output", help="Файл для JSON-результатов.")
+    args = parser.parse_args()
+
+    documents = synthetic_documents(args.documents, args.size, args.seed, args.pii_density) if args.documents else []
+    for path in args.annotations:
+        documents.extend(load_annotations(path))
+    if not documents:
+        parser.error("no documents to evaluate: use --documents or --annotations")
+
+    model = args.backend if args.model_path else "stub"
+    if args.variants:
+        with open(args.variants, "r", encoding="utf-8") as file:
+            variants = json.load(file)
+    else:
+        variants = default_variants([int(size) for size in args.window_sizes.split(",")], model)
+    variants = [dict(VARIANT_DEFAULTS, **variant) for variant in variants]
+
+    profile = ConfigurationProfile.create_default()
+    gold_types = {entity.entity_type for document in documents for entity in document["entities"]}
+    profile.entity_types = list(dict.fromkeys(profile.entity_types + sorted(gold_types)))
+    profile = profile.compile()
+    quiet_logging()
+
+    results = []
+    cache = {}
+    for spec in variants:
+        print(f"Evaluating {spec['name']}", file=sys.stderr)
+        results.append(evaluate_variant(spec, documents, profile, args.match, args.repeats, args.model_path, cache))
+
+    recommended = recommend(results, args.recall_floor)
+    print_tables(results, recommended)
+    if recommended is None:
+        print(f"\nNo variant reaches recall {args.recall_floor}")
+
+    output = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "documents": len(documents),
+            "annotations": args.annotations,
+            "synthetic": {"documents": args.documents, "size": args.size, "seed": args.seed,
+                          "pii_density": args.pii_density},
+            "match": args.match,
+            "repeats": args.repeats,
+            "model_path": args.model_path,
+            "recall_floor": args.recall_floor,
+        },
+        "results": results,
+        "recommended": recommended,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(output, file, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
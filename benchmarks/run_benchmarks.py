@@ -0,0 +1,243 @@
+"""
+Бенчмарк пропускной способности этапов анонимизации на синтетическом корпусе.
+
+Пример запуска:
+    python benchmarks/run_benchmarks.py --sizes 10000,100000 --output bench.json
+    python benchmarks/run_benchmarks.py --sizes 10000,100000 --compare bench.json --threshold 0.2
+
+Языковая модель заменяется детерминированной заглушкой, поэтому загрузка весов не требуется.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from free_vigilance_reduction.config.configuration import ConfigurationProfile
+from free_vigilance_reduction.data_replacement.data_replacer import DataReplacer
+from free_vigilance_reduction.entity_recognition.dictionary import Dictionary
+from free_vigilance_reduction.entity_recognition.entity_recognizer import EntityRecognizer
+from free_vigilance_reduction.reporting.reduction_report import ReductionReport
+
+from benchmarks.common import STANDARD_PATTERNS, StubLanguageModel, measure, quiet_logging
+from benchmarks.synthetic_corpus import SyntheticCorpusGenerator
+
+
+CITIES_DICTIONARY = Path(__file__).parent.parent / "examples" / "dictionaries" / "russian_cities.txt"
+
+
+def build_recognizer(stub_latency):
+    """Создание распознавателя с заглушкой модели, регулярными выражениями и словарем городов."""
+    recognizer = EntityRecognizer(None, backend=StubLanguageModel(latency_per_window=stub_latency))
+    for entity_type, pattern in STANDARD_PATTERNS.items():
+        recognizer.register_pattern(entity_type, pattern)
+
+    dictionary = Dictionary()
+    with open(CITIES_DICTIONARY, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                dictionary.add_term(line.strip(), "LOC")
+    recognizer.dictionary_manager.dictionaries["cities"] = dictionary
+    return recognizer
+
+
+def write_pdf(path, text):
+    """Запись минимального PDF с текстом (символы вне ASCII заменяются на '?')."""
+    lines = text.encode("ascii", "replace").decode("ascii").replace("\\", "").replace("(", "").replace(")", "")
+    stream = "BT /F1 10 Tf 12 TL 40 800 Td\n" + "\n".join(
+        f"({line}) Tj T*" for line in lines.splitlines() or [""]
+    ) + "\nET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    content = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    content += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w", encoding="latin-1") as file:
+        file.write(content)
+
+
+def processor_stages(text, reduced_text, workdir):
+    """Этапы чтения и записи для каждого обработчика документов."""
+    from free_vigilance_reduction.documents.txt_processor import TxtProcessor
+
+    stages = {}
+    txt_path = os.path.join(workdir, "document.txt")
+    with open(txt_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    txt = TxtProcessor(txt_path)
+    stages["txt_processor.get_text"] = txt.get_text
+    stages["txt_processor.create_redacted_copy"] = lambda: txt.create_redacted_copy(reduced_text)
+
+    try:
+        import docx
+        from free_vigilance_reduction.documents.docx_processor import DocProcessor
+
+        docx_path = os.path.join(workdir, "document.docx")
+        document = docx.Document()
+        for paragraph in text.split("\n"):
+            document.add_paragraph(paragraph)
+        document.save(docx_path)
+        doc = DocProcessor(docx_path)
+        stages["docx_processor.get_text"] = doc.get_text
+        stages["docx_processor.create_redacted_copy"] = lambda: doc.create_redacted_copy(reduced_text)
+    except ImportError:
+        print("python-docx is not installed, skipping DOCX processor", file=sys.stderr)
+
+    try:
+        from free_vigilance_reduction.documents.pdf_processor import PdfProcessor
+
+        pdf_path = os.path.join(workdir, "document.pdf")
+        write_pdf(pdf_path, text)
+        pdf = PdfProcessor(pdf_path)
+        stages["pdf_processor.get_text"] = pdf.get_text
+        stages["pdf_processor.create_redacted_copy"] = lambda: pdf.create_redacted_copy(reduced_text)
+    except ImportError:
+        print("PyPDF2 is not installed, skipping PDF processor", file=sys.stderr)
+
+    return stages
+
+
+def run(sizes, pii_density, seed, repeats, stub_latency):
+    """
+    Запуск всех этапов для каждого размера документа.
+
+    Returns:
+        list: Результаты замеров.
+    """
+    recognizer = build_recognizer(stub_latency)
+    replacer = DataReplacer()
+    profile = ConfigurationProfile.create_default()
+    generator = SyntheticCorpusGenerator(seed=seed, pii_density=pii_density)
+    results = []
+
+    for size in sizes:
+        text, truth = generator.generate_document(size)
+        regex_entities = recognizer._find_pattern_matches(text, profile)
+        dict_entities = recognizer.dictionary_manager.find_matches(text, profile)
+        lm_entities = recognizer.language_model.search_entities(text, [], profile)
+        candidates = truth + regex_entities + dict_entities + lm_entities
+        entities = recognizer._remove_overlapping_entities(candidates)
+        reduced_text, replacements = replacer.reduce_text(text, entities, profile)
+        report = ReductionReport(text, reduced_text, entities, replacements)
+        window_size = recognizer.language_model.window_size
+
+        stages = {
+            "regex_detection": lambda: recognizer._find_pattern_matches(text, profile),
+            "dictionary_find_matches": lambda: recognizer.dictionary_manager.find_matches(text, profile),
+            "candidate_filter": lambda: recognizer.candidate_filter.select_windows(text, profile, window_size),
+            "stub_model_search": lambda: recognizer.language_model.search_entities(text, [], profile),
+            "overlap_removal": lambda: recognizer._remove_overlapping_entities(candidates),
+            "detect_entities": lambda: recognizer.detect_entities(text, profile),
+            "data_replacer_reduce_text": lambda: replacer.reduce_text(text, entities, profile),
+            "report_to_json": report.to_json,
+        }
+
+        with tempfile.TemporaryDirectory(prefix="fvr-bench-") as workdir:
+            stages.update(processor_stages(text, reduced_text, workdir))
+            for stage, func in stages.items():
+                result = measure(func, repeats, len(text))
+                result.update(stage=stage, size=len(text), entities=len(entities))
+                results.append(result)
+                print(f"{stage:40s} {len(text):>10d} chars  mean {result['mean_s'] * 1000:10.3f} ms",
+                      file=sys.stderr)
+
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Сравнение с сохраненными результатами.
+
+    Returns:
+        list: Этапы, замедлившиеся более чем на threshold.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = {(r["stage"], r["size"]): r for r in json.load(file)["results"]}
+
+    regressions = []
+    print(f"{'stage':40s} {'size':>10s} {'baseline ms':>12s} {'current ms':>12s} {'ratio':>7s}")
+    for result in results:
+        old = baseline.get((result["stage"], result["size"]))
+        if old is None:
+            continue
+        ratio = result["mean_s"] / old["mean_s"] if old["mean_s"] else float("inf")
+        marker = " !" if ratio > 1 + threshold else ""
+        print(f"{result['stage']:40s} {result['size']:>10d} {old['mean_s'] * 1000:12.3f} "
+              f"{result['mean_s'] * 1000:12.3f} {ratio:7.2f}{marker}")
+        if marker:
+            regressions.append(result["stage"])
+    return regressions
+
+
+def git_revision():
+    """Текущий коммит репозитория, если он доступен."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="Размеры документов в символах через запятую.")
+    parser.add_argument("--pii-density", type=float, default=0.3, help="Доля предложений с персональными данными.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Задержка заглушки на одно окно, с.")
+    parser.add_argument("--output", help="Файл для JSON-результатов.")
+    parser.add_argument("--compare", help="JSON-результаты предыдущего запуска для сравнения.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое замедление (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    quiet_logging()
+
+    results = run(sizes, args.pii_density, args.seed, args.repeats, args.stub_latency)
+
+    output = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "pii_density": args.pii_density,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "stub_latency": args.stub_latency,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(output, file, ensure_ascii=False, indent=4)
+    else:
+        print(json.dumps(output, ensure_ascii=False, indent=4))
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
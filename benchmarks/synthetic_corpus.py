@@ -0,0 +1,175 @@
+"""
+Генератор синтетических русскоязычных документов с персональными данными.
+Документы воспроизводимы при одинаковом seed и сопровождаются разметкой сущностей.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from free_vigilance_reduction.entity_recognition.entity import Entity
+
+
+MALE_SURNAMES = ["Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Васильев", "Соколов", "Михайлов",
+                 "Новиков", "Федоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров"]
+MALE_NAMES = ["Иван", "Петр", "Алексей", "Сергей", "Дмитрий", "Андрей", "Михаил", "Николай", "Владимир", "Артем"]
+FEMALE_NAMES = ["Анна", "Мария", "Елена", "Ольга", "Татьяна", "Наталья", "Ирина", "Светлана", "Екатерина"]
+PATRONYMIC_ROOTS = ["Иванов", "Петров", "Сергеев", "Алексеев", "Дмитриев", "Андреев", "Николаев", "Владимиров"]
+CITIES = ["Москва", "Санкт-Петербург", "Новосибирск", "Екатеринбург", "Казань", "Нижний Новгород",
+          "Челябинск", "Самара", "Омск", "Ростов-на-Дону", "Уфа", "Красноярск", "Воронеж", "Пермь"]
+STREETS = ["Ленина", "Пушкина", "Гагарина", "Советская", "Мира", "Садовая", "Лесная", "Школьная",
+           "Набережная", "Молодежная", "Центральная", "Заречная"]
+LATIN_SURNAMES = ["ivanov", "petrov", "smirnov", "kuznetsov", "popov", "sokolov", "volkov", "egorov"]
+MAIL_DOMAINS = ["mail.ru", "yandex.ru", "gmail.com", "example.org"]
+
+BOILERPLATE = [
+    "Стороны пришли к соглашению о нижеследующем.",
+    "Настоящий договор вступает в силу с момента его подписания сторонами.",
+    "Все споры разрешаются путем переговоров, а при недостижении согласия - в судебном порядке.",
+    "Изменения и дополнения к договору действительны при условии их письменного оформления.",
+    "Договор составлен в двух экземплярах, имеющих одинаковую юридическую силу.",
+    "Оплата производится в течение десяти банковских дней с момента выставления счета.",
+    "Ответственность сторон определяется в соответствии с действующим законодательством.",
+    "Ни одна из сторон не вправе передавать свои права третьим лицам без письменного согласия.",
+    "Контрольный осмотр назначен через пять дней.",
+    "Рекомендовано обильное питье и соблюдение постельного режима.",
+]
+
+TEMPLATES = [
+    "Пациент: {PER}.",
+    "Заявитель {PER}, проживающий по адресу: {LOC}.",
+    "Телефон для связи: {PHONE}, электронная почта: {EMAIL}.",
+    "ИНН налогоплательщика: {INN}.",
+    "СНИЛС: {SNILS}.",
+    "Паспорт серии {PASSPORT} выдан отделом УФМС.",
+    "Представитель {PER} действует на основании доверенности.",
+    "Адрес регистрации: {LOC}.",
+    "Ответственный сотрудник {PER}, тел. {PHONE}.",
+]
+
+
+class SyntheticCorpusGenerator:
+    """
+    Генератор синтетических документов.
+    """
+
+    def __init__(self, seed=0, pii_density=0.3):
+        """
+        Инициализация генератора.
+
+        Args:
+            seed (int, optional): Начальное значение генератора случайных чисел.
+            pii_density (float, optional): Доля предложений, содержащих персональные данные.
+        """
+        self.random = random.Random(seed)
+        self.pii_density = pii_density
+
+    def generate_document(self, size):
+        """
+        Генерация документа заданного размера.
+
+        Args:
+            size (int): Приблизительный размер документа в символах.
+
+        Returns:
+            tuple: (текст, список размеченных сущностей).
+        """
+        parts = []
+        entities = []
+        length = 0
+
+        while length < size:
+            if self.random.random() < self.pii_density:
+                sentence, sentence_entities = self._fill_template(self.random.choice(TEMPLATES))
+            else:
+                sentence, sentence_entities = self.random.choice(BOILERPLATE), []
+
+            for entity in sentence_entities:
+                entities.append(Entity(entity.text, entity.entity_type,
+                                       entity.start_pos + length, entity.end_pos + length))
+
+            separator = "\n" if self.random.random() < 0.2 else " "
+            parts.append(sentence + separator)
+            length += len(sentence) + 1
+
+        return "".join(parts), entities
+
+    def generate_corpus(self, count, size):
+        """
+        Генерация набора документов.
+
+        Args:
+            count (int): Количество документов.
+            size (int): Приблизительный размер документа в символах.
+
+        Yields:
+            tuple: (текст, список размеченных сущностей).
+        """
+        for _ in range(count):
+            yield self.generate_document(size)
+
+    def _fill_template(self, template):
+        """Подстановка значений в шаблон предложения с вычислением позиций."""
+        text = ""
+        entities = []
+        rest = template
+        while "{" in rest:
+            before, _, tail = rest.partition("{")
+            entity_type, _, rest = tail.partition("}")
+            text += before
+            value = getattr(self, f"_make_{entity_type.lower()}")()
+            entities.append(Entity(value, entity_type, len(text), len(text) + len(value)))
+            text += value
+        return text + rest, entities
+
+    def _make_per(self):
+        """ФИО полностью или фамилия с инициалами."""
+        surname = self.random.choice(MALE_SURNAMES)
+        female = self.random.random() < 0.5
+        name = self.random.choice(FEMALE_NAMES if female else MALE_NAMES)
+        patronymic = self.random.choice(PATRONYMIC_ROOTS) + ("на" if female else "ич")
+        if female:
+            surname += "а"
+        if self.random.random() < 0.3:
+            return f"{surname} {name[0]}.{patronymic[0]}."
+        return f"{surname} {name} {patronymic}"
+
+    def _make_loc(self):
+        """Почтовый адрес."""
+        return (f"г. {self.random.choice(CITIES)}, ул. {self.random.choice(STREETS)}, "
+                f"д. {self.random.randint(1, 120)}, кв. {self.random.randint(1, 300)}")
+
+    def _make_phone(self):
+        """Номер мобильного телефона."""
+        digits = [self.random.randint(0, 9) for _ in range(7)]
+        return (f"+7 (9{self.random.randint(10, 99)}) {digits[0]}{digits[1]}{digits[2]}-"
+                f"{digits[3]}{digits[4]}-{digits[5]}{digits[6]}")
+
+    def _make_email(self):
+        """Адрес электронной почты."""
+        return (f"{self.random.choice(LATIN_SURNAMES)}.{self.random.randint(1, 999)}"
+                f"@{self.random.choice(MAIL_DOMAINS)}")
+
+    def _make_inn(self):
+        """ИНН физического лица с корректными контрольными цифрами."""
+        digits = [self.random.randint(0, 9) for _ in range(10)]
+        for weights in ([7, 2, 4, 10, 3, 5, 9, 4, 6, 8], [3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8]):
+            digits.append(sum(d * w for d, w in zip(digits, weights)) % 11 % 10)
+        return "".join(map(str, digits))
+
+    def _make_snils(self):
+        """СНИЛС с корректной контрольной суммой."""
+        digits = [self.random.randint(0, 9) for _ in range(9)]
+        checksum = sum(d * (9 - i) for i, d in enumerate(digits))
+        if checksum > 101:
+            checksum %= 101
+        if checksum in (100, 101):
+            checksum = 0
+        number = "".join(map(str, digits))
+        return f"{number[:3]}-{number[3:6]}-{number[6:]} {checksum:02d}"
+
+    def _make_passport(self):
+        """Серия и номер паспорта."""
+        return f"{self.random.randint(10, 99)} {self.random.randint(10, 99)} {self.random.randint(100000, 999999)}"
@@ -11,6 +11,9 @@ from .entity_recognition.entity import Entity
 from .data_replacement.data_replacer import DataReplacer
 from .reporting.reduction_report import ReductionReport
 from .reporting.observers import ProcessingObserver
+from .reporting.metrics import MetricsCollector
+from .utils.profiling import RequestProfiler
+from .plugins import PluginRegistry
 
 __version__ = '0.7.0'
 __all__ = [
@@ -24,5 +27,8 @@ __all__ = [
     'DataReplacer',
     'ReductionReport',
     'ProcessingObserver',
+    'MetricsCollector',
+    'RequestProfiler',
+    'PluginRegistry',
     'LanguageModel'
 ]
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""
+Пакетная анонимизация из командной строки: python -m free_vigilance_reduction --help
+"""
+
+import sys
+from .batch import main
+
+sys.exit(main())
@@ -0,0 +1,392 @@
+"""
+Модуль пакетной обработки каталогов документов с возобновлением после остановки.
+
+Анонимизированные копии и отчеты записываются в выходной каталог с сохранением
+структуры входных каталогов. Завершенные документы фиксируются в журнале
+(дописываемый NDJSON-файл в выходном каталоге). При повторном запуске документ
+пропускается, если в журнале есть успешная запись для того же относительного пути
+и того же содержимого (SHA-256); размер и время изменения файла позволяют не
+вычислять хеш для файлов, которые не менялись.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from .utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+JOURNAL_FILENAME = ".fvr-journal.ndjson"
+REPORT_FORMATS = ("json", "ndjson", "csv", "none")
+
+
+def file_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Хеш содержимого файла.
+
+    Args:
+        file_path (str): Путь к файлу.
+        chunk_size (int, optional): Размер блока чтения в байтах.
+
+    Returns:
+        str: SHA-256 в шестнадцатеричном виде.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BatchJournal:
+    """
+    Журнал пакетной обработки. Каждая строка - результат обработки одного документа:
+    {"path", "sha256", "size", "mtime_ns", "status", "outputs", "error", "time"}.
+    Строки только дописываются, поэтому журнал остается корректным при остановке
+    процесса в любой момент (неполная последняя строка игнорируется при чтении).
+    """
+
+    def __init__(self, journal_path):
+        """
+        Открытие журнала.
+
+        Args:
+            journal_path (str): Путь к файлу журнала.
+        """
+        self.journal_path = journal_path
+        self.completed = {}
+        if os.path.exists(journal_path):
+            self._load()
+        directory = os.path.dirname(journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(journal_path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """Чтение успешных записей журнала; для каждого пути действует последняя запись."""
+        with open(self.journal_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("status") == "success":
+                    self.completed[entry["path"]] = entry
+                else:
+                    self.completed.pop(entry.get("path"), None)
+        logger.info(f"Journal {self.journal_path}: {len(self.completed)} completed documents")
+
+    def check(self, relative_path, file_path):
+        """
+        Проверка, обработан ли документ.
+
+        Args:
+            relative_path (str): Путь документа относительно корня входных данных.
+            file_path (str): Путь к файлу.
+
+        Returns:
+            tuple: (True, если документ уже обработан; хеш содержимого).
+        """
+        stat = os.stat(file_path)
+        entry = self.completed.get(relative_path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True, entry["sha256"]
+        content_hash = file_hash(file_path)
+        return entry is not None and entry["sha256"] == content_hash, content_hash
+
+    def record(self, relative_path, file_path, content_hash, status, outputs=None, error=None):
+        """
+        Добавление записи в журнал.
+
+        Args:
+            relative_path (str): Путь документа относительно корня входных данных.
+            file_path (str): Путь к файлу.
+            content_hash (str): Хеш содержимого.
+            status (str): "success" или "error".
+            outputs (dict, optional): Пути к созданным файлам.
+            error (str, optional): Описание ошибки.
+        """
+        stat = os.stat(file_path)
+        entry = {
+            "path": relative_path,
+            "sha256": content_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "status": status,
+            "outputs": outputs or {},
+            "error": error,
+            "time": time.time()
+        }
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if status == "success":
+            self.completed[relative_path] = entry
+        else:
+            self.completed.pop(relative_path, None)
+
+    def close(self):
+        """
+        Закрытие журнала.
+        """
+        self._file.close()
+
+
+class BatchProcessor:
+    """
+    Пакетная анонимизация файлов и каталогов.
+    """
+
+    def __init__(self, fvr, output_dir, profile_id=None, report_format="json", workers=1, fail_fast=False,
+                 extensions=None):
+        """
+        Инициализация пакетной обработки.
+
+        Args:
+            fvr (FreeVigilanceReduction): Экземпляр для анонимизации.
+            output_dir (str): Выходной каталог.
+            profile_id (str, optional): Идентификатор профиля настроек.
+            report_format (str, optional): Формат отчетов: "json", "ndjson", "csv" или "none".
+            workers (int, optional): Количество рабочих процессов (1 - обработка в текущем процессе).
+            fail_fast (bool, optional): Остановиться на первой ошибке.
+            extensions (list, optional): Обрабатываемые расширения. По умолчанию - все
+                                         поддерживаемые фабрикой документов.
+        """
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {report_format}")
+        self.fvr = fvr
+        self.output_dir = output_dir
+        self.profile_id = profile_id
+        self.report_format = report_format
+        self.workers = workers
+        self.fail_fast = fail_fast
+        self.extensions = {e.lower().lstrip('.') for e in (extensions or fvr.document_factory.get_supported_formats())}
+        self.stats = {"processed": 0, "skipped": 0, "failed": 0}
+        self._pending = {}
+
+    def iter_inputs(self, input_paths):
+        """
+        Обход входных путей.
+
+        Args:
+            input_paths (list): Файлы и каталоги.
+
+        Файл, который встречается в нескольких входных путях (например, каталог
+        и файл из него), возвращается один раз.
+
+        Yields:
+            tuple: (путь к файлу, путь относительно родителя входного пути).
+        """
+        output_root = os.path.abspath(self.output_dir)
+        seen = set()
+
+        def unseen(file_path):
+            real_path = os.path.realpath(file_path)
+            if real_path in seen:
+                return False
+            seen.add(real_path)
+            return True
+
+        for input_path in input_paths:
+            input_path = os.path.abspath(input_path)
+            base = os.path.dirname(input_path)
+            if os.path.isfile(input_path):
+                if unseen(input_path):
+                    yield input_path, os.path.relpath(input_path, base)
+                continue
+            for root, dirs, files in os.walk(input_path):
+                dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != output_root)
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower().lstrip('.') in self.extensions:
+                        file_path = os.path.join(root, name)
+                        if unseen(file_path):
+                            yield file_path, os.path.relpath(file_path, base)
+
+    def collect_inputs(self, input_paths):
+        """
+        Список входных файлов с проверкой, что их выходные пути не совпадают.
+
+        Args:
+            input_paths (list): Файлы и каталоги.
+
+        Returns:
+            list: Пары (путь к файлу, путь относительно родителя входного пути).
+
+        Raises:
+            ValueError: Если разные файлы получают один относительный путь (например,
+                        входные пути a/docs и b/docs) или одну анонимизированную копию
+                        (card.pdf и card.txt - обе копии card_redacted.txt).
+        """
+        inputs = list(self.iter_inputs(input_paths))
+        owners = {}
+        collisions = []
+        for file_path, relative_path in inputs:
+            # Относительный путь - ключ журнала и отчета; копия может сменить расширение
+            for key in (("path", relative_path), ("redacted", self._redacted_path(file_path, relative_path))):
+                owner = owners.setdefault(key, file_path)
+                if owner != file_path:
+                    collisions.append(f"{owner} and {file_path} -> {key[1]}")
+        if collisions:
+            raise ValueError("Input files map to the same output path: " + "; ".join(collisions))
+        return inputs
+
+    def run(self, input_paths):
+        """
+        Обработка входных путей с пропуском документов, уже отмеченных в журнале.
+
+        Args:
+            input_paths (list): Файлы и каталоги.
+
+        Returns:
+            dict: Количество обработанных, пропущенных и завершившихся ошибкой документов.
+
+        Raises:
+            ValueError: Если разные входные файлы получают один выходной путь.
+        """
+        inputs = self.collect_inputs(input_paths)
+        journal = BatchJournal(os.path.join(self.output_dir, JOURNAL_FILENAME))
+        pending = self._pending = {}
+
+        def tasks():
+            for file_path, relative_path in inputs:
+                done, content_hash = journal.check(relative_path, file_path)
+                if done:
+                    self.stats["skipped"] += 1
+                    continue
+                pending[file_path] = (relative_path, content_hash)
+                yield file_path
+
+        results = self._process(tasks())
+        try:
+            for file_path, report, error in results:
+                relative_path, content_hash = pending.pop(file_path)
+                if error is None:
+                    try:
+                        outputs = self._save_outputs(relative_path, report)
+                    except Exception as e:
+                        report, error = None, e
+                if error is None:
+                    journal.record(relative_path, file_path, content_hash, "success", outputs)
+                    self.stats["processed"] += 1
+                    continue
+                journal.record(relative_path, file_path, content_hash, "error", error=str(error))
+                self.stats["failed"] += 1
+                logger.error(f"Failed to process {relative_path}: {str(error)}")
+                if self.fail_fast:
+                    break
+        finally:
+            results.close()
+            journal.close()
+
+        logger.info(f"Batch finished: {self.stats['processed']} processed, {self.stats['skipped']} skipped, "
+                    f"{self.stats['failed']} failed")
+        return dict(self.stats)
+
+    def _process(self, file_paths):
+        """
+        Анонимизация документов в текущем процессе или в пуле рабочих процессов.
+
+        Yields:
+            tuple: (путь, отчет или None, ошибка или None).
+        """
+        if self.workers > 1:
+            from .workers import PreforkWorkerPool
+
+            with PreforkWorkerPool(self.fvr, processes=self.workers) as pool:
+                results = pool.reduce_documents(file_paths, self.profile_id, ordered=False,
+                                                output_dir=self._redacted_dir)
+                yield from results
+            return
+
+        for file_path in file_paths:
+            try:
+                report = self.fvr.reduce_document(file_path, self.profile_id,
+                                                  output_dir=self._redacted_dir(file_path))
+                yield file_path, report, None
+            except Exception as e:
+                yield file_path, None, e
+
+    def _redacted_dir(self, file_path):
+        """Каталог анонимизированной копии документа в выходном дереве."""
+        relative_path, _ = self._pending[file_path]
+        return os.path.join(self.output_dir, os.path.dirname(relative_path))
+
+    def _redacted_path(self, file_path, relative_path):
+        """Ожидаемый путь анонимизированной копии относительно выходного каталога."""
+        stem, _ = os.path.splitext(relative_path)
+        return f"{stem}_redacted.{self.fvr.document_factory.output_extension(file_path)}"
+
+    def _save_outputs(self, relative_path, report):
+        """
+        Запись отчета рядом с анонимизированной копией.
+
+        Returns:
+            dict: Пути к созданным файлам относительно выходного каталога.
+        """
+        outputs = {}
+        if report.output_path:
+            outputs["redacted"] = os.path.relpath(report.output_path, self.output_dir)
+        if self.report_format != "none":
+            report_path = os.path.join(self.output_dir, f"{relative_path}.report.{self.report_format}")
+            report.save_to_file(report_path)
+            outputs["report"] = os.path.relpath(report_path, self.output_dir)
+        return outputs
+
+
+def main(argv=None):
+    """
+    Пакетная анонимизация из командной строки:
+    python -m free_vigilance_reduction INPUT [INPUT ...] -o OUTPUT_DIR
+
+    Returns:
+        int: Код завершения: 0 - без ошибок, 1 - были ошибки обработки.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m free_vigilance_reduction",
+        description="Anonymize documents in files and directory trees. Interrupted runs resume "
+                    "from the journal in the output directory."
+    )
+    parser.add_argument("inputs", nargs="+", help="Input files or directories")
+    parser.add_argument("-o", "--output-dir", required=True, help="Output directory for redacted copies and reports")
+    parser.add_argument("-c", "--config", default=None, help="Configuration file with profiles")
+    parser.add_argument("-p", "--profile", default=None, help="Profile ID (default: the configuration default)")
+    parser.add_argument("--model-path", default=None, help="Path to model files")
+    parser.add_argument("--backend", default="generative",
+                        choices=["generative", "onnx", "token_classification", "remote"], help="Model backend")
+    parser.add_argument("--report-format", default="json", choices=REPORT_FORMATS, help="Report file format")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Worker processes sharing one loaded model (default: 1, in process)")
+    parser.add_argument("--extensions", default=None,
+                        help="Comma-separated extensions to process (default: all supported)")
+    failure = parser.add_mutually_exclusive_group()
+    failure.add_argument("--fail-fast", dest="fail_fast", action="store_true",
+                         help="Stop at the first failed document")
+    failure.add_argument("--continue-on-error", dest="fail_fast", action="store_false",
+                         help="Record failures in the journal and continue (default)")
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.inputs if not os.path.exists(path)]
+    if missing:
+        parser.error(f"input not found: {', '.join(missing)}")
+
+    from .core import FreeVigilanceReduction
+
+    fvr = FreeVigilanceReduction(config_path=args.config, model_path=args.model_path, backend=args.backend)
+    processor = BatchProcessor(
+        fvr, args.output_dir,
+        profile_id=args.profile,
+        report_format=args.report_format,
+        workers=args.workers,
+        fail_fast=args.fail_fast,
+        extensions=args.extensions.split(",") if args.extensions else None
+    )
+    try:
+        stats = processor.run(args.inputs)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        fvr.close()
+
+    print(json.dumps(stats))
+    return 1 if stats["failed"] else 0
@@ -0,0 +1,163 @@
+"""
+Модуль со скомпилированным (неизменяемым) представлением профиля настроек.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from types import MappingProxyType
+
+
+class CompiledProfile:
+    """
+    Неизменяемый снимок профиля настроек с заранее вычисленными производными данными.
+
+    Содержит те же поля, что и ConfigurationProfile (entity_types, replacement_rules,
+    dictionary_settings, custom_entity_prompts), поэтому передается в распознаватель
+    и замену вместо исходного профиля. Дополнительно содержит:
+        content_hash - стабильный хеш содержимого профиля (ключ для внешних кешей);
+        enabled_dictionaries - имена включенных словарей;
+        replacement_lookup - тип сущности -> (метод, плейсхолдер).
+    Компоненты, которым нужны собственные производные данные (текст промпта, токены
+    заголовка промпта, объединенное регулярное выражение, объединенный словарь включенных
+    словарей), сохраняют их в профиле через derived(), поэтому они вычисляются один раз
+    на версию профиля.
+    """
+
+    __slots__ = ("profile_id", "content_hash", "entity_types", "replacement_rules", "dictionary_settings",
+                 "custom_entity_prompts", "enabled_dictionaries", "replacement_lookup", "_derived", "_lock")
+
+    def __init__(self, profile):
+        """
+        Компиляция профиля.
+
+        Args:
+            profile (ConfigurationProfile): Исходный профиль. Изменения исходного профиля
+                                            после компиляции не влияют на снимок.
+        """
+        data = copy.deepcopy(profile.to_dict())
+        set_ = object.__setattr__
+        set_(self, "profile_id", data["profile_id"])
+        set_(self, "content_hash", profile_hash(data))
+        set_(self, "entity_types", tuple(data["entity_types"]))
+        set_(self, "replacement_rules", _freeze(data["replacement_rules"]))
+        set_(self, "dictionary_settings", _freeze(data["dictionary_settings"]))
+        set_(self, "custom_entity_prompts", _freeze(data["custom_entity_prompts"]))
+        set_(self, "enabled_dictionaries", tuple(
+            name for name, settings in data["dictionary_settings"].items() if settings.get("enabled", True)
+        ))
+        set_(self, "replacement_lookup", MappingProxyType({
+            entity_type: (rule.get("method", "mask"), rule.get("placeholder", f"[{entity_type}]"))
+            for entity_type, rule in data["replacement_rules"].items()
+        }))
+        set_(self, "_derived", {})
+        set_(self, "_lock", threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledProfile is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CompiledProfile is immutable")
+
+    def derived(self, key, factory):
+        """
+        Получение производных данных профиля с вычислением при первом обращении.
+
+        Args:
+            key (hashable): Ключ данных; должен учитывать все внешние входные данные factory.
+            factory (callable): Функция без аргументов, вычисляющая значение.
+
+        Returns:
+            Значение, возвращенное factory для этого ключа.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        value = factory()
+        with self._lock:
+            return self._derived.setdefault(key, value)
+
+    def to_dict(self):
+        """
+        Преобразование профиля в словарь.
+
+        Returns:
+            dict: Словарь с настройками профиля.
+        """
+        return {
+            "profile_id": self.profile_id,
+            "entity_types": list(self.entity_types),
+            "replacement_rules": _thaw(self.replacement_rules),
+            "dictionary_settings": _thaw(self.dictionary_settings),
+            "custom_entity_prompts": _thaw(self.custom_entity_prompts)
+        }
+
+    def __repr__(self):
+        return f"CompiledProfile({self.profile_id!r}, {self.content_hash[:12]})"
+
+
+def compile_profile(profile):
+    """
+    Компиляция профиля настроек.
+
+    Args:
+        profile (ConfigurationProfile|CompiledProfile): Профиль.
+
+    Returns:
+        CompiledProfile: Скомпилированный профиль (тот же объект, если он уже скомпилирован).
+    """
+    if isinstance(profile, CompiledProfile):
+        return profile
+    return CompiledProfile(profile)
+
+
+def derived(profile, key, factory):
+    """
+    Производные данные профиля: из кеша скомпилированного профиля
+    или вычисленные заново для обычного ConfigurationProfile.
+
+    Args:
+        profile (ConfigurationProfile|CompiledProfile): Профиль.
+        key (hashable): Ключ данных.
+        factory (callable): Функция без аргументов, вычисляющая значение.
+
+    Returns:
+        Значение factory.
+    """
+    if isinstance(profile, CompiledProfile):
+        return profile.derived(key, factory)
+    return factory()
+
+
+def profile_hash(data):
+    """
+    Стабильный хеш содержимого профиля.
+
+    Args:
+        data (dict): Профиль в виде словаря (ConfigurationProfile.to_dict()).
+
+    Returns:
+        str: SHA-256 канонического JSON-представления.
+    """
+    canonical = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _freeze(value):
+    """Рекурсивное преобразование словарей и списков в неизменяемые аналоги."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """Обратное преобразование результата _freeze в словари и списки."""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
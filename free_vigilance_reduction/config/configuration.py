@@ -5,6 +5,10 @@
 import os
 import json
 import re
+import hashlib
+import threading
+from collections import namedtuple
+from .compiled_profile import CompiledProfile
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -110,6 +114,34 @@ class ConfigurationProfile:
             "custom_entity_prompts": self.custom_entity_prompts
         }
     
+    def validate(self):
+        """
+        Проверка структуры профиля.
+        
+        Raises:
+            ValueError: Если профиль содержит некорректные данные.
+        """
+        if not isinstance(self.profile_id, str) or not re.match(r'^[\w-]+$', self.profile_id):
+            raise ValueError(f"Invalid profile ID: {self.profile_id!r}")
+        if not isinstance(self.entity_types, list) or not all(isinstance(t, str) for t in self.entity_types):
+            raise ValueError(f"Profile '{self.profile_id}': entity_types must be a list of strings")
+        for field in ("replacement_rules", "dictionary_settings"):
+            value = getattr(self, field)
+            if not isinstance(value, dict) or not all(isinstance(item, dict) for item in value.values()):
+                raise ValueError(f"Profile '{self.profile_id}': {field} must map names to objects")
+        if not isinstance(self.custom_entity_prompts, dict) or \
+                not all(isinstance(item, str) for item in self.custom_entity_prompts.values()):
+            raise ValueError(f"Profile '{self.profile_id}': custom_entity_prompts must map types to strings")
+    
+    def compile(self):
+        """
+        Компиляция профиля в неизменяемый снимок с производными данными и хешем содержимого.
+        
+        Returns:
+            CompiledProfile: Скомпилированный профиль.
+        """
+        return CompiledProfile(self)
+    
     def save_to_file(self, file_path):
         """
         Сохранение профиля настроек в файл.
@@ -136,10 +168,18 @@ class ConfigurationProfile:
             raise
 
 
+_ProfileSet = namedtuple("_ProfileSet", ["profiles", "default_profile_id", "compiled", "version"])
+
 
 class ConfigurationManager:
     """
     Управление профилями настроек анонимизации.
+    
+    Набор профилей хранится как единый снимок, который заменяется целиком одним
+    присваиванием. Поэтому запрос, получивший скомпилированный профиль, дорабатывает
+    на своей версии, а следующие запросы получают новую. Файл конфигурации можно
+    отслеживать (watch): изменения читаются, проверяются и компилируются в фоновом
+    потоке, а при ошибке остается действующий набор профилей.
     """
     
     def __init__(self, config_path=None):
@@ -150,15 +190,41 @@ class ConfigurationManager:
             config_path (str, optional): Путь к файлу конфигурации.
                                         По умолчанию используется встроенная конфигурация.
         """
-        self.profiles = {}
-        self.default_profile_id = "default"
+        self.config_path = config_path
+        self._state = _ProfileSet({}, "default", {}, 0)
+        self._compile_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._file_signature = None
+        self._file_hash = None
+        self._watcher = None
+        self._watch_stop = threading.Event()
         
         if config_path and os.path.exists(config_path):
             self.load_profiles(config_path)
         else:
-            self.profiles[self.default_profile_id] = ConfigurationProfile.create_default()
+            self._swap({self.default_profile_id: ConfigurationProfile.create_default()}, self.default_profile_id)
             logger.info("Default profile created")
     
+    @property
+    def profiles(self):
+        """dict: Профили действующего набора по идентификаторам."""
+        return self._state.profiles
+    
+    @property
+    def default_profile_id(self):
+        """str: Идентификатор профиля по умолчанию."""
+        return self._state.default_profile_id
+    
+    @default_profile_id.setter
+    def default_profile_id(self, profile_id):
+        with self._compile_lock:
+            self._state = self._state._replace(default_profile_id=profile_id)
+    
+    @property
+    def version(self):
+        """int: Номер версии набора профилей; увеличивается при каждой замене набора."""
+        return self._state.version
+    
     def get_profile(self, profile_id):
         """
         Получение профиля настроек по идентификатору.
@@ -169,10 +235,51 @@ class ConfigurationManager:
         Returns:
             ConfigurationProfile: Профиль настроек.
         """
-        if profile_id not in self.profiles:
+        state = self._state
+        if profile_id not in state.profiles:
+            logger.warning(f"Profile '{profile_id}' not found. Using default profile.")
+            return state.profiles[state.default_profile_id]
+        return state.profiles[profile_id]
+    
+    def get_compiled_profile(self, profile_id=None):
+        """
+        Получение скомпилированного профиля. Результат компиляции запоминается
+        до изменения профиля через save_profile, load_profiles или перезагрузку файла.
+        
+        Args:
+            profile_id (str, optional): Идентификатор профиля. По умолчанию - профиль по умолчанию
+                                        того же набора, из которого берется результат.
+        
+        Returns:
+            CompiledProfile: Скомпилированный профиль.
+        """
+        state = self._state
+        if profile_id is None:
+            profile_id = state.default_profile_id
+        elif profile_id not in state.profiles:
             logger.warning(f"Profile '{profile_id}' not found. Using default profile.")
-            return self.profiles[self.default_profile_id]
-        return self.profiles[profile_id]
+            profile_id = state.default_profile_id
+        compiled = state.compiled.get(profile_id)
+        if compiled is None:
+            with self._compile_lock:
+                compiled = state.compiled.get(profile_id)
+                if compiled is None:
+                    compiled = state.compiled[profile_id] = state.profiles[profile_id].compile()
+                    logger.debug(f"Profile '{profile_id}' compiled: {compiled.content_hash}")
+        return compiled
+    
+    def invalidate_compiled(self, profile_id=None):
+        """
+        Сброс скомпилированных профилей после изменения профиля на месте.
+        
+        Args:
+            profile_id (str, optional): Идентификатор профиля. По умолчанию сбрасываются все.
+        """
+        with self._compile_lock:
+            compiled = {} if profile_id is None else {
+                key: value for key, value in self._state.compiled.items() if key != profile_id
+            }
+            self._state = self._state._replace(compiled=compiled)
     
     def get_default_profile(self):
         """
@@ -181,7 +288,8 @@ class ConfigurationManager:
         Returns:
             ConfigurationProfile: Профиль настроек по умолчанию.
         """
-        return self.profiles[self.default_profile_id]
+        state = self._state
+        return state.profiles[state.default_profile_id]
     
     def save_profile(self, profile):
         """
@@ -192,7 +300,10 @@ class ConfigurationManager:
         """
         if not re.match(r'^[\w-]+$', profile.profile_id):
             raise ValueError("Profile ID contains invalid characters")
-        self.profiles[profile.profile_id] = profile
+        with self._reload_lock:
+            state = self._state
+            self._swap(dict(state.profiles, **{profile.profile_id: profile}), state.default_profile_id,
+                       reuse={key: value for key, value in state.compiled.items() if key != profile.profile_id})
         logger.info(f"Profile '{profile.profile_id}' saved")
     
     def get_available_profiles(self):
@@ -202,26 +313,158 @@ class ConfigurationManager:
         Returns:
             list: Список идентификаторов доступных профилей.
         """
-        return list(self.profiles.keys())
+        return list(self._state.profiles.keys())
     
     def load_profiles(self, config_path):
+        """
+        Загрузка профилей из файла конфигурации с добавлением к действующему набору.
+        
+        Args:
+            config_path (str): Путь к файлу конфигурации.
+        """
         try:
-            with open(config_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            for profile_data in data.get('profiles', []):
-                profile = ConfigurationProfile.from_dict(profile_data)
-                self.profiles[profile.profile_id] = profile
-            
-            if 'default_profile_id' in data:
-                self.default_profile_id = data['default_profile_id']
-            
-            if self.default_profile_id not in self.profiles:
-                self.profiles[self.default_profile_id] = ConfigurationProfile.create_default()
-                logger.warning(f"Default profile '{self.default_profile_id}' not found in config. Created default profile.")
-            
+            with self._reload_lock:
+                signature = _file_signature(config_path)
+                profiles, default_profile_id, content_hash = self._read_profiles(config_path, self._state.profiles)
+                self._swap(dict(self._state.profiles, **profiles), default_profile_id)
+                if config_path == self.config_path:
+                    self._file_signature, self._file_hash = signature, content_hash
             logger.info(f"Profiles loaded from {config_path}")
         except Exception as e:
             logger.error(f"Error loading profiles from {config_path}: {str(e)}")
             raise
+    
+    def reload(self, force=False):
+        """
+        Перечитывание файла конфигурации, если он изменился.
+        Новый набор профилей полностью заменяет действующий (профили, удаленные
+        из файла, исчезают). Все профили проверяются и компилируются до замены;
+        для профилей с неизменным содержимым сохраняются прежние скомпилированные
+        объекты вместе с их производными данными. При ошибке действующий набор
+        не меняется.
+        
+        Args:
+            force (bool, optional): Перечитать файл, даже если его метаданные не изменились.
+        
+        Returns:
+            bool: True, если набор профилей был заменен.
+        """
+        if not self.config_path:
+            return False
+        
+        with self._reload_lock:
+            try:
+                signature = _file_signature(self.config_path)
+            except OSError as e:
+                if self._file_signature is not None:
+                    logger.warning(f"Config file {self.config_path} is unavailable: {str(e)}")
+                    self._file_signature = None
+                return False
+            if signature == self._file_signature and not force:
+                return False
+            self._file_signature = signature
+            
+            try:
+                profiles, default_profile_id, content_hash = self._read_profiles(self.config_path)
+                if content_hash == self._file_hash and not force:
+                    return False
+                compiled = {}
+                previous = self._state.compiled
+                for profile_id, profile in profiles.items():
+                    candidate = profile.compile()
+                    old = previous.get(profile_id)
+                    compiled[profile_id] = old if old is not None and old.content_hash == candidate.content_hash \
+                        else candidate
+            except Exception as e:
+                logger.error(f"Config reload from {self.config_path} failed, keeping version "
+                             f"{self.version}: {str(e)}")
+                return False
+            
+            self._swap(profiles, default_profile_id, reuse=compiled)
+            self._file_hash = content_hash
+        
+        logger.info(f"Profiles reloaded from {self.config_path} (version {self.version})")
+        return True
+    
+    def watch(self, interval=2.0):
+        """
+        Запуск фонового потока, отслеживающего изменения файла конфигурации.
+        
+        Args:
+            interval (float, optional): Период проверки метаданных файла в секундах.
+        """
+        if not self.config_path:
+            raise ValueError("Config path is not set")
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._watch_stop.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, args=(interval,),
+                                         name="fvr-config-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self.config_path} for changes every {interval}s")
+    
+    def stop_watching(self, timeout=None):
+        """
+        Остановка отслеживания файла конфигурации.
+        
+        Args:
+            timeout (float, optional): Максимальное время ожидания потока в секундах.
+        """
+        self._watch_stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout)
+            self._watcher = None
+    
+    def _watch_loop(self, interval):
+        """Цикл опроса файла конфигурации."""
+        while not self._watch_stop.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Config watcher error: {str(e)}")
+    
+    def _read_profiles(self, config_path, existing=None):
+        """
+        Чтение и проверка профилей из файла конфигурации без изменения состояния менеджера.
+        
+        Args:
+            config_path (str): Путь к файлу конфигурации.
+            existing (dict, optional): Профили, к которым будут добавлены прочитанные.
+        
+        Returns:
+            tuple: (профили по идентификаторам, идентификатор профиля по умолчанию, хеш содержимого файла).
+        """
+        with open(config_path, 'rb') as file:
+            raw = file.read()
+        data = json.loads(raw.decode('utf-8'))
+        
+        profiles = {}
+        for profile_data in data.get('profiles', []):
+            profile = ConfigurationProfile.from_dict(profile_data)
+            profile.validate()
+            profiles[profile.profile_id] = profile
+        
+        default_profile_id = data.get('default_profile_id', self.default_profile_id)
+        if default_profile_id not in profiles and default_profile_id not in (existing or {}):
+            profiles[default_profile_id] = ConfigurationProfile.create_default()
+            logger.warning(f"Default profile '{default_profile_id}' not found in config. Created default profile.")
+        
+        return profiles, default_profile_id, hashlib.sha256(raw).hexdigest()
+    
+    def _swap(self, profiles, default_profile_id, reuse=None):
+        """
+        Атомарная замена набора профилей.
+        
+        Args:
+            profiles (dict): Новый набор профилей.
+            default_profile_id (str): Идентификатор профиля по умолчанию.
+            reuse (dict, optional): Уже скомпилированные профили, переносимые в новый набор.
+        """
+        with self._compile_lock:
+            self._state = _ProfileSet(profiles, default_profile_id, dict(reuse or {}), self._state.version + 1)
+
 
+def _file_signature(file_path):
+    """Метаданные файла, по изменению которых определяется необходимость перечитывания."""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
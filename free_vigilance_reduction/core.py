@@ -7,7 +7,13 @@ from .documents.document_factory import DocumentFactory
 from .entity_recognition.entity_recognizer import EntityRecognizer
 from .data_replacement.data_replacer import DataReplacer
 from .reporting.reduction_report import ReductionReport
+from .reporting.async_observer import AsyncObserver
 from .utils.logging import get_logger
+from .utils.timing import StageTimer, stage
+from .utils.profiling import new_request_id
+from .utils.normalization import TextNormalizer
+from .entity_recognition.scheduler import ScheduledModelBackend, request_priority
+from contextlib import nullcontext
 
 logger = get_logger(__name__)
 
@@ -16,7 +22,9 @@ class FreeVigilanceReduction:
     Основной класс библиотеки.
     """
     
-    def __init__(self, config_path=None, model_path=None):
+    def __init__(self, config_path=None, model_path=None, pseudonym_store=None, backend="generative",
+                 profiler=None, config_poll_interval=None, scheduler=None, normalize_text=True,
+                 detection_processes=None):
         """
         Инициализация FreeVigilanceReduction.
         
@@ -24,51 +32,68 @@ class FreeVigilanceReduction:
             config_path (str, optional): Путь к файлу конфигурации. 
                                         По умолчанию используется встроенная конфигурация.
             model_path (str, optional): Путь к файлам языковой модели.
+            pseudonym_store (PseudonymStore, optional): Хранилище псевдонимов для метода замены "pseudonym".
+            backend (str|ModelBackend, optional): Модель для поиска сущностей. По умолчанию "generative".
+            profiler (RequestProfiler, optional): Профилировщик запросов. Без него профилирование
+                                                  полностью отключено.
+            config_poll_interval (float, optional): Период проверки файла конфигурации в секундах.
+                                                    Если задан, профили перезагружаются при изменении
+                                                    файла без перезапуска и без перезагрузки модели.
+            scheduler (TokenBudgetScheduler, optional): Планировщик обращений к модели. Окна текста
+                                                        ставятся в очередь по приоритету запроса:
+                                                        reduce_text - "interactive",
+                                                        reduce_document - "bulk".
+            normalize_text (bool, optional): Искать сущности в нормализованном тексте (склеенные
+                                             переносы, обычные пробелы вместо особых, составная
+                                             форма Unicode). Замены выполняются в исходном тексте.
+                                             По умолчанию True.
+            detection_processes (int, optional): Количество процессов для поиска регулярными
+                                                 выражениями и словарями в документах от миллиона
+                                                 символов. Поиск идет одновременно с обращениями
+                                                 к языковой модели.
         """
         logger.info("Initializing FreeVigilanceReduction")
         self.config_manager = ConfigurationManager(config_path)
+        if config_poll_interval and config_path:
+            self.config_manager.watch(config_poll_interval)
         self.document_factory = DocumentFactory()
         
         if model_path is None:
             model_path = "models/vikhr-gemma-2b-instruct"
         
         try:
-            self.entity_recognizer = EntityRecognizer(model_path)
+            self.entity_recognizer = EntityRecognizer(model_path, backend=backend,
+                                                      detection_processes=detection_processes)
         except Exception as e:
             logger.error(f"Failed to load model: {str(e)}")
             raise
         
-        self.data_replacer = DataReplacer()
-        self.observers = []
+        if scheduler is not None:
+            self.entity_recognizer.language_model = ScheduledModelBackend(
+                self.entity_recognizer.language_model, scheduler
+            )
         
-        self._register_default_processors()
+        self.text_normalizer = TextNormalizer() if normalize_text else None
+        self.data_replacer = DataReplacer(pseudonym_store)
+        self.profiler = profiler
+        self.observers = []
         
         logger.info("FreeVigilanceReduction initialized successfully")
     
-    def _register_default_processors(self):
-        """Регистрация стандартных обработчиков документов."""
-        from .documents.txt_processor import TxtProcessor
-        self.document_factory.register_processor('txt', TxtProcessor)
-        
-        try:
-            from .documents.docx_processor import DocxProcessor
-            self.document_factory.register_processor('docx', DocxProcessor)
-        except ImportError:
-            logger.warning("DocxProcessor not available. DOCX support disabled.")
-        
-        try:
-            from .documents.pdf_processor import PdfProcessor
-            self.document_factory.register_processor('pdf', PdfProcessor)
-        except ImportError:
-            logger.warning("PdfProcessor not available. PDF support disabled.")
-
-    def reduce_document(self, file_path, profile_id=None):
+    def reduce_document(self, file_path, profile_id=None, request_id=None, profiling=None, output_dir=None,
+                        priority="bulk"):
         """
         Анонимизация документа.
         
         Args:
             file_path (str): Путь к документу.
             profile_id (str, optional): Идентификатор профиля настроек.
+            request_id (str, optional): Идентификатор запроса. По умолчанию генерируется.
+            profiling (bool, optional): Профилировать запрос (True/False).
+                                        По умолчанию решает профилировщик по sample_rate.
+            output_dir (str, optional): Каталог для анонимизированной копии.
+                                        По умолчанию - каталог исходного документа.
+            priority (str, optional): Полоса приоритета планировщика обращений к модели.
         
         Returns:
             ReductionReport: Отчет о результатах анонимизации.
@@ -76,26 +101,38 @@ class FreeVigilanceReduction:
         logger.info(f"Processing document: {file_path}")
         
         self._notify_observers_start(document=file_path)
+        request_id = request_id or new_request_id()
+        timer = StageTimer()
         
         try:
-            document = self.document_factory.create_document(file_path)
-            
-            text = document.get_text()
-            
-            profile = self.config_manager.get_profile(
-                profile_id or self.config_manager.default_profile_id
-            )
-            
-            entities = self.entity_recognizer.detect_entities(text, profile)
-            self._notify_observers_entities_detected(entities)
+            with self._profile_request(request_id, profiling) as profiling_artifacts, \
+                    timer.activate(), request_priority(priority), stage("total"):
+                document = self.document_factory.create_document(file_path)
+                
+                with stage("extraction"):
+                    text = document.get_text()
+                
+                profile = self.config_manager.get_compiled_profile(profile_id)
+                
+                entities = self._detect_entities(text, profile)
+                self._notify_observers_entities_detected(entities)
+                
+                with stage("replacement"):
+                    reduced_text, replacements = self.data_replacer.reduce_text(text, entities, profile)
+                self._notify_observers_text_reduced(reduced_text)
+                
+                with stage("output"):
+                    output_path = document.create_redacted_copy(reduced_text, output_dir)
+                
+                with stage("report"):
+                    report = ReductionReport(text, reduced_text, entities, replacements)
             
-            reduced_text, replacements = self.data_replacer.reduce_text(text, entities, profile)
-            self._notify_observers_text_reduced(reduced_text)
-            
-            document.create_redacted_copy(reduced_text)
-            
-            report = ReductionReport(text, reduced_text, entities, replacements)
+            report.request_id = request_id
+            report.profiling_artifacts = profiling_artifacts
+            report.profile_hash = profile.content_hash
+            report.output_path = output_path
             
+            self._notify_observers_stage_timing(timer.timings)
             self._notify_observers_complete(report)
             
             logger.info(f"Document processed successfully: {file_path}")
@@ -103,40 +140,50 @@ class FreeVigilanceReduction:
             
         except Exception as e:
             logger.error(f"Error processing document: {str(e)}")
-            self._notify_observers_error(e)
+            self._notify_observers_failure(timer.timings, e)
             raise
     
-    def reduce_text(self, text, profile_id=None):
+    def reduce_text(self, text, profile_id=None, request_id=None, profiling=None, priority="interactive"):
         """
         Анонимизация текста.
         
         Args:
             text (str): Текст для анонимизации.
             profile_id (str, optional): Идентификатор профиля настроек.
+            request_id (str, optional): Идентификатор запроса. По умолчанию генерируется.
+            profiling (bool, optional): Профилировать запрос (True/False).
+                                        По умолчанию решает профилировщик по sample_rate.
+            priority (str, optional): Полоса приоритета планировщика обращений к модели.
         
         Returns:
             ReductionReport: Отчет о результатах анонимизации.
         """
         logger.info("Processing text")
         self._notify_observers_start(text=text)
+        request_id = request_id or new_request_id()
+        timer = StageTimer()
         
         try:
-            profile = self.config_manager.get_profile(
-                profile_id or self.config_manager.default_profile_id
-            )
-            print(f"Используется профиль: {profile.profile_id}")
-            logger.info(f"Using profile: {profile.profile_id}")
+            with self._profile_request(request_id, profiling) as profiling_artifacts, \
+                    timer.activate(), request_priority(priority), stage("total"):
+                profile = self.config_manager.get_compiled_profile(profile_id)
+                logger.info(f"Using profile: {profile.profile_id}")
+                
+                entities = self._detect_entities(text, profile)
+                self._notify_observers_entities_detected(entities)
+                
+                with stage("replacement"):
+                    reduced_text, replacements = self.data_replacer.reduce_text(text, entities, profile)
+                self._notify_observers_text_reduced(reduced_text)
+                
+                with stage("report"):
+                    report = ReductionReport(text, reduced_text, entities, replacements)
             
-            entities = self.entity_recognizer.detect_entities(text, profile)
-            print(57)
-            print(len(entities))
-            self._notify_observers_entities_detected(entities)
-            
-            reduced_text, replacements = self.data_replacer.reduce_text(text, entities, profile)
-            self._notify_observers_text_reduced(reduced_text)
-            
-            report = ReductionReport(text, reduced_text, entities, replacements)
+            report.request_id = request_id
+            report.profiling_artifacts = profiling_artifacts
+            report.profile_hash = profile.content_hash
             
+            self._notify_observers_stage_timing(timer.timings)
             self._notify_observers_complete(report)
             
             logger.info("Text processed successfully")
@@ -144,29 +191,104 @@ class FreeVigilanceReduction:
             
         except Exception as e:
             logger.error(f"Error processing text: {str(e)}")
-            self._notify_observers_error(e)
+            self._notify_observers_failure(timer.timings, e)
             raise
     
-    def register_observer(self, observer):
+    def _detect_entities(self, text, profile):
+        """
+        Обнаружение сущностей в нормализованном тексте.
+        
+        Args:
+            text (str): Исходный текст.
+            profile (ConfigurationProfile): Профиль настроек.
+        
+        Returns:
+            list: Список сущностей с позициями в исходном тексте.
+        """
+        if self.text_normalizer is None:
+            with stage("detection"):
+                return self.entity_recognizer.detect_entities(text, profile)
+        
+        with stage("normalization"):
+            normalized = self.text_normalizer.normalize(text)
+        with stage("detection"):
+            entities = self.entity_recognizer.detect_entities(normalized.text, profile)
+        return normalized.map_entities(entities)
+    
+    def _profile_request(self, request_id, profiling):
+        """
+        Контекст профилирования запроса.
+        
+        Args:
+            request_id (str): Идентификатор запроса.
+            profiling (bool): Явное требование профилирования или None.
+        
+        Returns:
+            Контекстный менеджер, возвращающий словарь путей к артефактам.
+        """
+        if self.profiler is None or not self.profiler.should_profile(profiling):
+            return nullcontext({})
+        return self.profiler.profile(request_id)
+    
+    def register_observer(self, observer, mode="sync", queue_size=1000, full_policy="block"):
         """
         Регистрация наблюдателя процесса анонимизации.
         
         Args:
             observer: Объект, реализующий интерфейс ProcessingObserver.
+            mode (str, optional): "sync" - события доставляются в потоке обработки;
+                                  "async" - через ограниченную очередь и отдельный поток наблюдателя.
+            queue_size (int, optional): Размер очереди в режиме "async".
+            full_policy (str, optional): Поведение при заполненной очереди: "block" или "drop".
         """
+        if mode == "async":
+            observer = AsyncObserver(observer, queue_size=queue_size, full_policy=full_policy)
+        elif mode != "sync":
+            raise ValueError(f"Unknown observer mode: {mode}")
         self.observers.append(observer)
         logger.debug(f"Observer registered: {observer}")
     
     def unregister_observer(self, observer):
         """
-        Отмена регистрации наблюдателя.
+        Отмена регистрации наблюдателя. Оставшиеся события асинхронного наблюдателя
+        доставляются до возврата из метода.
         
         Args:
             observer: Объект, реализующий интерфейс ProcessingObserver.
         """
-        if observer in self.observers:
-            self.observers.remove(observer)
-            logger.debug(f"Observer unregistered: {observer}")
+        for registered in list(self.observers):
+            if registered is observer or getattr(registered, "observer", None) is observer:
+                self.observers.remove(registered)
+                if isinstance(registered, AsyncObserver):
+                    registered.close()
+                logger.debug(f"Observer unregistered: {observer}")
+    
+    def flush_observers(self, timeout=None):
+        """
+        Ожидание доставки событий всем асинхронным наблюдателям.
+        
+        Args:
+            timeout (float, optional): Максимальное время ожидания каждого наблюдателя в секундах.
+        
+        Returns:
+            bool: True, если все события доставлены.
+        """
+        return all([
+            observer.flush(timeout) for observer in self.observers if isinstance(observer, AsyncObserver)
+        ])
+    
+    def close(self):
+        """
+        Завершение работы: доставка оставшихся событий, остановка потоков наблюдателей
+        и отслеживания файла конфигурации.
+        """
+        self.config_manager.stop_watching()
+        for observer in self.observers:
+            if isinstance(observer, AsyncObserver):
+                observer.close()
+        self.observers = [
+            observer for observer in self.observers if not isinstance(observer, AsyncObserver)
+        ]
     
     def _notify_observers_start(self, document=None, text=None):
         """Уведомление наблюдателей о начале обработки."""
@@ -183,12 +305,27 @@ class FreeVigilanceReduction:
         for observer in self.observers:
             observer.on_text_reduced(reduced_text)
     
+    def _notify_observers_stage_timing(self, timings):
+        """Уведомление наблюдателей о длительности этапов обработки."""
+        for observer in self.observers:
+            for stage_name, duration in timings.items():
+                observer.on_stage_timing(stage_name, duration)
+    
     def _notify_observers_complete(self, report):
         """Уведомление наблюдателей о завершении обработки."""
         for observer in self.observers:
             observer.on_process_complete(report)
     
-    def _notify_observers_error(self, error):
-        """Уведомление наблюдателей об ошибке."""
+    def _notify_observers_failure(self, timings, error):
+        """
+        Уведомление наблюдателей о длительности этапов и ошибке обработки.
+        Исключение наблюдателя записывается в лог и не подменяет исходную ошибку,
+        а остальные наблюдатели получают уведомления.
+        """
         for observer in self.observers:
-            observer.on_error(error)
+            try:
+                for stage_name, duration in timings.items():
+                    observer.on_stage_timing(stage_name, duration)
+                observer.on_error(error)
+            except Exception as e:
+                logger.error(f"Observer {observer} failed while handling an error: {str(e)}", exc_info=True)
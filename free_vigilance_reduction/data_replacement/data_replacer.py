@@ -2,7 +2,10 @@
 Модуль для замены персональных данных в тексте.
 """
 
+import inspect
 import re
+from .pseudonym_store import PseudonymStore
+from ..plugins import REPLACEMENT_RULES_GROUP, PluginRegistry
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -13,15 +16,22 @@ class DataReplacer:
     Класс для замены персональных данных в тексте.
     """
     
-    def __init__(self):
+    def __init__(self, pseudonym_store=None):
         """
         Инициализация заменителя данных.
+        
+        Args:
+            pseudonym_store (PseudonymStore, optional): Хранилище псевдонимов для метода "pseudonym".
+                                                       По умолчанию создается в памяти при первом использовании.
         """
+        self.pseudonym_store = pseudonym_store
         self.replacement_rules = {
             "mask": self._mask_replacement,
             "stars": self._stars_replacement,
-            "remove": self._remove_replacement
+            "remove": self._remove_replacement,
+            "pseudonym": self._pseudonym_replacement
         }
+        self.rule_plugins = PluginRegistry(REPLACEMENT_RULES_GROUP)
         logger.info("DataReplacer initialized")
     
     def register_replacement_rule(self, rule_name, rule_func):
@@ -30,11 +40,28 @@ class DataReplacer:
         
         Args:
             rule_name (str): Имя правила.
-            rule_func (callable): Функция замены.
+            rule_func (callable): Функция замены (текст, плейсхолдер) -> замена. Если функция
+                                  принимает параметр entity_type, ей передается тип сущности.
         """
         self.replacement_rules[rule_name] = rule_func
         logger.debug(f"Registered replacement rule: {rule_name}")
     
+    def _load_rule_plugins(self, lookup):
+        """
+        Регистрация правил замены из точек входа группы
+        "free_vigilance_reduction.replacement_rules" для методов профиля,
+        которые еще не зарегистрированы. Функция правила принимает исходный
+        текст и плейсхолдер и возвращает замену.
+        
+        Args:
+            lookup (dict): Таблица правил профиля: тип сущности -> (метод, плейсхолдер).
+        """
+        for method, _ in lookup.values():
+            if method not in self.replacement_rules and method in self.rule_plugins:
+                rule = self.rule_plugins.get(method)
+                if rule is not None:
+                    self.register_replacement_rule(method, rule)
+    
     def reduce_text(self, text, entities, profile):
         """
         Анонимизация текста.
@@ -55,18 +82,24 @@ class DataReplacer:
         
         reduced_text = text
         
+        lookup = self._replacement_lookup(profile)
+        self._load_rule_plugins(lookup)
+        rules = self._resolve_rules(lookup)
+        
         for entity in sorted_entities:
-            if entity.entity_type in profile.replacement_rules:
-                rule_config = profile.replacement_rules[entity.entity_type]
-                method = rule_config.get("method", "mask")
-                placeholder = rule_config.get("placeholder", f"[{entity.entity_type}]")
+            if entity.entity_type in lookup:
+                method, placeholder = lookup[entity.entity_type]
                 
-                if method in self.replacement_rules:
+                if method in rules:
                     original_text = entity.text
                     start_pos = entity.start_pos
                     end_pos = entity.end_pos
                     
-                    replacement = self.replacement_rules[method](original_text, placeholder)
+                    rule, takes_entity_type = rules[method]
+                    if takes_entity_type:
+                        replacement = rule(original_text, placeholder, entity_type=entity.entity_type)
+                    else:
+                        replacement = rule(original_text, placeholder)
                     reduced_text = reduced_text[:start_pos] + replacement + reduced_text[end_pos:]
                     
                     if entity.entity_type not in replacements:
@@ -78,7 +111,7 @@ class DataReplacer:
                         "position": (start_pos, end_pos)
                     })
                     
-                    logger.debug(f"Replaced {entity.entity_type} '{original_text}' with '{replacement}'")
+                    logger.debug("Replaced %s '%s' with '%s'", entity.entity_type, original_text, replacement)
                 else:
                     logger.warning(f"Unknown replacement method: {method}")
             else:
@@ -86,6 +119,42 @@ class DataReplacer:
         
         return reduced_text, replacements
     
+    def _resolve_rules(self, lookup):
+        """
+        Функции замены для методов профиля.
+        
+        Args:
+            lookup (dict): Таблица правил профиля: тип сущности -> (метод, плейсхолдер).
+            
+        Returns:
+            dict: Метод -> (функция, принимает ли она entity_type).
+        """
+        rules = {}
+        for method, _ in lookup.values():
+            if method not in rules and method in self.replacement_rules:
+                rule = self.replacement_rules[method]
+                rules[method] = (rule, _accepts_entity_type(rule))
+        return rules
+    
+    def _replacement_lookup(self, profile):
+        """
+        Таблица правил замены профиля: тип сущности -> (метод, плейсхолдер).
+        Для скомпилированного профиля берется готовая таблица.
+        
+        Args:
+            profile (ConfigurationProfile): Профиль настроек.
+            
+        Returns:
+            dict: Таблица правил.
+        """
+        lookup = getattr(profile, "replacement_lookup", None)
+        if lookup is None:
+            lookup = {
+                entity_type: (rule.get("method", "mask"), rule.get("placeholder", f"[{entity_type}]"))
+                for entity_type, rule in profile.replacement_rules.items()
+            }
+        return lookup
+    
     def _mask_replacement(self, text, placeholder):
         """
         Замена текста на маску.
@@ -124,3 +193,33 @@ class DataReplacer:
             str: Пустая строка.
         """
         return ""
+    
+    def _pseudonym_replacement(self, text, placeholder, entity_type=None):
+        """
+        Замена текста на стабильный псевдоним.
+        Одинаковые значения одного типа всегда получают одинаковый номер.
+        
+        Args:
+            text (str): Исходный текст.
+            placeholder (str): Маска, в которую подставляется номер псевдонима.
+            entity_type (str, optional): Тип сущности. По умолчанию используется маска.
+            
+        Returns:
+            str: Псевдоним, например "[ФИО-17]".
+        """
+        if self.pseudonym_store is None:
+            self.pseudonym_store = PseudonymStore()
+        
+        seq = self.pseudonym_store.get_pseudonym(entity_type or placeholder, text)
+        if placeholder.endswith("]"):
+            return f"{placeholder[:-1]}-{seq}]"
+        return f"{placeholder}-{seq}"
+
+
+def _accepts_entity_type(rule):
+    """Проверка, принимает ли функция замены параметр entity_type."""
+    try:
+        parameters = inspect.signature(rule).parameters
+    except (TypeError, ValueError):
+        return False
+    return "entity_type" in parameters or any(p.kind is p.VAR_KEYWORD for p in parameters.values())
@@ -0,0 +1,337 @@
+"""
+Модуль для согласованной псевдонимизации персональных данных.
+"""
+
+import hashlib
+import hmac
+import json
+import mmap
+import os
+import re
+import secrets
+import struct
+import threading
+from ..utils.logging import get_logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = get_logger(__name__)
+
+
+class PseudonymStore:
+    """
+    Хранилище псевдонимов.
+
+    Каждой паре (тип сущности, нормализованный оригинал) сопоставляется
+    стабильный порядковый номер. Ключом записи служит HMAC-SHA256 от пары,
+    поэтому сами персональные данные в хранилище не попадают.
+
+    Таблица разбита на шарды; каждый шард - файл с хеш-таблицей открытой
+    адресации, отображенный в память через mmap. Поиск выполняется за O(1)
+    без блокировок, вставка - под файловой блокировкой шарда, поэтому
+    несколько процессов, открывших один каталог, получают одинаковые
+    псевдонимы без центрального сервиса.
+
+    Шарды начинают с небольшой емкости и удваиваются при заполнении:
+    новая таблица записывается во временный файл и атомарно заменяет
+    прежнюю, номера записей сохраняются. Процессы, отобразившие прежнюю
+    таблицу, продолжают находить в ней старые записи, а при промахе
+    под блокировкой переоткрывают шард.
+    """
+
+    MAGIC = b"FVRPSN01"
+    HEADER = struct.Struct("<8sIIQ")
+    SLOT = struct.Struct("<16sQ")
+    MAX_LOAD_FACTOR = 0.75
+
+    def __init__(self, path=None, secret_key=None, shards=16, shard_capacity=1 << 10):
+        """
+        Инициализация хранилища псевдонимов.
+
+        Args:
+            path (str, optional): Каталог хранилища. Если не указан,
+                                  таблица хранится в памяти процесса.
+            secret_key (bytes|str, optional): Ключ HMAC. По умолчанию берется из
+                                  переменной окружения FVR_PSEUDONYM_KEY, затем
+                                  из файла ключа в каталоге хранилища.
+            shards (int, optional): Количество шардов.
+            shard_capacity (int, optional): Начальное количество слотов в одном шарде.
+        """
+        self.path = path
+        self._local_locks = []
+        self._lock_files = []
+        # Шард -> (буфер, емкость, файл); кортеж заменяется целиком, чтобы поиск
+        # без блокировки не видел буфер одной таблицы с емкостью другой
+        self._tables = []
+        self._retired = []
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            shards, shard_capacity = self._load_meta(shards, shard_capacity)
+
+        self.shards = shards
+        self.shard_capacity = shard_capacity
+        self.secret_key = self._resolve_key(secret_key)
+
+        for shard_index in range(shards):
+            self._local_locks.append(threading.Lock())
+            if path is None:
+                buffer = self._new_table(shard_index, shard_capacity, 0)
+                self._lock_files.append(None)
+                self._tables.append((buffer, shard_capacity, None))
+            else:
+                lock_fd = os.open(self._shard_path(shard_index, ".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+                self._lock_files.append(os.fdopen(lock_fd, 'r+b'))
+                self._tables.append(None)
+                with self._shard_lock(shard_index):
+                    self._tables[shard_index] = self._open_shard(shard_index)
+
+        logger.info(f"PseudonymStore initialized ({'in-memory' if path is None else path}, {shards} shards)")
+
+    @staticmethod
+    def normalize(text):
+        """
+        Нормализация оригинального значения перед хешированием.
+
+        Args:
+            text (str): Исходный текст сущности.
+
+        Returns:
+            str: Нормализованный текст.
+        """
+        return re.sub(r'\s+', ' ', text).strip().casefold().replace('ё', 'е')
+
+    def get_pseudonym(self, entity_type, original):
+        """
+        Получение номера псевдонима для сущности.
+
+        Args:
+            entity_type (str): Тип сущности.
+            original (str): Исходный текст сущности.
+
+        Returns:
+            int: Стабильный номер псевдонима.
+        """
+        key = self._digest(entity_type, original)
+        shard_index = key[0] % self.shards
+
+        seq = self._probe(self._tables[shard_index], key)
+        if seq:
+            return seq
+
+        with self._shard_lock(shard_index):
+            # Повторный поиск под блокировкой: запись могла появиться в другом процессе,
+            # а таблица - увеличиться
+            self._refresh(shard_index)
+            return self._probe(self._tables[shard_index], key) or self._insert(shard_index, key)
+
+    def close(self):
+        """
+        Закрытие файлов хранилища.
+        """
+        for buffer, _, file in self._tables + self._retired:
+            if isinstance(buffer, mmap.mmap):
+                buffer.flush()
+                buffer.close()
+            if file is not None:
+                file.close()
+        for lock_file in self._lock_files:
+            if lock_file is not None:
+                lock_file.close()
+        self._tables = []
+        self._retired = []
+        self._lock_files = []
+
+    def _digest(self, entity_type, original):
+        """Вычисление ключа записи."""
+        message = f"{entity_type}\x00{self.normalize(original)}".encode('utf-8')
+        return hmac.new(self.secret_key, message, hashlib.sha256).digest()[:16]
+
+    def _probe(self, table, key):
+        """Поиск ключа в таблице шарда. Возвращает номер псевдонима или 0."""
+        buffer, capacity, _ = table
+        index = int.from_bytes(key[1:9], 'little') % capacity
+        empty = bytes(16)
+
+        for _ in range(capacity):
+            offset = self.HEADER.size + index * self.SLOT.size
+            slot_key, seq = self.SLOT.unpack_from(buffer, offset)
+            if slot_key == key and seq:
+                return seq
+            if slot_key == empty:
+                return 0
+            index = (index + 1) % capacity
+        return 0
+
+    def _place(self, buffer, capacity, key, seq):
+        """Запись ключа в первый свободный слот по цепочке проб."""
+        index = int.from_bytes(key[1:9], 'little') % capacity
+        empty = bytes(16)
+        while True:
+            offset = self.HEADER.size + index * self.SLOT.size
+            if self.SLOT.unpack_from(buffer, offset)[0] == empty:
+                self.SLOT.pack_into(buffer, offset, key, seq)
+                return
+            index = (index + 1) % capacity
+
+    def _insert(self, shard_index, key):
+        """Вставка ключа в шард. Вызывается под блокировкой шарда."""
+        buffer, capacity, _ = self._tables[shard_index]
+        count = self.HEADER.unpack_from(buffer, 0)[3]
+        if count + 1 > capacity * self.MAX_LOAD_FACTOR:
+            self._grow(shard_index)
+            buffer, capacity, _ = self._tables[shard_index]
+
+        # Номера не пересекаются между шардами
+        seq = count * self.shards + shard_index + 1
+        self._place(buffer, capacity, key, seq)
+        self.HEADER.pack_into(buffer, 0, self.MAGIC, capacity, shard_index, count + 1)
+        return seq
+
+    def _grow(self, shard_index):
+        """
+        Перенос записей шарда в таблицу удвоенной емкости. Вызывается под блокировкой шарда.
+        """
+        buffer, capacity, file = self._tables[shard_index]
+        count = self.HEADER.unpack_from(buffer, 0)[3]
+        new_capacity = capacity * 2
+        table = self._new_table(shard_index, new_capacity, count)
+        for slot in range(capacity):
+            key, seq = self.SLOT.unpack_from(buffer, self.HEADER.size + slot * self.SLOT.size)
+            if seq:
+                self._place(table, new_capacity, key, seq)
+        logger.info(f"Pseudonym store shard {shard_index} grown to {new_capacity} slots ({count} entries)")
+
+        if self.path is None:
+            self._tables[shard_index] = (table, new_capacity, None)
+            return
+
+        file_path = self._shard_path(shard_index, ".tbl")
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(table)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, file_path)
+        # Прежнее отображение может читаться другими потоками без блокировки,
+        # поэтому оно закрывается только в close()
+        self._retired.append((buffer, capacity, file))
+        self._tables[shard_index] = self._open_shard(shard_index)
+
+    def _refresh(self, shard_index):
+        """Переоткрытие шарда, если другой процесс заменил его файл. Вызывается под блокировкой."""
+        if self.path is None:
+            return
+        buffer, capacity, file = self._tables[shard_index]
+        if os.stat(self._shard_path(shard_index, ".tbl")).st_ino != os.fstat(file.fileno()).st_ino:
+            self._retired.append((buffer, capacity, file))
+            self._tables[shard_index] = self._open_shard(shard_index)
+
+    def _new_table(self, shard_index, capacity, count):
+        """Создание пустой таблицы шарда в памяти."""
+        buffer = bytearray(self.HEADER.size + capacity * self.SLOT.size)
+        self.HEADER.pack_into(buffer, 0, self.MAGIC, capacity, shard_index, count)
+        return buffer
+
+    def _shard_lock(self, shard_index):
+        """Получение блокировки шарда (внутрипроцессной и файловой)."""
+        return _ShardLock(self._local_locks[shard_index], self._lock_files[shard_index])
+
+    def _shard_path(self, shard_index, suffix):
+        """Путь к файлу шарда."""
+        return os.path.join(self.path, f"shard-{shard_index:03d}{suffix}")
+
+    def _open_shard(self, shard_index):
+        """Открытие или создание файла шарда. Вызывается под блокировкой шарда."""
+        file_path = self._shard_path(shard_index, ".tbl")
+        fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o600)
+        file = os.fdopen(fd, 'r+b')
+        file.seek(0, os.SEEK_END)
+        if file.tell() == 0:
+            file.write(self._new_table(shard_index, self.shard_capacity, 0))
+            file.flush()
+
+        try:
+            buffer = mmap.mmap(file.fileno(), 0)
+            magic, capacity, index, _ = self.HEADER.unpack_from(buffer, 0)
+        except (ValueError, struct.error):
+            file.close()
+            raise ValueError(f"Corrupted pseudonym store shard: {file_path}")
+        if magic != self.MAGIC or index != shard_index or len(buffer) < self.HEADER.size + capacity * self.SLOT.size:
+            buffer.close()
+            file.close()
+            raise ValueError(f"Corrupted pseudonym store shard: {file_path}")
+        return buffer, capacity, file
+
+    def _load_meta(self, shards, shard_capacity):
+        """Чтение или создание параметров хранилища."""
+        meta_path = os.path.join(self.path, "meta.json")
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"shards": shards, "shard_capacity": shard_capacity}, file)
+        try:
+            # link атомарно создает файл только если его еще нет
+            os.link(tmp_path, meta_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        return meta["shards"], meta["shard_capacity"]
+
+    def _resolve_key(self, secret_key):
+        """Определение ключа HMAC."""
+        if secret_key is None:
+            secret_key = os.environ.get("FVR_PSEUDONYM_KEY")
+
+        if secret_key is None and self.path is not None:
+            key_path = os.path.join(self.path, "key")
+            if not os.path.exists(key_path):
+                tmp_path = f"{key_path}.{os.getpid()}.{threading.get_ident()}"
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, 'w') as file:
+                    file.write(secrets.token_hex(32))
+                try:
+                    os.link(tmp_path, key_path)
+                except FileExistsError:
+                    pass
+                finally:
+                    os.remove(tmp_path)
+            with open(key_path, 'r') as file:
+                secret_key = file.read().strip()
+
+        if secret_key is None:
+            secret_key = secrets.token_hex(32)
+            logger.warning("No pseudonym key configured. Pseudonyms are consistent within this process only.")
+
+        if isinstance(secret_key, str):
+            secret_key = secret_key.encode('utf-8')
+        return secret_key
+
+
+class _ShardLock:
+    """
+    Блокировка шарда: мьютекс потоков и flock для других процессов.
+    """
+
+    def __init__(self, thread_lock, file):
+        self.thread_lock = thread_lock
+        self.file = file
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.file is not None and fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.file is not None and fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.thread_lock.release()
+        return False
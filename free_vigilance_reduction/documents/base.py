@@ -15,6 +15,9 @@ class Document(ABC):
     Определяет интерфейс для обработчиков различных форматов документов.
     """
     
+    # Расширение анонимизированной копии (без точки); None - расширение исходного файла
+    OUTPUT_EXTENSION = None
+    
     def __init__(self, file_path):
         """
         Инициализация документа.
@@ -43,12 +46,13 @@ class Document(ABC):
         pass
     
     @abstractmethod
-    def create_redacted_copy(self, reduced_text):
+    def create_redacted_copy(self, reduced_text, output_dir=None):
         """
         Создание анонимизированной копии документа.
         
         Args:
             reduced_text (str): Анонимизированный текст.
+            output_dir (str, optional): Каталог для копии. По умолчанию - каталог исходного документа.
             
         Returns:
             str: Путь к созданному файлу.
@@ -74,17 +78,28 @@ class Document(ABC):
         _, ext = os.path.splitext(self.file_path)
         return ext.lower()[1:]
     
-    def get_output_path(self, suffix="_redacted"):
+    def get_output_path(self, suffix="_redacted", extension=None, output_dir=None):
         """
         Формирование пути для сохранения обработанного файла.
         
         Args:
             suffix (str, optional): Суффикс для имени файла. По умолчанию "_redacted".
+            extension (str, optional): Расширение (без точки). По умолчанию - OUTPUT_EXTENSION
+                                       или расширение исходного файла.
+            output_dir (str, optional): Каталог для файла (создается при необходимости).
+                                        По умолчанию - каталог исходного документа.
             
         Returns:
             str: Путь для сохранения файла.
         """
         filename, ext = os.path.splitext(self.file_path)
+        if extension is None:
+            extension = self.OUTPUT_EXTENSION
+        if extension is not None:
+            ext = f".{extension}"
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            filename = os.path.join(output_dir, os.path.basename(filename))
         return f"{filename}{suffix}{ext}"
     
     def extract_metadata(self):
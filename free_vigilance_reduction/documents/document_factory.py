@@ -3,21 +3,31 @@
 """
 
 import os
+from ..plugins import PROCESSORS_GROUP, PluginRegistry
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Модули обработчиков импортируются при первом документе соответствующего формата
+DEFAULT_PROCESSORS = {
+    "txt": "free_vigilance_reduction.documents.txt_processor:TxtProcessor",
+    "docx": "free_vigilance_reduction.documents.docx_processor:DocProcessor",
+    "pdf": "free_vigilance_reduction.documents.pdf_processor:PdfProcessor",
+}
+
 
 class DocumentFactory:
     """
     Фабрика для создания объектов документов различных форматов.
+    Кроме стандартных обработчиков доступны обработчики из точек входа
+    группы "free_vigilance_reduction.processors" установленных пакетов.
     """
     
     def __init__(self):
         """
         Инициализация фабрики документов.
         """
-        self.processors = {}
+        self.processors = PluginRegistry(PROCESSORS_GROUP, DEFAULT_PROCESSORS)
         logger.info("DocumentFactory initialized")
     
     def register_processor(self, extension, processor_class):
@@ -26,9 +36,10 @@ class DocumentFactory:
         
         Args:
             extension (str): Расширение файла (без точки).
-            processor_class: Класс обработчика документа.
+            processor_class: Класс обработчика документа или ссылка "модуль:класс"
+                             для импорта при первом документе этого формата.
         """
-        self.processors[extension.lower()] = processor_class
+        self.processors.register(extension.lower(), processor_class)
         logger.debug(f"Registered processor for extension: {extension}")
     
     def create_document(self, file_path):
@@ -48,19 +59,38 @@ class DocumentFactory:
         extension = ext.lower()[1:]
         
         if extension not in self.processors:
-            supported = ", ".join(self.processors.keys())
+            supported = ", ".join(self.get_supported_formats())
             logger.error(f"Unsupported file format: {extension}. Supported formats: {supported}")
             raise ValueError(f"Unsupported file forma: {extension}. Supported formats: {supported}")
         
-        processor_class = self.processors[extension]
+        try:
+            processor_class = self.processors.load(extension)
+        except ImportError as e:
+            logger.error(f"Processor for {extension} is not available: {str(e)}")
+            raise ValueError(f"Processor for {extension} is not available: {str(e)}") from e
         logger.info(f"Creating document processor for {file_path}")
         return processor_class(file_path)
     
+    def output_extension(self, file_path):
+        """
+        Расширение анонимизированной копии документа без его открытия.
+        
+        Args:
+            file_path (str): Путь к файлу документа.
+            
+        Returns:
+            str: Расширение (без точки). Если обработчик недоступен - расширение исходного файла.
+        """
+        _, ext = os.path.splitext(file_path)
+        processor_class = self.processors.get(ext.lower()[1:])
+        extension = getattr(processor_class, "OUTPUT_EXTENSION", None)
+        return extension if extension is not None else ext[1:]
+    
     def get_supported_formats(self):
         """
-        Получение списка поддерживаемых форматов.
+        Получение списка поддерживаемых форматов без импорта обработчиков.
         
         Returns:
             list: Список поддерживаемых расширений файлов.
         """
-        return list(self.processors.keys())
+        return self.processors.names()
@@ -6,10 +6,10 @@ class DocProcessor(Document):
         doc = docx.Document(self.file_path)
         return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
 
-    def create_redacted_copy(self, reduced_text):
+    def create_redacted_copy(self, reduced_text, output_dir=None):
         doc = docx.Document()
         for paragraph in reduced_text.split('\n'):
             doc.add_paragraph(paragraph)
-        output_path = self.file_path.replace('.docx', '_redacted.docx')
+        output_path = self.get_output_path(output_dir=output_dir)
         doc.save(output_path)
         return output_path
\ No newline at end of file
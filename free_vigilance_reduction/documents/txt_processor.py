@@ -5,8 +5,8 @@ class TxtProcessor(Document):
         with open(self.file_path, 'r', encoding='utf-8') as file:
             return file.read()
 
-    def create_redacted_copy(self, reduced_text):
-        output_path = self.file_path.replace('.txt', '_redacted.txt')
+    def create_redacted_copy(self, reduced_text, output_dir=None):
+        output_path = self.get_output_path(output_dir=output_dir)
         with open(output_path, 'w', encoding='utf-8') as file:
             file.write(reduced_text)
         return output_path
\ No newline at end of file
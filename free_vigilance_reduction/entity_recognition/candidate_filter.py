@@ -0,0 +1,208 @@
+"""
+Модуль для предварительного отбора фрагментов текста, которые могут содержать персональные данные.
+"""
+
+import re
+from ..config.compiled_profile import derived
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class CandidateFilter:
+    """
+    Быстрый фильтр предложений перед обработкой языковой моделью.
+    Каждое предложение оценивается по дешевым признакам (слова с заглавной буквы
+    не в начале предложения, последовательности цифр, символ @, адресные
+    ключевые слова, близкие совпадения со словарями); модели передаются
+    только предложения-кандидаты, упакованные в окна.
+    Слово с заглавной буквы в начале предложения учитывается, только если в другом
+    месте документа слово с той же основой написано с заглавной буквы не в начале
+    предложения ("Иванов пришел домой." при упоминании "пациента Иванова").
+    """
+
+    ADDRESS_KEYWORDS = {
+        "г", "гор", "город", "ул", "улица", "пр", "пр-т", "просп", "проспект",
+        "пер", "переулок", "пл", "площадь", "б-р", "бульвар", "ш", "шоссе",
+        "наб", "набережная", "д", "дом", "кв", "квартира", "корп", "корпус",
+        "стр", "строение", "обл", "область", "р-н", "район", "пос", "поселок",
+        "с", "село", "дер", "деревня", "мкр", "микрорайон", "адрес", "индекс"
+    }
+    # Сокращения, после точки которых предложение не заканчивается
+    ABBREVIATIONS = ADDRESS_KEYWORDS | {
+        "т", "е", "п", "др", "пр", "им", "тел", "см", "ст", "руб", "коп", "тыс", "млн", "гг", "вв",
+        "рт", "мм", "мг", "мл", "сут", "мин", "сек", "ч", "ед", "напр", "прим", "рис", "табл"
+    }
+    STEM_LENGTH = 5
+
+    _WORD_PATTERN = re.compile(r"[\w-]+")
+    _DIGITS_PATTERN = re.compile(r"\d{2,}")
+    _SENTENCE_END_PATTERN = re.compile(r"[.!?…]+(?=\s)|\n")
+
+    def __init__(self, dictionary_manager=None, min_score=1):
+        """
+        Инициализация фильтра.
+
+        Args:
+            dictionary_manager (DictionaryManager, optional): Менеджер словарей для поиска близких совпадений.
+            min_score (int, optional): Минимальная оценка предложения-кандидата.
+        """
+        self.dictionary_manager = dictionary_manager
+        self.min_score = min_score
+        self._stem_cache = {}
+
+    def split_sentences(self, text):
+        """
+        Разбиение текста на предложения.
+        Точка после сокращений ("г.", "ул.", "Тел.") не считается концом предложения.
+
+        Args:
+            text (str): Текст для анализа.
+
+        Returns:
+            list: Список кортежей (начало, конец) предложений.
+        """
+        spans = []
+        start = 0
+        for match in self._SENTENCE_END_PATTERN.finditer(text):
+            end = match.end()
+            if match.group() == '.':
+                word_start = end - 1
+                while word_start > start and text[word_start - 1].isalpha():
+                    word_start -= 1
+                word = text[word_start:end - 1]
+                if word.lower() in self.ABBREVIATIONS:
+                    continue
+            if text[start:end].strip():
+                spans.append((start, end))
+            start = end
+        if text[start:].strip():
+            spans.append((start, len(text)))
+        return spans
+
+    def score_sentence(self, sentence, stems=frozenset(), proper_stems=frozenset()):
+        """
+        Оценка предложения по признакам наличия персональных данных.
+
+        Args:
+            sentence (str): Текст предложения.
+            stems (set, optional): Основы словарных терминов.
+            proper_stems (set, optional): Основы слов документа, написанных с заглавной
+                                          буквы не в начале предложения.
+
+        Returns:
+            int: Количество сработавших признаков.
+        """
+        score = 0
+        if '@' in sentence:
+            score += 1
+        if self._DIGITS_PATTERN.search(sentence):
+            score += 1
+
+        for index, match in enumerate(self._WORD_PATTERN.finditer(sentence)):
+            word = match.group()
+            lower = word.lower()
+            if word[0].isupper() and (index > 0 or lower[:self.STEM_LENGTH] in proper_stems):
+                score += 1
+            elif lower in self.ADDRESS_KEYWORDS and (len(lower) > 1 or sentence[match.end():match.end() + 1] == '.'):
+                # Однобуквенные сокращения ("г.", "д.") учитываются только с точкой
+                score += 1
+            elif stems and lower[:self.STEM_LENGTH] in stems:
+                score += 1
+            if score >= self.min_score:
+                break
+        return score
+
+    def proper_stems(self, text, sentences):
+        """
+        Основы слов, написанных с заглавной буквы не в начале предложения.
+
+        Args:
+            text (str): Текст.
+            sentences (list): Пары (начало, конец) предложений.
+
+        Returns:
+            frozenset: Основы слов в нижнем регистре.
+        """
+        stems = set()
+        for start, end in sentences:
+            for index, match in enumerate(self._WORD_PATTERN.finditer(text, start, end)):
+                word = match.group()
+                if index > 0 and word[0].isupper():
+                    stems.add(word[:self.STEM_LENGTH].lower())
+        return frozenset(stems)
+
+    def select_windows(self, text, profile, window_size):
+        """
+        Отбор предложений-кандидатов и упаковка их в окна.
+
+        Args:
+            text (str): Текст для анализа.
+            profile (ConfigurationProfile): Профиль настроек.
+            window_size (int): Максимальный размер окна в символах.
+
+        Returns:
+            list: Список кортежей (смещение окна, текст окна); текст окна совпадает
+                  с фрагментом исходного текста, начинающимся со смещения.
+        """
+        stems = self._get_dictionary_stems(profile)
+        sentences = self.split_sentences(text)
+        proper_stems = self.proper_stems(text, sentences)
+        windows = []
+        window_start = None
+        window_parts = []
+        window_length = 0
+        selected_chars = 0
+
+        for start, end in sentences:
+            sentence = text[start:end]
+            if self.score_sentence(sentence, stems, proper_stems) < self.min_score:
+                continue
+            selected_chars += len(sentence)
+
+            # Окно содержит только смежные предложения, иначе смещение не соответствует тексту
+            if window_parts and start != window_start + window_length:
+                windows.append((window_start, "".join(window_parts)))
+                window_parts, window_length = [], 0
+
+            # Слишком длинные предложения режутся на части размером с окно
+            for offset in range(0, len(sentence), window_size):
+                part = sentence[offset:offset + window_size]
+                if window_parts and window_length + len(part) > window_size:
+                    windows.append((window_start, "".join(window_parts)))
+                    window_parts, window_length = [], 0
+                if not window_parts:
+                    window_start = start + offset
+                window_parts.append(part)
+                window_length += len(part)
+
+        if window_parts:
+            windows.append((window_start, "".join(window_parts)))
+
+        logger.debug(f"Candidate filter selected {selected_chars} of {len(text)} characters in {len(windows)} windows")
+        return windows
+
+    def _get_dictionary_stems(self, profile):
+        """Получение основ терминов из включенных в профиле словарей."""
+        if self.dictionary_manager is None:
+            return frozenset()
+
+        dictionaries = tuple(
+            (name, self.dictionary_manager.dictionaries[name])
+            for name in self.dictionary_manager.enabled_dictionaries(profile)
+            if name in self.dictionary_manager.dictionaries
+        )
+        key = ("candidate_stems", tuple((name, id(d), d.version) for name, d in dictionaries))
+        return derived(profile, key, lambda: self._collect_stems(dictionaries))
+
+    def _collect_stems(self, dictionaries):
+        """Объединение основ терминов нескольких словарей."""
+        stems = set()
+        for dict_name, dictionary in dictionaries:
+            version = (id(dictionary), dictionary.version)
+            cached = self._stem_cache.get(dict_name)
+            if cached is None or cached[0] != version:
+                cached = (version, frozenset(term[:self.STEM_LENGTH] for term in dictionary.terms))
+                self._stem_cache[dict_name] = cached
+            stems |= cached[1]
+        return frozenset(stems)
@@ -0,0 +1,233 @@
+"""
+Модуль для генерации, ограниченной копированием фрагментов исходного текста.
+"""
+
+import bisect
+from collections import defaultdict
+import torch
+from transformers import LogitsProcessor
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class TokenIndex:
+    """
+    Отсортированный индекс текстов токенов словаря.
+    Позволяет бинарным поиском найти все токены, начинающиеся с заданной строки.
+    """
+
+    def __init__(self, tokenizer):
+        """
+        Построение индекса по словарю токенизатора.
+
+        Args:
+            tokenizer: Токенизатор модели.
+        """
+        anchor_ids = tokenizer.encode("a", add_special_tokens=False)[:1]
+        anchor_text = tokenizer.decode(anchor_ids)
+        special_ids = set(tokenizer.all_special_ids)
+        vocab_size = len(tokenizer)
+
+        # Текст токена в середине последовательности (с ведущим пробелом, если он есть)
+        decoded = tokenizer.batch_decode([anchor_ids + [token_id] for token_id in range(vocab_size)])
+
+        texts = defaultdict(list)
+        for token_id, text in enumerate(decoded):
+            if token_id in special_ids or not text.startswith(anchor_text):
+                continue
+            text = text[len(anchor_text):]
+            if text and '�' not in text:
+                texts[text].append(token_id)
+
+        self.texts = sorted(texts)
+        self.token_ids = [texts[text] for text in self.texts]
+        self.text_by_id = {token_id: text for text, ids in texts.items() for token_id in ids}
+        self.vocab_size = vocab_size
+        logger.debug(f"TokenIndex built for {len(self.texts)} token texts")
+
+
+class CopyGrammar:
+    """
+    Посимвольный автомат грамматики ответа "[TYPE: span]".
+    Тип ограничен типами профиля, а текст сущности - подстроками исходного текста.
+
+    Состояния:
+        ("out",) - между сущностями;
+        ("type", префикс) - внутри "TYPE: ";
+        ("span", позиции, длина) - внутри сущности; позиции - концы вхождений
+        уже сгенерированной части в исходный текст (None - любые позиции).
+    """
+
+    SEPARATORS = " \n\t,;"
+    OUT = ("out",)
+
+    def __init__(self, source_text, entity_types):
+        """
+        Инициализация автомата.
+
+        Args:
+            source_text (str): Текст, из которого можно копировать сущности.
+            entity_types (list): Допустимые типы сущностей.
+        """
+        self.source_text = source_text
+        self.targets = {f"{entity_type}: " for entity_type in entity_types}
+        self.char_positions = defaultdict(list)
+        for position, char in enumerate(source_text):
+            self.char_positions[char].append(position)
+
+    def next_chars(self, state):
+        """
+        Символы, допустимые в данном состоянии.
+
+        Args:
+            state (tuple): Состояние автомата.
+
+        Returns:
+            set: Допустимые символы.
+        """
+        if state[0] == "out":
+            return set(self.SEPARATORS) | {"["}
+        if state[0] == "type":
+            prefix = state[1]
+            return {t[len(prefix)] for t in self.targets if t.startswith(prefix) and len(t) > len(prefix)}
+
+        _, positions, length = state
+        if positions is None:
+            chars = set(self.char_positions)
+        else:
+            chars = {self.source_text[q] for q in positions if q < len(self.source_text)}
+        if length:
+            chars.add("]")
+        return chars
+
+    def step(self, state, char):
+        """
+        Переход автомата по символу.
+
+        Args:
+            state (tuple): Состояние автомата.
+            char (str): Символ.
+
+        Returns:
+            tuple: Новое состояние или None, если символ недопустим.
+        """
+        if state[0] == "out":
+            if char in self.SEPARATORS:
+                return state
+            return ("type", "") if char == "[" else None
+
+        if state[0] == "type":
+            prefix = state[1] + char
+            if prefix in self.targets:
+                return ("span", None, 0)
+            if any(t.startswith(prefix) for t in self.targets):
+                return ("type", prefix)
+            return None
+
+        _, positions, length = state
+        if char == "]":
+            return self.OUT if length else None
+        if positions is None:
+            candidates = self.char_positions.get(char, ())
+        else:
+            candidates = [q for q in positions if q < len(self.source_text) and self.source_text[q] == char]
+        if not candidates:
+            return None
+        return ("span", frozenset(q + 1 for q in candidates), length + 1)
+
+    def advance(self, state, text):
+        """
+        Переход автомата по строке.
+
+        Args:
+            state (tuple): Состояние автомата.
+            text (str): Строка.
+
+        Returns:
+            tuple: Новое состояние или None.
+        """
+        for char in text:
+            state = self.step(state, char)
+            if state is None:
+                return None
+        return state
+
+
+class CopyConstrainedLogitsProcessor(LogitsProcessor):
+    """
+    Обработчик логитов, разрешающий только токены, совместимые с грамматикой
+    "[TYPE: span]", где span - подстрока исходного текста.
+    Конец генерации разрешен только между сущностями.
+    """
+
+    def __init__(self, token_index, source_text, entity_types, prompt_length, eos_token_ids):
+        """
+        Инициализация обработчика.
+
+        Args:
+            token_index (TokenIndex): Индекс словаря.
+            source_text (str): Текст, из которого можно копировать сущности.
+            entity_types (list): Допустимые типы сущностей.
+            prompt_length (int): Длина промпта в токенах.
+            eos_token_ids (iterable): Токены конца последовательности.
+        """
+        self.token_index = token_index
+        self.grammar = CopyGrammar(source_text, entity_types)
+        self.prompt_length = prompt_length
+        self.eos_token_ids = [t for t in eos_token_ids if t is not None]
+        self.state = CopyGrammar.OUT
+        self.processed = 0
+
+    def allowed_token_ids(self, generated_ids):
+        """
+        Допустимые следующие токены.
+
+        Args:
+            generated_ids (list): Уже сгенерированные токены (без промпта).
+
+        Returns:
+            list: Идентификаторы допустимых токенов.
+        """
+        for token_id in generated_ids[self.processed:]:
+            next_state = self.grammar.advance(self.state, self.token_index.text_by_id.get(token_id, ""))
+            self.state = next_state if next_state is not None else CopyGrammar.OUT
+        self.processed = len(generated_ids)
+
+        allowed = []
+        self._collect(self.state, "", 0, len(self.token_index.texts), allowed)
+        if self.state == CopyGrammar.OUT or not allowed:
+            allowed.extend(self.eos_token_ids)
+        return allowed
+
+    def _collect(self, state, prefix, lo, hi, allowed):
+        """Обход индекса словаря вдоль допустимых переходов автомата."""
+        texts = self.token_index.texts
+        for char in self.grammar.next_chars(state):
+            next_prefix = prefix + char
+            next_lo = bisect.bisect_left(texts, next_prefix, lo, hi)
+            next_hi = bisect.bisect_left(texts, next_prefix + '\U0010ffff', next_lo, hi)
+            if next_lo == next_hi:
+                continue
+            next_state = self.grammar.step(state, char)
+            if next_state is None:
+                continue
+            if texts[next_lo] == next_prefix:
+                allowed.extend(self.token_index.token_ids[next_lo])
+            self._collect(next_state, next_prefix, next_lo, next_hi, allowed)
+
+    def __call__(self, input_ids, scores):
+        """
+        Маскирование недопустимых токенов.
+
+        Args:
+            input_ids (torch.LongTensor): Текущая последовательность.
+            scores (torch.FloatTensor): Логиты следующего токена.
+
+        Returns:
+            torch.FloatTensor: Логиты с маской.
+        """
+        allowed = self.allowed_token_ids(input_ids[0, self.prompt_length:].tolist())
+        mask = torch.full_like(scores, float("-inf"))
+        mask[:, allowed] = 0
+        return scores + mask
@@ -5,6 +5,8 @@
 import re
 from .entity import Entity
 
+_WORD = re.compile(r'\b\w+\b')
+
 
 class Dictionary:
     """
@@ -16,6 +18,8 @@ class Dictionary:
         Инициализация словаря.
         """
         self.terms = {}
+        # Номер изменения словаря; по нему инвалидируются производные кеши
+        self.version = 0
 
     def add_term(self, term, entity_type):
         """
@@ -26,24 +30,23 @@ class Dictionary:
             entity_type (str): Тип сущности.
         """
         self.terms[term.lower()] = entity_type
+        self.version += 1
 
-    def find_matches(self, text):
+    def find_matches(self, text, start=0, end=None):
         """
         Поиск совпадений терминов в тексте.
         
         Args:
             text (str): Текст для анализа.
+            start (int, optional): Начало просматриваемого фрагмента текста.
+            end (int, optional): Конец просматриваемого фрагмента. По умолчанию - конец текста.
             
         Returns:
-            list: Список найденных сущностей.
+            list: Список найденных сущностей с позициями в тексте.
         """
         matches = []
-        words = re.findall(r'\b\w+\b', text.lower())
-        print(17957)
-        print(words)
-        for i, word in enumerate(words):
-            if word in self.terms:
-                start = text.lower().find(word)
-                end = start + len(word)
-                matches.append(Entity(text[start:end], self.terms[word], start, end))
+        for match in _WORD.finditer(text, start, len(text) if end is None else end):
+            entity_type = self.terms.get(match.group().lower())
+            if entity_type is not None:
+                matches.append(Entity(match.group(), entity_type, match.start(), match.end()))
         return matches
@@ -3,6 +3,7 @@
 """
 
 from .dictionary import Dictionary
+from ..config.compiled_profile import derived
 
 
 class DictionaryManager:
@@ -31,19 +32,71 @@ class DictionaryManager:
                 dictionary.add_term(term, entity_type)
         self.dictionaries[name] = dictionary
 
-    def find_matches(self, text, profile):
+    def find_matches(self, text, profile, start=0, end=None):
         """
         Поиск совпадений во всех словарях.
         
         Args:
             text (str): Текст для анализа.
             profile (ConfigurationProfile): Профиль настроек.
+            start (int, optional): Начало просматриваемого фрагмента текста.
+            end (int, optional): Конец просматриваемого фрагмента. По умолчанию - конец текста.
             
         Returns:
             list: Список найденных сущностей.
         """
-        matches = []
-        for dict_name, settings in profile.dictionary_settings.items():
-            if settings.get('enabled', True) and dict_name in self.dictionaries:
-                matches.extend(self.dictionaries[dict_name].find_matches(text))
-        return matches
+        matcher = self.matcher(profile)
+        if matcher is None:
+            return []
+        return matcher.find_matches(text, start, end)
+
+    def matcher(self, profile):
+        """
+        Словарь, объединяющий все включенные в профиле словари, чтобы текст
+        просматривался один раз. Для скомпилированного профиля сохраняется в нем
+        и строится заново, только если словари были перезагружены или дополнены.
+        Термин, который есть в нескольких словарях, получает тип из словаря,
+        указанного в профиле первым.
+
+        Args:
+            profile (ConfigurationProfile): Профиль настроек.
+
+        Returns:
+            Dictionary: Объединенный словарь или None, если включенных словарей нет.
+        """
+        dictionaries = tuple(
+            (name, self.dictionaries[name])
+            for name in self.enabled_dictionaries(profile)
+            if name in self.dictionaries
+        )
+        if not dictionaries:
+            return None
+        if len(dictionaries) == 1:
+            return dictionaries[0][1]
+        key = ("dictionary_matcher", tuple((name, id(d), d.version) for name, d in dictionaries))
+        return derived(profile, key, lambda: self._merge(dictionaries))
+
+    @staticmethod
+    def _merge(dictionaries):
+        """Объединение словарей; при совпадении терминов действует первый словарь."""
+        merged = Dictionary()
+        for _, dictionary in reversed(dictionaries):
+            merged.terms.update(dictionary.terms)
+        return merged
+
+    def enabled_dictionaries(self, profile):
+        """
+        Имена словарей, включенных в профиле.
+        
+        Args:
+            profile (ConfigurationProfile): Профиль настроек.
+            
+        Returns:
+            tuple: Имена словарей.
+        """
+        names = getattr(profile, "enabled_dictionaries", None)
+        if names is None:
+            names = tuple(
+                name for name, settings in profile.dictionary_settings.items() if settings.get('enabled', True)
+            )
+        return names
@@ -8,7 +8,7 @@ class Entity:
     Класс для представления обнаруженной сущности в тексте.
     """
     
-    def __init__(self, text, entity_type, start_pos, end_pos):
+    def __init__(self, text, entity_type, start_pos, end_pos, source=None):
         """
         Инициализация сущности.
         
@@ -17,11 +17,13 @@ class Entity:
             entity_type (str): Тип сущности (PER, LOC, ORG и т.д.).
             start_pos (int): Начальная позиция в тексте.
             end_pos (int): Конечная позиция в тексте.
+            source (str, optional): Способ обнаружения ("regex", "dictionary", "model").
         """
         self.text = text
         self.entity_type = entity_type
         self.start_pos = start_pos
         self.end_pos = end_pos
+        self.source = source
     
     def __str__(self):
         """
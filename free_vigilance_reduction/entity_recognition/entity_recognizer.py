@@ -5,8 +5,13 @@
 import re
 from .entity import Entity
 from .dictionary_manager import DictionaryManager
-from .language_model import LanguageModel
+from .candidate_filter import CandidateFilter
+from .model_backend import create_backend
+from .parallel_detection import ParallelDetector
+from ..config.compiled_profile import derived
+from ..plugins import PATTERNS_GROUP, PluginRegistry
 from ..utils.logging import get_logger
+from ..utils.timing import stage
 
 logger = get_logger(__name__)
 
@@ -16,16 +21,30 @@ class EntityRecognizer:
     Класс для распознавания сущностей в тексте.
     """
     
-    def __init__(self, model_path):
+    def __init__(self, model_path, use_candidate_filter=True, backend="generative", detection_processes=None):
         """
         Инициализация распознавателя сущностей.
         
         Args:
             model_path (str): Путь к файлам языковой модели.
+            use_candidate_filter (bool, optional): Передавать языковой модели только
+                                                   предложения-кандидаты. По умолчанию True.
+            backend (str|ModelBackend, optional): Модель для поиска сущностей: "generative"
+                                                  (генеративная LLM), "onnx" (та же LLM через
+                                                  ONNX Runtime на CPU), "token_classification"
+                                                  (NER-энкодер), "remote" (сервер модели с загрузкой
+                                                  в процессе, если сервер не запущен) или готовый
+                                                  объект ModelBackend.
+            detection_processes (int, optional): Количество процессов для поиска регулярными
+                                                 выражениями и словарями в больших документах.
+                                                 По умолчанию поиск выполняется в текущем процессе.
         """
         self.patterns = {}
+        self.pattern_plugins = PluginRegistry(PATTERNS_GROUP)
         self.dictionary_manager = DictionaryManager()
-        self.language_model = LanguageModel(model_path)
+        self.candidate_filter = CandidateFilter(self.dictionary_manager) if use_candidate_filter else None
+        self.language_model = create_backend(backend, model_path)
+        self.parallel_detector = ParallelDetector(detection_processes) if detection_processes else None
         logger.info("EntityRecognizer initialized")
 
     def register_pattern(self, entity_type, pattern):
@@ -39,35 +58,131 @@ class EntityRecognizer:
         self.patterns[entity_type] = re.compile(pattern)
         logger.debug(f"Registered pattern for entity type: {entity_type}")
 
+    def _load_pattern_plugins(self, profile):
+        """
+        Регистрация регулярных выражений из точек входа группы
+        "free_vigilance_reduction.patterns" для типов сущностей профиля,
+        у которых еще нет выражения. Модуль выражения импортируется, когда
+        тип впервые встречается в профиле.
+        
+        Args:
+            profile (ConfigurationProfile): Профиль настроек.
+        """
+        for entity_type in profile.entity_types:
+            if entity_type not in self.patterns and entity_type in self.pattern_plugins:
+                pattern = self.pattern_plugins.get(entity_type)
+                if pattern is not None:
+                    self.register_pattern(entity_type, pattern)
+
     def _remove_overlapping_entities(self, entities):
         """
         Устранение перекрывающихся сущностей.
+        Из пересекающихся сущностей остается начинающаяся раньше, а при одинаковом
+        начале - найденная раньше (регулярные выражения, затем словари, затем модель).
         
         Args:
             entities (list): Список найденных сущностей.
             
         Returns:
-            list: Список сущностей без перекрытий.
+            list: Список сущностей без перекрытий в порядке позиций.
         """
         sorted_entities = sorted(entities, key=lambda e: e.start_pos)
     
         non_overlapping = []
-        seen = set()
+        last_end = None
         
         for entity in sorted_entities:
-            entity_key = (entity.text, entity.entity_type)
-            if entity_key in seen:
-                continue
-            
-            if not any(
-                (entity.start_pos < e.end_pos and entity.end_pos > e.start_pos)
-                for e in non_overlapping
-            ):
+            # Оставленные сущности упорядочены и не пересекаются, поэтому достаточно
+            # сравнить начало с концом последней из них
+            if last_end is None or entity.start_pos >= last_end:
                 non_overlapping.append(entity)
-                seen.add(entity_key)
+                last_end = entity.end_pos
         
         return non_overlapping
 
+    def _mark_source(self, entities, source):
+        """
+        Отметка способа обнаружения у сущностей, для которых он еще не указан.
+        
+        Args:
+            entities (list): Список сущностей.
+            source (str): Способ обнаружения.
+        """
+        for entity in entities:
+            if entity.source is None:
+                entity.source = source
+
+    def _find_pattern_matches(self, text, profile, start=0, end=None):
+        """
+        Поиск сущностей с помощью регулярных выражений.
+        
+        Args:
+            text (str): Текст для анализа.
+            profile (ConfigurationProfile): Профиль настроек.
+            start (int, optional): Начало просматриваемого фрагмента текста. Текст перед ним
+                                   учитывается границами слов и ретроспективными проверками.
+            end (int, optional): Конец просматриваемого фрагмента. По умолчанию - конец текста.
+            
+        Returns:
+            list: Список найденных сущностей.
+        """
+        combined, group_types, separate = derived(
+            profile, self._patterns_key(profile), lambda: self._compile_patterns(profile)
+        )
+        if end is None:
+            end = len(text)
+        
+        entities = []
+        if combined is not None:
+            for match in combined.finditer(text, start, end):
+                entity_type = group_types[match.lastgroup]
+                entities.append(Entity(match.group(), entity_type, match.start(), match.end(), "regex"))
+        for entity_type, pattern in separate:
+            for match in pattern.finditer(text, start, end):
+                entities.append(Entity(match.group(), entity_type, match.start(), match.end(), "regex"))
+        logger.debug(f"Found {len(entities)} entities using regex")
+        return entities
+
+    def _patterns_key(self, profile):
+        """
+        Ключ набора регулярных выражений для профиля: учитывает сами выражения,
+        поэтому регистрация нового выражения не требует сброса кеша.
+        """
+        return ("regex", tuple(
+            (entity_type, self.patterns[entity_type].pattern, self.patterns[entity_type].flags)
+            for entity_type in profile.entity_types if entity_type in self.patterns
+        ))
+
+    def _compile_patterns(self, profile):
+        """
+        Объединение регулярных выражений типов профиля в одно выражение,
+        чтобы текст просматривался один раз. Выражения с собственными группами
+        или флагами остаются отдельными.
+        
+        Args:
+            profile (ConfigurationProfile): Профиль настроек.
+            
+        Returns:
+            tuple: (объединенное выражение или None, имя группы -> тип сущности,
+                    список (тип сущности, выражение) для отдельного поиска).
+        """
+        alternatives = []
+        group_types = {}
+        separate = []
+        for entity_type in profile.entity_types:
+            pattern = self.patterns.get(entity_type)
+            if pattern is None:
+                continue
+            if pattern.groups or pattern.flags != re.UNICODE:
+                separate.append((entity_type, pattern))
+                continue
+            group = f"t{len(alternatives)}"
+            group_types[group] = entity_type
+            alternatives.append(f"(?P<{group}>{pattern.pattern})")
+        
+        combined = re.compile("|".join(alternatives)) if alternatives else None
+        return combined, group_types, separate
+
     def detect_entities(self, text, profile):
         """
         Обнаружение сущностей в тексте.
@@ -81,27 +196,51 @@ class EntityRecognizer:
         """
         logger.info(f"Detecting entities in text of length {len(text)}")
         entities = []
+        self._load_pattern_plugins(profile)
         
-        # Поиск сущностей с помощью регулярных выражений
-        for entity_type in profile.entity_types:
-            if entity_type in self.patterns:
-                matches = self.patterns[entity_type].finditer(text)
-                for match in matches:
-                    entities.append(Entity(match.group(), entity_type, match.start(), match.end()))
-                logger.debug(f"Found {len(list(matches))} entities of type {entity_type} using regex")
-        
-        # Поиск сущностей с помощью словарей
-        dict_entities = self.dictionary_manager.find_matches(text, profile)
+        # Поиск регулярными выражениями и словарями в рабочих процессах идет
+        # одновременно с обращениями к языковой модели
+        pending = None
+        if self.parallel_detector is not None:
+            pending = self.parallel_detector.start(self, text, profile)
+        
+        try:
+            if pending is None:
+                # Поиск сущностей с помощью регулярных выражений
+                with stage("regex"):
+                    pattern_entities = self._find_pattern_matches(text, profile)
+                
+                # Поиск сущностей с помощью словарей
+                with stage("dictionaries"):
+                    dict_entities = self.dictionary_manager.find_matches(text, profile)
+            
+            # Поиск сущностей с помощью языковой модели
+            windows = None
+            if self.candidate_filter is not None:
+                with stage("candidate_filter"):
+                    windows = self.candidate_filter.select_windows(text, profile, self.language_model.window_size)
+            with stage("model"):
+                lm_entities = self.language_model.search_entities(text, [], profile, windows=windows)
+        except BaseException:
+            if pending is not None:
+                pending.cancel()
+            raise
+        
+        if pending is not None:
+            with stage("parallel_wait"):
+                pattern_entities, dict_entities = pending.result()
+        
+        entities.extend(pattern_entities)
+        self._mark_source(dict_entities, "dictionary")
         entities.extend(dict_entities)
         logger.debug(f"Found {len(dict_entities)} entities using dictionaries")
-        
-        # Поиск сущностей с помощью языковой модели
-        lm_entities = self.language_model.search_entities(text, entities, profile)
+        self._mark_source(lm_entities, "model")
         entities.extend(lm_entities)
         logger.debug(f"Found {len(lm_entities)} entities using language model")
         
         # Устранение дубликатов и перекрытий
-        entities = self._remove_overlapping_entities(entities)
+        with stage("overlap_removal"):
+            entities = self._remove_overlapping_entities(entities)
         logger.info(f"Total entities found: {len(entities)}")
         
-        return entities
\ No newline at end of file
+        return entities
@@ -1,36 +1,75 @@
 import torch
+import time
 from transformers import AutoModelForCausalLM, AutoTokenizer
 from ..utils.logging import get_logger
+from ..utils.timing import active_timer, stage
+from ..config.compiled_profile import CompiledProfile, derived
 import re
-from .entity import Entity
+from collections import OrderedDict
+from transformers import LogitsProcessor, LogitsProcessorList
+from .constrained_decoding import CopyConstrainedLogitsProcessor, TokenIndex
+from .model_backend import ModelBackend, select_device
+from .mmap_weights import load_mmap_model
 
 logger = get_logger(__name__)
 
-class LanguageModel:
-    def __init__(self, model_path):
+class LanguageModel(ModelBackend):
+    DEFAULT_GENERATION_KWARGS = {
+        "max_length": 1024,
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "do_sample": True
+    }
+
+    TEXT_MARKER = "\x00"
+
+    def __init__(self, model_path, window_size=1000, generation_kwargs=None, constrained_decoding=False,
+                 mmap_weights=False):
         """
         Инициализация языковой модели.
         
         Args:
             model_path (str): Путь к файлам модели.
+            window_size (int, optional): Максимальный размер окна текста в символах,
+                                         передаваемого модели за один запрос.
+            generation_kwargs (dict, optional): Параметры генерации, дополняющие
+                                                DEFAULT_GENERATION_KWARGS.
+            constrained_decoding (bool, optional): Ограничить генерацию грамматикой "[TYPE: span]",
+                                                   где span - подстрока текста окна.
+            mmap_weights (bool, optional): Отобразить веса safetensors в память без копирования
+                                           (только CPU). Процессы, порожденные через fork после
+                                           загрузки, разделяют одну копию весов.
         """
+        super().__init__(window_size)
         logger.info(f"Initializing language model from {model_path}")
         
-        if torch.backends.mps.is_available():
-            self.device = "mps"
-        elif torch.cuda.is_available():
-            self.device = "cuda"
-        else:
-            self.device = "cpu"
+        self.max_input_length = 512
+        self.constrained_decoding = constrained_decoding
+        self._token_index = None
+        self.mmap_weights = mmap_weights
+        self.generation_kwargs = dict(self.DEFAULT_GENERATION_KWARGS, **(generation_kwargs or {}))
+        self._load_model(model_path)
+    
+    def _load_model(self, model_path):
+        """
+        Загрузка токенизатора и модели.
+        
+        Args:
+            model_path (str): Путь к файлам модели.
+        """
+        self.device = "cpu" if self.mmap_weights else select_device()
         logger.info(f"Using device: {self.device}")
         
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_path,
-                torch_dtype=torch.float16 if self.device != "cpu" else torch.float32,
-                device_map=self.device
-            )
+            if self.mmap_weights:
+                self.model = load_mmap_model(AutoModelForCausalLM, model_path)
+            else:
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    model_path,
+                    torch_dtype=torch.float16 if self.device != "cpu" else torch.float32,
+                    device_map=self.device
+                )
             logger.info("Language model successfully loaded")
         except Exception as e:
             logger.error(f"Failed to load model: {str(e)}")
@@ -47,6 +86,20 @@ class LanguageModel:
         Returns:
             str: Сгенерированный промпт.
         """
+        prefix, suffix = derived(profile, ("llm_prompt", type(self).__name__), lambda: self._prompt_parts(profile))
+        return prefix + text + suffix
+
+    def _prompt_parts(self, profile):
+        """
+        Части промпта до и после текста окна. Зависят только от профиля,
+        поэтому для скомпилированного профиля вычисляются один раз.
+        
+        Args:
+            profile (ConfigurationProfile): Профиль настроек.
+            
+        Returns:
+            tuple: (начало промпта, окончание промпта).
+        """
         entity_descriptions = []
         for entity_type in profile.entity_types:
             if entity_type in profile.custom_entity_prompts:
@@ -59,80 +112,236 @@ class LanguageModel:
         {}
         Текст: {}
         Для каждой найденной сущности выпиши её в квадратных скобках, указав тип сущности (например, [PER: Иванов Иван Иванович]).
+        Каждую сущность выписывай только один раз, даже если она встречается в тексте несколько раз.
         Перечисление результата:
-        """.format("\n    - ".join(entity_descriptions), text)
+        """.format("\n    - ".join(entity_descriptions), self.TEXT_MARKER)
         
-        return prompt
+        prefix, _, suffix = prompt.rpartition(self.TEXT_MARKER)
+        return prefix, suffix
 
-    def search_entities(self, text, entities, profile):
+    def _encode_prompt(self, prompt, profile=None):
+        """
+        Токенизация промпта. Для скомпилированного профиля токены начала промпта
+        берутся из кеша профиля, и токенизируется только текст окна с окончанием.
+        
+        Args:
+            prompt (str): Промпт.
+            profile (ConfigurationProfile, optional): Профиль, по которому построен промпт.
+            
+        Returns:
+            list: Идентификаторы токенов, не длиннее max_input_length.
+        """
+        if isinstance(profile, CompiledProfile):
+            prefix, suffix = derived(profile, ("llm_prompt", type(self).__name__), lambda: self._prompt_parts(profile))
+            if prompt.startswith(prefix):
+                key = ("llm_prompt_ids", type(self).__name__, self.tokenizer.name_or_path, len(self.tokenizer))
+                prefix_ids = profile.derived(key, lambda: self._encode_prefix(prefix, suffix))
+                if prefix_ids is not None:
+                    rest_ids = self.tokenizer(prompt[len(prefix):], add_special_tokens=False)["input_ids"]
+                    return (list(prefix_ids) + rest_ids)[:self.max_input_length]
+        
+        return self.tokenizer(prompt, max_length=self.max_input_length, truncation=True)["input_ids"]
+
+    def _encode_prefix(self, prefix, suffix):
+        """
+        Токенизация начала промпта. Раздельная токенизация допустима, только если
+        токенизатор не меняет токены на границе начала промпта и текста окна и не
+        добавляет служебных токенов в конец; иначе возвращается None.
+        
+        Args:
+            prefix (str): Начало промпта.
+            suffix (str): Окончание промпта.
+            
+        Returns:
+            tuple: Идентификаторы токенов начала промпта или None.
+        """
+        prefix_ids = self.tokenizer(prefix)["input_ids"]
+        for probe in ("Иванов Иван Иванович, г. Москва.", "1) ООО \"Ромашка\", тел. 8-800-000-00-00"):
+            full_ids = self.tokenizer(prefix + probe + suffix)["input_ids"]
+            rest_ids = self.tokenizer(probe + suffix, add_special_tokens=False)["input_ids"]
+            if full_ids != prefix_ids + rest_ids:
+                logger.debug("Tokenizer is not stable at the prompt boundary, prompt prefix ids are not cached")
+                return None
+        return tuple(prefix_ids)
+
+    def search_entities(self, text, entities, profile, windows=None):
         """
         Поиск дополнительных сущностей с помощью языковой модели.
+        Текст обрабатывается окнами; сущности, найденные моделью в любом окне,
+        затем ищутся по всему тексту за один проход.
         
         Args:
             text (str): Текст для анализа.
             entities (list): Список уже найденных сущностей.
             profile (ConfigurationProfile): Профиль настроек.
+            windows (list, optional): Окна (смещение, текст) для передачи модели.
+                                      По умолчанию обрабатывается весь текст.
             
         Returns:
             list: Обновленный список сущностей.
         """
         logger.debug(f"Language model processing text of length {len(text)}")
         
-        prompt = self._generate_prompt(text, profile)
-        logger.debug(f"Generated prompt: {prompt}")
+        if windows is None:
+            windows = self._split_into_windows(text)
+        
+        mentions = OrderedDict()
+        for _, window in windows:
+            response = self._generate_response(self._generate_prompt(window, profile), window, profile.entity_types,
+                                               profile=profile)
+            for mention in self._extract_mentions(response, profile):
+                mentions[mention] = None
+        
+        new_entities = self._propagate_mentions(mentions, text)
+        logger.debug(f"Language model returned {len(mentions)} unique entities, {len(new_entities)} occurrences")
+        entities.extend(new_entities)
+        
+        return entities
+
+    def _generate_response(self, prompt, source_text=None, entity_types=None, profile=None):
+        """
+        Генерация ответа модели.
+        
+        Args:
+            prompt (str): Промпт.
+            source_text (str, optional): Текст окна, из которого копируются сущности
+                                         при ограниченной генерации.
+            entity_types (list, optional): Допустимые типы сущностей при ограниченной генерации.
+            profile (ConfigurationProfile, optional): Профиль, по которому построен промпт.
+            
+        Returns:
+            str: Сгенерированный моделью текст без промпта.
+        """
+        logger.debug("Generated prompt: %s", prompt)
         
         try:
-            inputs = self.tokenizer(prompt, return_tensors="pt", max_length=512, truncation=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            with stage("model.tokenize"):
+                input_ids = torch.tensor([self._encode_prompt(prompt, profile)], device=self.device)
+                inputs = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+            
+            logits_processor = LogitsProcessorList()
+            processor = self._create_constraint(source_text, entity_types, inputs["input_ids"].shape[1])
+            if processor is not None:
+                logits_processor.append(processor)
+            
+            timer = active_timer()
+            prefill_probe = _PrefillProbe() if timer is not None else None
+            if prefill_probe is not None:
+                logits_processor.insert(0, prefill_probe)
             
+            started = time.perf_counter()
             outputs = self.model.generate(
                 inputs["input_ids"],
-                max_length=1024,
+                attention_mask=inputs.get("attention_mask"),
                 num_return_sequences=1,
-                temperature=0.7,
-                top_p=0.9,
-                do_sample=True
+                logits_processor=logits_processor,
+                **self.generation_kwargs
             )
+            if prefill_probe is not None:
+                prefill_probe.record(timer, started, time.perf_counter())
             
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            logger.debug(f"Model response: {response}")
-            
-            new_entities = self._parse_model_response(response, text, profile)
-            entities.extend(new_entities)
+            # Декодируем только сгенерированные токены: промпт содержит пример в формате ответа
+            prompt_length = inputs["input_ids"].shape[1]
+            response = self.tokenizer.decode(outputs[0][prompt_length:], skip_special_tokens=True)
+            logger.debug("Model response: %s", response)
         except Exception as e:
             logger.error(f"Error during model inference: {str(e)}")
             raise
         
-        return entities
+        return response
 
-    def _parse_model_response(self, response, text, profile):
+    def _create_constraint(self, source_text, entity_types, prompt_length):
         """
-        Парсинг ответа модели и поиск сущностей в исходном тексте.
+        Создание обработчика логитов для ограниченной генерации.
+        
+        Args:
+            source_text (str): Текст окна.
+            entity_types (list): Допустимые типы сущностей.
+            prompt_length (int): Длина промпта в токенах.
+            
+        Returns:
+            CopyConstrainedLogitsProcessor: Обработчик или None, если ограничение выключено.
+        """
+        if not self.constrained_decoding or source_text is None:
+            return None
+        if self._token_index is None:
+            self._token_index = TokenIndex(self.tokenizer)
+        return CopyConstrainedLogitsProcessor(
+            self._token_index, source_text, entity_types, prompt_length, self._eos_token_ids()
+        )
+
+    def _eos_token_ids(self):
+        """
+        Токены конца последовательности.
+        
+        Returns:
+            list: Идентификаторы токенов.
+        """
+        eos_token_id = self.model.generation_config.eos_token_id
+        if eos_token_id is None:
+            eos_token_id = self.tokenizer.eos_token_id
+        if eos_token_id is None:
+            return []
+        return list(eos_token_id) if isinstance(eos_token_id, (list, tuple)) else [eos_token_id]
+
+    def _extract_mentions(self, response, profile):
+        """
+        Извлечение пар (тип, текст) из ответа модели.
         
         Args:
             response (str): Ответ модели.
-            text (str): Исходный текст.
             profile (ConfigurationProfile): Профиль настроек.
             
         Returns:
-            list: Список сущностей с корректными позициями.
+            list: Уникальные пары (тип сущности, текст сущности) в порядке появления.
         """
-        import re
-        from collections import OrderedDict
-        
         pattern = r"\[(\w+): ([^\]]+)\]"
         matches = re.findall(pattern, response)
         
-        unique_matches = list(OrderedDict.fromkeys(matches))
-        
-        entities = []
-        for entity_type, entity_text in unique_matches:
-            if entity_type in profile.entity_types:
-                start_pos = text.find(entity_text)
-                if start_pos != -1:
-                    end_pos = start_pos + len(entity_text)
-                    entities.append(Entity(entity_text, entity_type, start_pos, end_pos))
-                else:
-                    logger.debug(f"Entity not found in text: {entity_text}")
+        return [
+            (entity_type, entity_text.strip())
+            for entity_type, entity_text in OrderedDict.fromkeys(matches)
+            if entity_type in profile.entity_types
+        ]
+
+    def _parse_model_response(self, response, text, profile):
+        """
+        Парсинг ответа модели и поиск сущностей в исходном тексте.
         
-        return entities
\ No newline at end of file
+        Args:
+            response (str): Ответ модели.
+            text (str): Исходный текст.
+            profile (ConfigurationProfile): Профиль настроек.
+            
+        Returns:
+            list: Список сущностей со всеми вхождениями в тексте.
+        """
+        return self._propagate_mentions(self._extract_mentions(response, profile), text)
+
+
+class _PrefillProbe(LogitsProcessor):
+    """
+    Отметка времени первого вызова обработчика логитов: к этому моменту
+    промпт уже обработан моделью, дальше идет пошаговое декодирование.
+    """
+
+    def __init__(self):
+        self.first_call = None
+
+    def __call__(self, input_ids, scores):
+        if self.first_call is None:
+            self.first_call = time.perf_counter()
+        return scores
+
+    def record(self, timer, started, finished):
+        """
+        Запись длительностей префилла и декодирования в таймер.
+
+        Args:
+            timer (StageTimer): Активный таймер.
+            started (float): Момент начала генерации.
+            finished (float): Момент окончания генерации.
+        """
+        prefill_end = self.first_call if self.first_call is not None else finished
+        timer.add("model.prefill", prefill_end - started)
+        timer.add("model.decode", finished - prefill_end)
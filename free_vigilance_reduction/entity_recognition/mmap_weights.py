@@ -0,0 +1,141 @@
+"""
+Модуль для загрузки весов модели из safetensors через отображение файлов в память.
+
+Тензоры создаются поверх страниц файла без копирования, поэтому загрузка почти
+мгновенна, а процессы, порожденные через fork после загрузки, разделяют одну
+физическую копию весов. Отображение выполняется в режиме copy-on-write: запись
+в тензор (которой при инференсе не бывает) затронет только страницы этого процесса.
+"""
+
+import json
+import mmap
+import os
+import struct
+from contextlib import nullcontext
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_SAFETENSORS_DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool"
+}
+
+
+def safetensors_files(model_path):
+    """
+    Файлы весов модели в формате safetensors (с учетом разбиения на части).
+
+    Args:
+        model_path (str): Путь к каталогу модели.
+
+    Returns:
+        list: Пути к файлам.
+
+    Raises:
+        FileNotFoundError: Если в каталоге нет весов в формате safetensors.
+    """
+    index_path = os.path.join(model_path, "model.safetensors.index.json")
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as file:
+            weight_map = json.load(file)["weight_map"]
+        return [os.path.join(model_path, name) for name in sorted(set(weight_map.values()))]
+
+    single_path = os.path.join(model_path, "model.safetensors")
+    if os.path.exists(single_path):
+        return [single_path]
+    raise FileNotFoundError(f"No safetensors weights in {model_path}")
+
+
+def load_safetensors_mmap(file_path):
+    """
+    Отображение файла safetensors в память и создание тензоров поверх него.
+
+    Args:
+        file_path (str): Путь к файлу.
+
+    Returns:
+        dict: Имя тензора -> torch.Tensor, разделяющий память с отображением файла.
+    """
+    import torch
+
+    with open(file_path, 'rb') as file:
+        (header_size,) = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(header_size))
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = getattr(torch, _SAFETENSORS_DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        count = (end - start) // dtype.itemsize
+        if count:
+            tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + start)
+        else:
+            tensor = torch.empty(0, dtype=dtype)
+        tensors[name] = tensor.reshape(info["shape"])
+    return tensors
+
+
+def load_mmap_model(model_class, model_path):
+    """
+    Создание модели transformers на CPU с весами, отображенными из safetensors.
+    Веса используются в том типе данных, в котором они сохранены: приведение
+    типа создало бы копию. Модель переводится в режим eval, градиенты отключаются.
+
+    Args:
+        model_class: Класс Auto* из transformers (например, AutoModelForCausalLM).
+        model_path (str): Путь к каталогу модели.
+
+    Returns:
+        torch.nn.Module: Модель.
+    """
+    from transformers import AutoConfig
+
+    state_dict = {}
+    for file_path in safetensors_files(model_path):
+        state_dict.update(load_safetensors_mmap(file_path))
+
+    config = AutoConfig.from_pretrained(model_path)
+    with _no_init_weights():
+        model = model_class.from_config(config)
+
+    result = model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+    loaded = {tensor.data_ptr() for tensor in state_dict.values() if tensor.numel()}
+    current = model.state_dict(keep_vars=True)
+    missing = [key for key in result.missing_keys if current[key].data_ptr() not in loaded]
+    if missing:
+        raise ValueError(f"Weights missing in {model_path}: {', '.join(missing[:10])}")
+    if result.unexpected_keys:
+        logger.warning(f"Unused weights in {model_path}: {', '.join(result.unexpected_keys[:10])}")
+
+    model.requires_grad_(False)
+    model.eval()
+    size = sum(tensor.numel() * tensor.element_size() for tensor in state_dict.values())
+    logger.info(f"Mapped {size / 2 ** 20:.1f} MiB of weights from {model_path} "
+                f"({', '.join(sorted({str(t.dtype) for t in state_dict.values()}))})")
+    return model
+
+
+def _no_init_weights():
+    """Контекст, отключающий случайную инициализацию весов при создании модели."""
+    try:
+        from transformers.initialization import no_init_weights
+    except ImportError:
+        try:
+            from transformers.modeling_utils import no_init_weights
+        except ImportError:
+            return nullcontext()
+    return no_init_weights()
@@ -0,0 +1,141 @@
+"""
+Базовый класс для моделей, используемых при распознавании сущностей.
+"""
+
+from abc import ABC, abstractmethod
+from .span_index import SpanIndex
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModelBackend(ABC):
+    """
+    Абстрактный класс модели для поиска сущностей.
+    Определяет интерфейс, через который EntityRecognizer обращается к модели.
+    """
+
+    def __init__(self, window_size=1000):
+        """
+        Инициализация модели.
+
+        Args:
+            window_size (int, optional): Максимальный размер окна текста в символах,
+                                         передаваемого модели за один запрос.
+        """
+        self.window_size = window_size
+
+    @abstractmethod
+    def search_entities(self, text, entities, profile, windows=None):
+        """
+        Поиск дополнительных сущностей с помощью модели.
+
+        Args:
+            text (str): Текст для анализа.
+            entities (list): Список уже найденных сущностей.
+            profile (ConfigurationProfile): Профиль настроек.
+            windows (list, optional): Окна (смещение, текст) для передачи модели.
+                                      По умолчанию обрабатывается весь текст.
+
+        Returns:
+            list: Обновленный список сущностей.
+        """
+        pass
+
+    def _split_into_windows(self, text):
+        """
+        Разбиение текста на окна для обработки моделью.
+        Границы окон по возможности совпадают с концами строк или предложений.
+
+        Args:
+            text (str): Текст для анализа.
+
+        Returns:
+            list: Список кортежей (смещение окна, текст окна).
+        """
+        windows = []
+        start = 0
+        while start < len(text):
+            end = min(start + self.window_size, len(text))
+            if end < len(text):
+                boundary = max(text.rfind('\n', start, end), text.rfind('. ', start, end))
+                if boundary > start:
+                    end = boundary + 1
+            if text[start:end].strip():
+                windows.append((start, text[start:end]))
+            start = end
+        return windows
+
+    def _propagate_mentions(self, mentions, text):
+        """
+        Поиск всех вхождений найденных моделью сущностей в тексте.
+        Сущность находится и при отличиях от текста в регистре, пробелах,
+        кавычках и "ё"/"е"; позиции и текст сущностей берутся из исходного текста.
+
+        Args:
+            mentions (iterable): Пары (тип сущности, текст сущности).
+            text (str): Исходный текст.
+
+        Returns:
+            list: Список сущностей с корректными позициями.
+        """
+        mentions = list(mentions)
+        if not mentions:
+            return []
+        return SpanIndex(text).find_entities(mentions)
+
+
+def select_device():
+    """
+    Выбор устройства для инференса.
+
+    Returns:
+        str: "mps", "cuda" или "cpu".
+    """
+    import torch
+
+    if torch.backends.mps.is_available():
+        return "mps"
+    if torch.cuda.is_available():
+        return "cuda"
+    return "cpu"
+
+
+def create_backend(backend, model_path):
+    """
+    Создание модели по имени.
+
+    Args:
+        backend (str|ModelBackend): Имя модели ("generative", "onnx", "token_classification",
+                                    "remote") или готовый объект модели. "remote" использует
+                                    сервер модели, а если он не запущен - загружает
+                                    генеративную модель в текущем процессе.
+        model_path (str): Путь к файлам модели.
+
+    Returns:
+        ModelBackend: Объект модели.
+
+    Raises:
+        ValueError: Если имя модели неизвестно.
+    """
+    if isinstance(backend, ModelBackend):
+        return backend
+
+    if backend == "generative":
+        from .language_model import LanguageModel
+        return LanguageModel(model_path)
+    if backend == "onnx":
+        from .onnx_language_model import OnnxLanguageModel
+        return OnnxLanguageModel(model_path)
+    if backend == "token_classification":
+        from .token_classification_model import TokenClassificationModel
+        return TokenClassificationModel(model_path)
+    if backend == "remote":
+        from .model_server import RemoteModelBackend
+        try:
+            return RemoteModelBackend(model_path=model_path, fallback="generative")
+        except ConnectionError as e:
+            logger.warning(f"Model server is not available ({str(e)}), loading generative model in process")
+            return create_backend("generative", model_path)
+
+    raise ValueError(f"Unknown model backend: {backend}")
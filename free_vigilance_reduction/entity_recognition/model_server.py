@@ -0,0 +1,549 @@
+"""
+Модуль локального сервера модели: долгоживущий процесс держит модель в памяти
+и обслуживает запросы поиска сущностей через Unix-сокет.
+
+Протокол: каждое сообщение - кадр из 4-байтовой длины (big-endian) и компактного
+JSON в UTF-8. Запросы:
+    {"op": "ping"} -> {"ok": true, "backend", "model_path", "window_size", "pid"}
+    {"op": "search", "text", "windows", "profile_hash", "profile"} ->
+        {"ok": true, "entities": [[text, type, start, end], ...], "timings": {...}}
+Профиль передается один раз на соединение; сервер хранит скомпилированные профили
+по хешу содержимого. Если профиля с таким хешем нет, сервер отвечает
+{"ok": false, "code": "profile_required"}, и клиент повторяет запрос с профилем.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from .entity import Entity
+from .model_backend import ModelBackend, create_backend
+from ..config.compiled_profile import CompiledProfile
+from ..config.configuration import ConfigurationProfile
+from ..utils.logging import get_logger, setup_default_logging
+from ..utils.timing import StageTimer, record_stage
+
+logger = get_logger(__name__)
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+DEFAULT_TIMEOUT = 300.0
+
+
+def default_socket_path(create=False):
+    """
+    Путь к сокету сервера модели: переменная окружения FVR_MODEL_SOCKET
+    или файл в закрытом каталоге пользователя ($XDG_RUNTIME_DIR/fvr
+    или fvr-<uid> во временном каталоге) с правами 0700.
+
+    Args:
+        create (bool, optional): Создать каталог, если его нет, и проверить его владельца и права.
+
+    Returns:
+        str: Путь к Unix-сокету.
+
+    Raises:
+        PermissionError: Если каталог принадлежит другому пользователю или доступен другим.
+    """
+    configured = os.environ.get("FVR_MODEL_SOCKET")
+    if configured:
+        return configured
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        directory = os.path.join(runtime_dir, "fvr")
+    else:
+        directory = os.path.join(tempfile.gettempdir(), f"fvr-{os.getuid()}")
+    if create:
+        _ensure_private_directory(directory)
+    return os.path.join(directory, "model.sock")
+
+
+def _ensure_private_directory(directory):
+    """
+    Создание каталога с правами 0700 и проверка, что он принадлежит текущему
+    пользователю и недоступен остальным (иначе другой пользователь мог создать
+    его заранее и подменить сокет).
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Socket directory {directory} must be a directory owned by the current "
+                              f"user with mode 0700")
+
+
+def _check_server_owner(sock, socket_path):
+    """
+    Проверка, что сервер на другом конце сокета запущен тем же пользователем:
+    по SO_PEERCRED, а где он недоступен - по владельцу файла сокета.
+
+    Raises:
+        PermissionError: Если сервер принадлежит другому пользователю.
+    """
+    if hasattr(socket, "SO_PEERCRED"):
+        credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", credentials)
+    else:
+        uid = os.stat(socket_path).st_uid
+    if uid != os.getuid():
+        raise PermissionError(f"Model server on {socket_path} runs as uid {uid}, not {os.getuid()}")
+
+
+def send_frame(sock, message):
+    """
+    Отправка сообщения одним кадром.
+
+    Args:
+        sock (socket.socket): Сокет.
+        message (dict): Сообщение.
+    """
+    payload = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(sock):
+    """
+    Чтение одного кадра.
+
+    Args:
+        sock (socket.socket): Сокет.
+
+    Returns:
+        dict: Сообщение или None, если соединение закрыто до начала кадра.
+
+    Raises:
+        ConnectionError: Если соединение оборвалось посреди кадра или кадр слишком велик.
+    """
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ConnectionError(f"Frame too large: {size} bytes")
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a frame")
+    return json.loads(payload.decode('utf-8'))
+
+
+def _recv_exact(sock, size):
+    """Чтение ровно size байт; None, если соединение закрыто до первого байта."""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            if buffer:
+                raise ConnectionError("Connection closed in the middle of a frame")
+            return None
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+class ModelServer:
+    """
+    Сервер модели на Unix-сокете.
+    Соединения обслуживаются в отдельных потоках, обращения к модели выполняются
+    по одному. Сокет доступен только владельцу процесса, так как через него
+    передаются тексты с персональными данными.
+    """
+
+    def __init__(self, backend, socket_path=None, model_path=None, max_profiles=64):
+        """
+        Инициализация сервера.
+
+        Args:
+            backend (ModelBackend): Загруженная модель.
+            socket_path (str, optional): Путь к сокету. По умолчанию default_socket_path().
+            model_path (str, optional): Путь к файлам модели, сообщаемый клиентам для проверки.
+            max_profiles (int, optional): Количество хранимых скомпилированных профилей.
+        """
+        self.backend = backend
+        self.socket_path = socket_path or default_socket_path(create=True)
+        self.model_path = os.path.realpath(model_path) if model_path else None
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._profiles_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._server = None
+
+    def serve_forever(self):
+        """
+        Запуск сервера. Возвращает управление после shutdown().
+        """
+        self._bind()
+        logger.info(f"Model server listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self._remove_socket()
+            self._close_connections()
+            logger.info("Model server stopped")
+
+    def start(self):
+        """
+        Запуск сервера в фоновом потоке.
+
+        Returns:
+            threading.Thread: Поток сервера.
+        """
+        self._bind()
+        thread = threading.Thread(target=self.serve_forever, name="fvr-model-server", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        """
+        Остановка сервера.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _bind(self):
+        """Создание сокета; файл, оставшийся от завершившегося сервера, удаляется."""
+        if self._server is not None:
+            return
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise RuntimeError(f"Model server is already running on {self.socket_path}")
+            os.remove(self.socket_path)
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._handle_connection(self.request)
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+    def _close_connections(self):
+        """
+        Завершение открытых соединений: запрос, который уже выполняется, получает ответ,
+        а следующий запрос клиента получает разрыв соединения.
+        """
+        with self._connections_lock:
+            connections = list(self._connections)
+        for sock in connections:
+            try:
+                sock.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+
+    def _remove_socket(self):
+        """Удаление файла сокета."""
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+    def _handle_connection(self, sock):
+        """
+        Обработка запросов одного соединения до его закрытия клиентом.
+
+        Args:
+            sock (socket.socket): Сокет клиента.
+        """
+        with self._connections_lock:
+            self._connections.add(sock)
+        try:
+            self._serve_requests(sock)
+        finally:
+            with self._connections_lock:
+                self._connections.discard(sock)
+
+    def _serve_requests(self, sock):
+        """Цикл чтения запросов соединения."""
+        while True:
+            try:
+                request = recv_frame(sock)
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"Dropping model server connection: {str(e)}")
+                return
+            if request is None:
+                return
+            try:
+                response = self._dispatch(request)
+            except Exception as e:
+                logger.error(f"Model server request failed: {str(e)}")
+                response = {"ok": False, "code": "error", "error": str(e)}
+            try:
+                send_frame(sock, response)
+            except OSError:
+                return
+
+    def _dispatch(self, request):
+        """
+        Выполнение одного запроса.
+
+        Args:
+            request (dict): Запрос.
+
+        Returns:
+            dict: Ответ.
+        """
+        op = request.get("op")
+        if op == "ping":
+            return {
+                "ok": True,
+                "backend": type(self.backend).__name__,
+                "model_path": self.model_path,
+                "window_size": self.backend.window_size,
+                "pid": os.getpid()
+            }
+        if op != "search":
+            return {"ok": False, "code": "error", "error": f"Unknown operation: {op}"}
+
+        profile = self._get_profile(request.get("profile_hash"), request.get("profile"))
+        if profile is None:
+            return {"ok": False, "code": "profile_required"}
+
+        windows = request.get("windows")
+        if windows is not None:
+            windows = [(offset, window) for offset, window in windows]
+        timer = StageTimer()
+        with self._model_lock, timer.activate():
+            entities = self.backend.search_entities(request["text"], [], profile, windows=windows)
+        return {
+            "ok": True,
+            "entities": [[e.text, e.entity_type, e.start_pos, e.end_pos] for e in entities],
+            "timings": timer.timings
+        }
+
+    def _get_profile(self, profile_hash, profile_data):
+        """
+        Скомпилированный профиль по хешу; при передаче данных профиля он компилируется и запоминается.
+
+        Args:
+            profile_hash (str): Хеш содержимого профиля.
+            profile_data (dict): Профиль в виде словаря или None.
+
+        Returns:
+            CompiledProfile: Профиль или None, если он неизвестен серверу и не передан.
+        """
+        with self._profiles_lock:
+            profile = self._profiles.get(profile_hash)
+            if profile is not None:
+                self._profiles.move_to_end(profile_hash)
+                return profile
+        if profile_data is None:
+            return None
+
+        profile = ConfigurationProfile.from_dict(profile_data).compile()
+        with self._profiles_lock:
+            profile = self._profiles.setdefault(profile.content_hash, profile)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile
+
+
+class RemoteModelBackend(ModelBackend):
+    """
+    Модель, работающая в процессе сервера модели.
+    Тексты отправляются только серверу, запущенному тем же пользователем.
+    Если сервер перестает отвечать и задан запасной вариант, модель загружается
+    в текущем процессе, и дальнейшие запросы выполняются локально.
+    """
+
+    def __init__(self, socket_path=None, model_path=None, fallback=None, timeout=DEFAULT_TIMEOUT):
+        """
+        Подключение к серверу модели.
+
+        Args:
+            socket_path (str, optional): Путь к сокету. По умолчанию default_socket_path().
+            model_path (str, optional): Ожидаемый путь к файлам модели; сервер с другой
+                                        моделью не используется. Также нужен для запасной загрузки.
+            fallback (str, optional): Имя модели для загрузки в процессе при сбое сервера
+                                      ("generative", "onnx", "token_classification").
+            timeout (float, optional): Таймаут операций с сокетом в секундах; зависший сервер
+                                       считается недоступным. None - ожидание без ограничения.
+
+        Raises:
+            ConnectionError: Если сервер недоступен, запущен другим пользователем
+                             или обслуживает другую модель.
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.model_path = model_path
+        self.fallback = fallback
+        self.timeout = timeout
+        self._sock = None
+        self._sent_profiles = set()
+        self._lock = threading.Lock()
+        self._local = None
+
+        info = self._request({"op": "ping"})
+        super().__init__(info["window_size"])
+        served = info.get("model_path")
+        if model_path and served and served != os.path.realpath(model_path):
+            self.close()
+            raise ConnectionError(f"Model server on {self.socket_path} serves {served}, not {model_path}")
+        logger.info(f"Using model server on {self.socket_path} ({info['backend']}, pid {info['pid']})")
+
+    def search_entities(self, text, entities, profile, windows=None):
+        """
+        Поиск дополнительных сущностей моделью на сервере.
+
+        Args:
+            text (str): Текст для анализа.
+            entities (list): Список уже найденных сущностей.
+            profile (ConfigurationProfile): Профиль настроек.
+            windows (list, optional): Окна (смещение, текст) для передачи модели.
+                                      По умолчанию обрабатывается весь текст.
+
+        Returns:
+            list: Обновленный список сущностей.
+        """
+        if self._local is not None:
+            return self._local.search_entities(text, entities, profile, windows=windows)
+
+        compiled = profile if isinstance(profile, CompiledProfile) else profile.compile()
+        request = {
+            "op": "search",
+            "text": text,
+            "windows": [list(window) for window in windows] if windows is not None else None,
+            "profile_hash": compiled.content_hash
+        }
+        try:
+            response = self._search(request, compiled)
+        except ConnectionError as e:
+            if not self.fallback:
+                raise
+            logger.warning(f"Model server is unavailable ({str(e)}), loading {self.fallback} model in process")
+            self._local = create_backend(self.fallback, self.model_path)
+            return self._local.search_entities(text, entities, profile, windows=windows)
+
+        for stage_name, seconds in response.get("timings", {}).items():
+            record_stage(stage_name, seconds)
+        entities.extend(Entity(*item) for item in response["entities"])
+        return entities
+
+    def close(self):
+        """
+        Закрытие соединения с сервером.
+        """
+        with self._lock:
+            self._disconnect()
+
+    def _search(self, request, compiled):
+        """Запрос поиска с передачей профиля, если сервер его еще не знает."""
+        if compiled.content_hash not in self._sent_profiles:
+            request["profile"] = compiled.to_dict()
+        response = self._request(request)
+        if not response.get("ok") and response.get("code") == "profile_required":
+            request["profile"] = compiled.to_dict()
+            response = self._request(request)
+        if not response.get("ok"):
+            raise RuntimeError(f"Model server error: {response.get('error', response.get('code'))}")
+        self._sent_profiles.add(compiled.content_hash)
+        return response
+
+    def _request(self, message):
+        """
+        Отправка запроса и получение ответа. Если ранее открытое соединение
+        оказалось закрыто сервером до отправки запроса, выполняется одна попытка
+        переподключения. Запрос, который мог дойти до сервера (в том числе при
+        истечении таймаута), повторно не отправляется.
+
+        Raises:
+            ConnectionError: Если сервер недоступен или не ответил за отведенное время.
+        """
+        with self._lock:
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if not reused:
+                        self._connect()
+                    send_frame(self._sock, message)
+                    break
+                except (BrokenPipeError, ConnectionResetError) as e:
+                    self._disconnect()
+                    if attempt or not reused:
+                        raise ConnectionError(str(e)) from e
+                except OSError as e:
+                    self._disconnect()
+                    raise ConnectionError(str(e)) from e
+            try:
+                response = recv_frame(self._sock)
+            except OSError as e:
+                self._disconnect()
+                raise ConnectionError(str(e)) from e
+            if response is None:
+                self._disconnect()
+                raise ConnectionError("Model server closed the connection")
+            return response
+
+    def _connect(self):
+        """Открытие соединения с проверкой владельца сервера; сервер заново получает профили."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+            _check_server_owner(sock, self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._sent_profiles = set()
+
+    def _disconnect(self):
+        """Закрытие текущего соединения."""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def __del__(self):
+        self._disconnect()
+
+
+def _is_listening(socket_path):
+    """Проверка, принимает ли сокет соединения."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def main(argv=None):
+    """
+    Запуск сервера модели из командной строки:
+    python -m free_vigilance_reduction.entity_recognition.model_server --model-path models/vikhr-gemma-2b-instruct
+    """
+    parser = argparse.ArgumentParser(description="FreeVigilanceReduction model server")
+    parser.add_argument("--model-path", default="models/vikhr-gemma-2b-instruct", help="Path to model files")
+    parser.add_argument("--backend", default="generative", choices=["generative", "onnx", "token_classification"],
+                        help="Model backend to serve")
+    parser.add_argument("--socket", default=None, help="Unix socket path (default: $FVR_MODEL_SOCKET or a private per-user directory)")
+    args = parser.parse_args(argv)
+
+    setup_default_logging()
+    backend = create_backend(args.backend, args.model_path)
+    server = ModelServer(backend, args.socket, model_path=args.model_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from transformers import AutoTokenizer
+from ..utils.logging import get_logger
+from ..utils.timing import record_stage, stage
+from .language_model import LanguageModel
+
+logger = get_logger(__name__)
+
+
+class OnnxLanguageModel(LanguageModel):
+    """
+    Языковая модель, исполняемая через ONNX Runtime на CPU.
+    Модель один раз экспортируется в ONNX с явными входами и выходами KV-кеша,
+    граф сохраняется на диск и переиспользуется при следующих запусках.
+    Промпт, разбор ответа и контракт search_entities совпадают с LanguageModel.
+    """
+
+    EXPORT_FORMAT_VERSION = 1
+    OPSET_VERSION = 17
+
+    def __init__(self, model_path, window_size=1000, generation_kwargs=None, constrained_decoding=False,
+                 cache_dir=None, intra_op_num_threads=0, inter_op_num_threads=0, seed=None):
+        """
+        Инициализация языковой модели ONNX Runtime.
+
+        Args:
+            model_path (str): Путь к файлам модели.
+            window_size (int, optional): Максимальный размер окна текста в символах.
+            generation_kwargs (dict, optional): Параметры генерации (max_length, max_new_tokens,
+                                                do_sample, temperature, top_p).
+            constrained_decoding (bool, optional): Ограничить генерацию грамматикой "[TYPE: span]".
+            cache_dir (str, optional): Каталог для экспортированных графов; каждый экспорт
+                                       хранится в подкаталоге с отпечатком модели, остальное
+                                       содержимое каталога не изменяется. По умолчанию -
+                                       каталог в кеше пользователя ($XDG_CACHE_HOME или ~/.cache).
+            intra_op_num_threads (int, optional): Потоки внутри оператора (0 - по числу ядер).
+            inter_op_num_threads (int, optional): Потоки между операторами (0 - по умолчанию).
+            seed (int, optional): Начальное значение генератора для сэмплирования.
+        """
+        self.cache_dir = cache_dir or _default_cache_dir(model_path)
+        self.export_dir = None
+        self.intra_op_num_threads = intra_op_num_threads
+        self.inter_op_num_threads = inter_op_num_threads
+        self.rng = np.random.default_rng(seed)
+        super().__init__(model_path, window_size, generation_kwargs, constrained_decoding)
+
+    def _load_model(self, model_path):
+        """
+        Загрузка токенизатора и сессии ONNX Runtime (с экспортом при необходимости).
+
+        Args:
+            model_path (str): Путь к файлам модели.
+        """
+        import onnxruntime
+
+        self.device = "cpu"
+
+        try:
+            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+            onnx_path = self._ensure_exported(model_path)
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.intra_op_num_threads
+            options.inter_op_num_threads = self.inter_op_num_threads
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+            logger.info(f"ONNX language model successfully loaded from {onnx_path}")
+        except Exception as e:
+            logger.error(f"Failed to load model: {str(e)}")
+            raise
+
+        with open(os.path.join(self.export_dir, "metadata.json"), 'r', encoding='utf-8') as file:
+            metadata = json.load(file)
+        self.eos_token_ids = set(metadata["eos_token_ids"])
+        self.past_names = [i.name for i in self.session.get_inputs() if i.name.startswith("past_")]
+        self.past_shapes = {i.name: i.shape for i in self.session.get_inputs() if i.name.startswith("past_")}
+
+    def _generate_response(self, prompt, source_text=None, entity_types=None, profile=None):
+        """
+        Генерация ответа модели с KV-кешем через ONNX Runtime.
+
+        Args:
+            prompt (str): Промпт.
+            source_text (str, optional): Текст окна для ограниченной генерации.
+            entity_types (list, optional): Допустимые типы сущностей для ограниченной генерации.
+            profile (ConfigurationProfile, optional): Профиль, по которому построен промпт.
+
+        Returns:
+            str: Сгенерированный моделью текст без промпта.
+        """
+        logger.debug("Generated prompt: %s", prompt)
+
+        try:
+            with stage("model.tokenize"):
+                input_ids = np.array([self._encode_prompt(prompt, profile)], dtype=np.int64)
+            prompt_length = input_ids.shape[1]
+
+            max_new_tokens = self.generation_kwargs.get("max_new_tokens")
+            if max_new_tokens is None:
+                max_new_tokens = max(self.generation_kwargs.get("max_length", 1024) - prompt_length, 0)
+
+            feeds = {
+                name: np.zeros((1, shape[1], 0, shape[3]), dtype=np.float32)
+                for name, shape in self.past_shapes.items()
+            }
+            total_length = prompt_length
+            generated = []
+            constraint = self._create_constraint(source_text, entity_types, prompt_length)
+
+            for _ in range(max_new_tokens):
+                feeds["input_ids"] = input_ids
+                feeds["attention_mask"] = np.ones((1, total_length), dtype=np.int64)
+                started = time.perf_counter()
+                logits, *present = self.session.run(None, feeds)
+                # Первый прогон обрабатывает весь промпт, остальные - по одному токену
+                record_stage("model.decode" if total_length > prompt_length else "model.prefill",
+                             time.perf_counter() - started)
+
+                logits = logits[0]
+                if constraint is not None:
+                    mask = np.full_like(logits, -np.inf)
+                    mask[constraint.allowed_token_ids(generated)] = 0
+                    logits = logits + mask
+                next_token = self._select_token(logits)
+                if next_token in self.eos_token_ids:
+                    break
+                generated.append(next_token)
+
+                for name, value in zip(self.past_names, present):
+                    feeds[name] = value
+                input_ids = np.array([[next_token]], dtype=np.int64)
+                total_length += 1
+
+            response = self.tokenizer.decode(generated, skip_special_tokens=True)
+            logger.debug("Model response: %s", response)
+        except Exception as e:
+            logger.error(f"Error during model inference: {str(e)}")
+            raise
+
+        return response
+
+    def _eos_token_ids(self):
+        """
+        Токены конца последовательности.
+
+        Returns:
+            list: Идентификаторы токенов.
+        """
+        return list(self.eos_token_ids)
+
+    def _select_token(self, logits):
+        """
+        Выбор следующего токена: жадно или сэмплированием с temperature и top_p.
+
+        Args:
+            logits (numpy.ndarray): Логиты последней позиции.
+
+        Returns:
+            int: Идентификатор токена.
+        """
+        if not self.generation_kwargs.get("do_sample", False):
+            return int(np.argmax(logits))
+
+        logits = logits.astype(np.float64) / self.generation_kwargs.get("temperature", 1.0)
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+
+        top_p = self.generation_kwargs.get("top_p", 1.0)
+        order = np.argsort(-probs)
+        cumulative = np.cumsum(probs[order])
+        keep = order[:int(np.searchsorted(cumulative, top_p)) + 1]
+        return int(self.rng.choice(keep, p=probs[keep] / probs[keep].sum()))
+
+    def _ensure_exported(self, model_path):
+        """
+        Экспорт модели в ONNX, если в кеше нет актуального графа.
+        Граф экспортируется во временный подкаталог cache_dir и переименовывается
+        в подкаталог с отпечатком модели; удаляются только подкаталоги прежних
+        экспортов той же исходной модели (по полю source в metadata.json), поэтому
+        cache_dir можно использовать для нескольких моделей.
+
+        Args:
+            model_path (str): Путь к файлам модели.
+
+        Returns:
+            str: Путь к файлу ONNX-графа.
+        """
+        fingerprint = self._fingerprint(model_path)
+        self.export_dir = os.path.join(self.cache_dir, fingerprint[:16])
+        onnx_path = os.path.join(self.export_dir, "model.onnx")
+
+        if _export_fingerprint(self.export_dir) == fingerprint:
+            logger.info(f"Using cached ONNX export: {onnx_path}")
+            return onnx_path
+
+        logger.info(f"Exporting model to ONNX: {self.export_dir}")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".export-")
+        try:
+            eos_token_ids = _export_causal_lm(model_path, os.path.join(tmp_dir, "model.onnx"), self.OPSET_VERSION)
+            with open(os.path.join(tmp_dir, "metadata.json"), 'w', encoding='utf-8') as file:
+                json.dump({"fingerprint": fingerprint, "source": _source_key(model_path),
+                           "eos_token_ids": eos_token_ids}, file)
+            if os.path.exists(self.export_dir):
+                if _export_fingerprint(self.export_dir) is None:
+                    raise RuntimeError(f"{self.export_dir} exists and is not an ONNX export")
+                shutil.rmtree(self.export_dir)
+            os.rename(tmp_dir, self.export_dir)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+
+        self._remove_stale_exports(model_path)
+        return onnx_path
+
+    def _remove_stale_exports(self, model_path):
+        """Удаление прежних экспортов этой же модели из cache_dir."""
+        current = os.path.basename(self.export_dir)
+        source = _source_key(model_path)
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            metadata = _export_metadata(path)
+            if name != current and metadata is not None and metadata.get("source") == source:
+                logger.info(f"Removing stale ONNX export: {path}")
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _fingerprint(self, model_path):
+        """Отпечаток исходной модели для проверки актуальности кеша."""
+        digest = hashlib.sha256()
+        digest.update(f"{self.EXPORT_FORMAT_VERSION}:{self.OPSET_VERSION}".encode())
+        cache_dir = os.path.abspath(self.cache_dir)
+        for root, dirs, files in os.walk(model_path):
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != cache_dir)
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                stat = os.stat(file_path)
+                digest.update(f"{os.path.relpath(file_path, model_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+
+def _default_cache_dir(model_path):
+    """
+    Каталог экспортов модели в кеше пользователя: каталог модели может быть
+    доступен только для чтения или общим для нескольких пользователей.
+
+    Args:
+        model_path (str): Путь к файлам модели.
+
+    Returns:
+        str: Путь к каталогу.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    name = os.path.basename(os.path.realpath(model_path))
+    return os.path.join(base, "free_vigilance_reduction", "onnx", f"{name}-{_source_key(model_path)[:12]}")
+
+
+def _source_key(model_path):
+    """Идентификатор исходной модели: хеш полного пути к ее каталогу."""
+    return hashlib.sha256(os.path.realpath(model_path).encode("utf-8")).hexdigest()
+
+
+def _export_metadata(directory):
+    """
+    Метаданные экспорта в каталоге.
+
+    Args:
+        directory (str): Каталог экспорта.
+
+    Returns:
+        dict: Содержимое metadata.json или None, если каталог не является полным экспортом.
+    """
+    if not os.path.isfile(os.path.join(directory, "model.onnx")):
+        return None
+    try:
+        with open(os.path.join(directory, "metadata.json"), 'r', encoding='utf-8') as file:
+            metadata = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(metadata, dict) or not isinstance(metadata.get("fingerprint"), str):
+        return None
+    return metadata
+
+
+def _export_fingerprint(directory):
+    """
+    Отпечаток модели, экспортированной в каталог.
+
+    Args:
+        directory (str): Каталог экспорта.
+
+    Returns:
+        str: Отпечаток или None, если каталог не является полным экспортом.
+    """
+    metadata = _export_metadata(directory)
+    return None if metadata is None else metadata["fingerprint"]
+
+
+def _export_causal_lm(model_path, onnx_path, opset_version):
+    """
+    Экспорт причинной языковой модели в ONNX с явным KV-кешем.
+
+    Args:
+        model_path (str): Путь к файлам модели.
+        onnx_path (str): Путь к создаваемому файлу.
+        opset_version (int): Версия набора операторов ONNX.
+
+    Returns:
+        list: Идентификаторы токенов конца последовательности.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, DynamicCache
+
+    model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float32)
+    model.eval()
+    config = model.config
+    num_layers = config.num_hidden_layers
+    num_kv_heads = getattr(config, "num_key_value_heads", None) or config.num_attention_heads
+    head_dim = getattr(config, "head_dim", None) or config.hidden_size // config.num_attention_heads
+
+    class DecoderWithPast(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, *past):
+            cache = DynamicCache()
+            for layer in range(num_layers):
+                cache.update(past[2 * layer], past[2 * layer + 1], layer)
+            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask,
+                                 past_key_values=cache, use_cache=True)
+            present = []
+            for layer in outputs.past_key_values.layers:
+                present += [layer.keys, layer.values]
+            return (outputs.logits[:, -1, :], *present)
+
+    past_names = [f"past_{layer}_{kind}" for layer in range(num_layers) for kind in ("key", "value")]
+    present_names = [name.replace("past_", "present_", 1) for name in past_names]
+    dynamic_axes = {"input_ids": {1: "sequence"}, "attention_mask": {1: "total_sequence"}}
+    dynamic_axes.update({name: {2: "past_sequence"} for name in past_names})
+    dynamic_axes.update({name: {2: "total_sequence"} for name in present_names})
+
+    sample_ids = torch.ones((1, 4), dtype=torch.long)
+    sample_past = [torch.zeros((1, num_kv_heads, 2, head_dim)) for _ in past_names]
+    sample_mask = torch.ones((1, 6), dtype=torch.long)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            DecoderWithPast(model),
+            (sample_ids, sample_mask, *sample_past),
+            onnx_path,
+            input_names=["input_ids", "attention_mask"] + past_names,
+            output_names=["logits"] + present_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=opset_version,
+            dynamo=False
+        )
+
+    eos_token_id = model.generation_config.eos_token_id
+    if eos_token_id is None:
+        eos_token_id = config.eos_token_id
+    if eos_token_id is None:
+        return []
+    return list(eos_token_id) if isinstance(eos_token_id, (list, tuple)) else [eos_token_id]
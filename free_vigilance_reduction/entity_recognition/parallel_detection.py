@@ -0,0 +1,221 @@
+"""
+Модуль для параллельного поиска сущностей внутри одного большого документа.
+
+Текст делится на сегменты по границам строк, и сегменты просматриваются
+регулярными выражениями и словарями в рабочих процессах, пока основной поток
+готовит окна и обращается к языковой модели. Рабочие процессы порождаются через
+fork и получают текст, выражения и словари без копирования через pickle.
+Каждый сегмент просматривается с запасом в overlap символов за своей границей,
+а совпадения сохраняются только с началом внутри сегмента, поэтому совпадения
+на стыке сегментов не теряются.
+
+Пул создается на каждый документ: текст попадает в рабочие процессы только при fork,
+поэтому пул нельзя переиспользовать для следующего документа. fork копирует только
+вызывающий поток; блокировки, которые в этот момент держат другие потоки процесса
+(планировщик модели, наблюдатели), в рабочих процессах остаются занятыми. Рабочие
+процессы выполняют только поиск по выражениям и словарям и этих блокировок не берут.
+"""
+
+import multiprocessing
+import os
+import time
+from ..utils.logging import get_logger
+from ..utils.timing import record_stage
+
+logger = get_logger(__name__)
+
+# Поиск, назначенный рабочему процессу инициализатором пула
+_task = None
+
+
+def split_segments(text, segment_size):
+    """
+    Разбиение текста на сегменты, границы которых по возможности совпадают
+    с концами строк, а если строка длиннее сегмента - с пробелами.
+
+    Args:
+        text (str): Текст.
+        segment_size (int): Желаемый размер сегмента в символах.
+
+    Returns:
+        list: Пары (начало, конец) сегментов.
+    """
+    segments = []
+    start = 0
+    while start < len(text):
+        end = min(start + segment_size, len(text))
+        if end < len(text):
+            boundary = text.rfind('\n', start, end)
+            if boundary <= start:
+                boundary = text.rfind(' ', start, end)
+            if boundary > start:
+                end = boundary + 1
+        segments.append((start, end))
+        start = end
+    return segments
+
+
+def _init_worker(recognizer, text, profile, overlap):
+    """
+    Инициализация рабочего процесса. Аргументы передаются через fork без pickle,
+    в том числе процессам, которыми пул заменяет завершившиеся.
+    """
+    global _task
+    _task = (recognizer, text, profile, overlap)
+
+
+def _detect_segment(segment):
+    """
+    Поиск сущностей регулярными выражениями и словарями в сегменте (в рабочем процессе).
+
+    Args:
+        segment (tuple): (начало, конец) сегмента.
+
+    Returns:
+        tuple: (сущности регулярных выражений, сущности словарей,
+                длительность поиска по выражениям, длительность поиска по словарям).
+    """
+    recognizer, text, profile, overlap = _task
+    start, end = segment
+    scan_end = min(end + overlap, len(text))
+
+    started = time.perf_counter()
+    pattern_entities = recognizer._find_pattern_matches(text, profile, start, scan_end)
+    patterns_done = time.perf_counter()
+    dict_entities = recognizer.dictionary_manager.find_matches(text, profile, start, scan_end)
+    finished = time.perf_counter()
+
+    return (
+        [e for e in pattern_entities if e.start_pos < end],
+        [e for e in dict_entities if e.start_pos < end],
+        patterns_done - started,
+        finished - patterns_done
+    )
+
+
+class PendingDetection:
+    """
+    Поиск по сегментам, выполняемый в пуле рабочих процессов.
+    """
+
+    # Период проверки рабочих процессов при ожидании результатов, в секундах
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, pool, async_result, segments):
+        self._pool = pool
+        self._async_result = async_result
+        self._workers = list(pool._pool)
+        self.segments = segments
+
+    def result(self):
+        """
+        Ожидание результатов и завершение пула.
+
+        Returns:
+            tuple: (сущности регулярных выражений, сущности словарей) в порядке позиций.
+
+        Raises:
+            RuntimeError: Если рабочий процесс завершился аварийно: его сегмент
+                          не будет обработан, и пул не вернет результат.
+        """
+        try:
+            while not self._async_result.ready():
+                self._async_result.wait(self.POLL_INTERVAL)
+                # Пул заменяет завершившийся процесс новым, но сегмент, который тот обрабатывал, теряется
+                exited = [worker.exitcode for worker in self._workers if worker.exitcode is not None]
+                if exited and not self._async_result.ready():
+                    raise RuntimeError(f"Detection worker exited with code {exited[0]}")
+            results = self._async_result.get()
+        except BaseException:
+            self.cancel()
+            raise
+        self._pool.close()
+        self._pool.join()
+
+        pattern_entities, dict_entities = [], []
+        pattern_time = dict_time = 0.0
+        for segment_patterns, segment_dicts, segment_pattern_time, segment_dict_time in results:
+            pattern_entities.extend(segment_patterns)
+            dict_entities.extend(segment_dicts)
+            pattern_time += segment_pattern_time
+            dict_time += segment_dict_time
+        # Суммарное время рабочих процессов, а не длительность по часам
+        record_stage("regex", pattern_time)
+        record_stage("dictionaries", dict_time)
+        return pattern_entities, dict_entities
+
+    def cancel(self):
+        """
+        Остановка рабочих процессов без ожидания результатов.
+        """
+        self._pool.terminate()
+        self._pool.join()
+
+
+class ParallelDetector:
+    """
+    Запуск поиска регулярными выражениями и словарями по сегментам документа
+    в нескольких процессах.
+    """
+
+    def __init__(self, processes=None, segment_size=None, min_text_length=1000000, overlap=1024):
+        """
+        Инициализация.
+
+        Args:
+            processes (int, optional): Количество рабочих процессов. По умолчанию - по числу ядер.
+            segment_size (int, optional): Размер сегмента в символах. По умолчанию текст делится
+                                          на четыре сегмента на процесс (не меньше 64 тыс. символов).
+            min_text_length (int, optional): Минимальная длина текста для параллельного поиска;
+                                             более короткие тексты обрабатываются в текущем процессе.
+            overlap (int, optional): Запас в символах за границей сегмента; совпадения длиннее
+                                     запаса на стыке сегментов могут быть найдены не полностью.
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.segment_size = segment_size
+        self.min_text_length = min_text_length
+        self.overlap = overlap
+
+    def available(self, text):
+        """
+        Проверка, имеет ли смысл параллельный поиск для текста.
+
+        Args:
+            text (str): Текст.
+
+        Returns:
+            bool: True, если текст достаточно длинный и процесс может порождать рабочие процессы.
+        """
+        return (
+            self.processes > 1
+            and len(text) >= self.min_text_length
+            and "fork" in multiprocessing.get_all_start_methods()
+            and not multiprocessing.current_process().daemon
+        )
+
+    def start(self, recognizer, text, profile):
+        """
+        Запуск поиска в рабочих процессах.
+
+        Args:
+            recognizer (EntityRecognizer): Распознаватель с выражениями и словарями.
+            text (str): Текст.
+            profile (ConfigurationProfile): Профиль настроек.
+
+        Returns:
+            PendingDetection: Выполняемый поиск или None, если параллельный поиск не применяется.
+        """
+        if not self.available(text):
+            return None
+        segment_size = self.segment_size or max(65536, -(-len(text) // (self.processes * 4)))
+        segments = split_segments(text, segment_size)
+        if len(segments) < 2:
+            return None
+
+        pool = multiprocessing.get_context("fork").Pool(
+            min(self.processes, len(segments)),
+            initializer=_init_worker,
+            initargs=(recognizer, text, profile, self.overlap)
+        )
+        logger.debug(f"Detecting entities in {len(segments)} segments with {pool._processes} processes")
+        return PendingDetection(pool, pool.map_async(_detect_segment, segments, chunksize=1), segments)
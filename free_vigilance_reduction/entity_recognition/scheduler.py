@@ -0,0 +1,335 @@
+"""
+Модуль планировщика обращений к модели с учетом стоимости в токенах и приоритетов.
+
+Запрос к модели разбивается на окна, каждое окно - отдельная единица работы со
+стоимостью, оцененной по длине текста. Единицы работы распределяются между
+полосами приоритета (например, "interactive" и "bulk") по взвешенной справедливой
+очереди: полоса с меньшим виртуальным временем окончания получает модель первой,
+поэтому короткие интерактивные запросы не ждут окончания большого документа,
+а пакетная обработка продолжает загружать модель в промежутках. Внутри полосы
+окна разных запросов чередуются по кругу.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from .model_backend import ModelBackend
+from ..utils.logging import get_logger
+from ..utils.timing import record_stage
+
+logger = get_logger(__name__)
+
+_current_priority = contextvars.ContextVar("fvr_request_priority", default=None)
+
+
+@contextmanager
+def request_priority(lane):
+    """
+    Назначение полосы приоритета обращениям к модели в текущем контексте.
+
+    Args:
+        lane (str): Имя полосы.
+    """
+    token = _current_priority.set(lane)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _Job:
+    """Единицы работы одного запроса в полосе."""
+
+    __slots__ = ("items", "cancelled")
+
+    def __init__(self, items):
+        self.items = deque(items)
+        self.cancelled = False
+
+
+class _Lane:
+    """Полоса приоритета: вес, виртуальное время и очередь запросов."""
+
+    __slots__ = ("name", "weight", "virtual_time", "jobs")
+
+    def __init__(self, name, weight):
+        self.name = name
+        self.weight = weight
+        self.virtual_time = 0.0
+        self.jobs = deque()
+
+
+class TokenBudgetScheduler:
+    """
+    Планировщик единиц работы с ограничением параллелизма и объема токенов в обработке.
+    Один планировщик можно использовать из многих потоков и для нескольких моделей.
+    """
+
+    DEFAULT_LANES = {"interactive": 8.0, "bulk": 1.0}
+
+    def __init__(self, max_concurrency=1, max_tokens_in_flight=None, lanes=None, default_lane="interactive"):
+        """
+        Инициализация планировщика.
+
+        Args:
+            max_concurrency (int, optional): Количество одновременно выполняемых единиц работы.
+            max_tokens_in_flight (int, optional): Максимальная суммарная стоимость выполняемых
+                                                  единиц работы (бюджет памяти). Единица работы
+                                                  дороже бюджета выполняется, когда модель свободна.
+            lanes (dict, optional): Полоса -> вес. По умолчанию DEFAULT_LANES.
+            default_lane (str, optional): Полоса для запросов без назначенного приоритета.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_tokens_in_flight = max_tokens_in_flight
+        self.lanes = OrderedDict(
+            (name, _Lane(name, float(weight))) for name, weight in (lanes or self.DEFAULT_LANES).items()
+        )
+        if default_lane not in self.lanes:
+            raise ValueError(f"Unknown default lane: {default_lane}")
+        self.default_lane = default_lane
+        self.tokens_in_flight = 0
+        self.running = 0
+        self._virtual_clock = 0.0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"fvr-scheduler-{i}", daemon=True)
+            for i in range(max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, calls, lane=None):
+        """
+        Постановка единиц работы одного запроса в очередь.
+
+        Args:
+            calls (list): Пары (стоимость в токенах, функция без аргументов).
+            lane (str, optional): Полоса. По умолчанию - из request_priority(), а если такой
+                                  полосы нет - default_lane.
+
+        Returns:
+            list: Future для каждой единицы работы в порядке calls.
+        """
+        if lane is None:
+            lane = _current_priority.get()
+            if lane not in self.lanes:
+                lane = self.default_lane
+        elif lane not in self.lanes:
+            raise ValueError(f"Unknown priority lane: {lane}")
+
+        context = contextvars.copy_context()
+        futures = [Future() for _ in calls]
+        job = _Job((cost, context, call, future) for (cost, call), future in zip(calls, futures))
+        if not job.items:
+            return futures
+        for future in futures:
+            future.job = job
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            state = self.lanes[lane]
+            if not state.jobs:
+                state.virtual_time = max(state.virtual_time, self._virtual_clock)
+            state.jobs.append(job)
+            self._condition.notify_all()
+        return futures
+
+    def run(self, calls, lane=None):
+        """
+        Выполнение единиц работы запроса с ожиданием результатов.
+        При ошибке оставшиеся единицы работы запроса отменяются.
+
+        Args:
+            calls (list): Пары (стоимость в токенах, функция без аргументов).
+            lane (str, optional): Полоса приоритета.
+
+        Returns:
+            list: Результаты функций в порядке calls.
+        """
+        futures = self.submit(calls, lane)
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            if futures:
+                futures[0].job.cancelled = True
+            raise
+
+    def close(self, timeout=None):
+        """
+        Остановка рабочих потоков после выполнения поставленных единиц работы.
+
+        Args:
+            timeout (float, optional): Максимальное время ожидания каждого потока.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def stats(self):
+        """
+        Текущее состояние очередей.
+
+        Returns:
+            dict: Количество ожидающих единиц работы по полосам, выполняемых единиц и токенов.
+        """
+        with self._condition:
+            return {
+                "queued": {name: sum(len(job.items) for job in lane.jobs) for name, lane in self.lanes.items()},
+                "running": self.running,
+                "tokens_in_flight": self.tokens_in_flight
+            }
+
+    def _next_item(self):
+        """
+        Выбор следующей единицы работы (вызывается под блокировкой).
+
+        Returns:
+            tuple: (стоимость, контекст, функция, future) или None, если выбрать нечего.
+        """
+        best = None
+        best_finish = None
+        for lane in self.lanes.values():
+            while lane.jobs and (lane.jobs[0].cancelled or not lane.jobs[0].items):
+                self._cancel(lane.jobs.popleft())
+            if not lane.jobs:
+                continue
+            cost = lane.jobs[0].items[0][0]
+            finish = lane.virtual_time + max(cost, 1) / lane.weight
+            if best is None or finish < best_finish:
+                best, best_finish = lane, finish
+
+        if best is None:
+            return None
+        cost = best.jobs[0].items[0][0]
+        if self.running and self.max_tokens_in_flight is not None and \
+                self.tokens_in_flight + cost > self.max_tokens_in_flight:
+            return None
+
+        job = best.jobs.popleft()
+        item = job.items.popleft()
+        if job.items:
+            best.jobs.append(job)
+        self._virtual_clock = best.virtual_time
+        best.virtual_time = best_finish
+        return item
+
+    def _cancel(self, job):
+        """Отмена оставшихся единиц работы запроса."""
+        while job.items:
+            job.items.popleft()[3].cancel()
+
+    def _worker_loop(self):
+        """Цикл рабочего потока."""
+        while True:
+            with self._condition:
+                while True:
+                    item = self._next_item()
+                    if item is not None:
+                        break
+                    if self._closed and not any(lane.jobs for lane in self.lanes.values()):
+                        return
+                    self._condition.wait()
+                cost, context, call, future = item
+                self.running += 1
+                self.tokens_in_flight += cost
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(context.run(call))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._condition:
+                    self.running -= 1
+                    self.tokens_in_flight -= cost
+                    self._condition.notify_all()
+
+
+class ScheduledModelBackend(ModelBackend):
+    """
+    Модель, обращения к которой проходят через TokenBudgetScheduler.
+    Каждое окно текста - отдельная единица работы; найденные во всех окнах
+    сущности затем ищутся по всему тексту, как и при прямом обращении к модели.
+    """
+
+    def __init__(self, backend, scheduler, chars_per_token=3.0, prompt_tokens=128):
+        """
+        Инициализация.
+
+        Args:
+            backend (ModelBackend): Модель.
+            scheduler (TokenBudgetScheduler): Планировщик.
+            chars_per_token (float, optional): Среднее число символов текста на токен для оценки стоимости.
+            prompt_tokens (int, optional): Стоимость промпта и ответа сверх текста окна.
+        """
+        super().__init__(backend.window_size)
+        self.backend = backend
+        self.scheduler = scheduler
+        self.chars_per_token = chars_per_token
+        self.prompt_tokens = prompt_tokens
+
+    def estimate_tokens(self, text):
+        """
+        Оценка стоимости обработки окна в токенах.
+
+        Args:
+            text (str): Текст окна.
+
+        Returns:
+            int: Оценка количества токенов.
+        """
+        return int(len(text) / self.chars_per_token) + self.prompt_tokens
+
+    def search_entities(self, text, entities, profile, windows=None):
+        """
+        Поиск дополнительных сущностей с планированием окон.
+
+        Args:
+            text (str): Текст для анализа.
+            entities (list): Список уже найденных сущностей.
+            profile (ConfigurationProfile): Профиль настроек.
+            windows (list, optional): Окна (смещение, текст) для передачи модели.
+                                      По умолчанию текст разбивается на окна размера window_size.
+
+        Returns:
+            list: Обновленный список сущностей.
+        """
+        if windows is None:
+            windows = self._split_into_windows(text)
+
+        def window_call(window):
+            return lambda: self.backend.search_entities(window, [], profile, windows=[(0, window)])
+
+        submitted = time.perf_counter()
+        started = []
+
+        def timed(call):
+            def run():
+                started.append(time.perf_counter())
+                return call()
+            return run
+
+        calls = [(self.estimate_tokens(window), timed(window_call(window))) for _, window in windows]
+        results = self.scheduler.run(calls)
+        if started:
+            record_stage("model.queue_wait", min(started) - submitted)
+
+        mentions = OrderedDict()
+        for window_entities in results:
+            for entity in window_entities:
+                mentions[(entity.entity_type, entity.text)] = None
+        entities.extend(self._propagate_mentions(mentions, text))
+        return entities
+
+    def __getattr__(self, name):
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
@@ -0,0 +1,254 @@
+"""
+Модуль для поиска фрагментов, возвращенных моделью, в исходном тексте.
+
+Поиск идет по нормализованному представлению текста: регистр приведен к нижнему,
+"ё" заменена на "е", кавычки и тире приведены к одному виду, последовательности
+пробельных символов сжаты до одного пробела. Пока фрагментов немного, каждый из них
+ищется линейным просмотром; для большого набора фрагментов один раз строится суффиксный
+массив, и все вхождения находятся двоичным поиском за O(|s| log n). Позиции переводятся
+обратно в смещения исходного текста через таблицу смещений.
+"""
+
+import re
+import numpy as np
+from .entity import Entity
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Число фрагментов, начиная с которого построение суффиксного массива окупается:
+# построение стоит как несколько сотен линейных просмотров текста
+INDEX_MIN_MENTIONS = 512
+
+_TRANSLATION = str.maketrans({
+    "ё": "е",
+    "«": '"', "»": '"', "„": '"', "“": '"', "”": '"', "‟": '"', "'": '"', "‘": '"', "’": '"', "‚": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "−": "-"
+})
+_WHITESPACE = re.compile(r"\s+")
+_WHITESPACE_RUN = re.compile(r"\s\s+")
+
+
+def normalize(text):
+    """
+    Нормализованное представление текста с сохранением соответствия символов.
+
+    Args:
+        text (str): Исходный текст.
+
+    Returns:
+        tuple: (нормализованный текст, numpy-массив исходных позиций его символов;
+               int32, если текст короче 2^31 символов).
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Единичные символы, у которых строчная форма длиннее одного символа (например, "İ"),
+        # оставляются как есть, чтобы сохранить посимвольное соответствие.
+        lowered = "".join(lower if len(lower := char.lower()) == 1 else char for char in text)
+    lowered = lowered.translate(_TRANSLATION)
+
+    keep = np.ones(len(text), dtype=bool)
+    for match in _WHITESPACE_RUN.finditer(lowered):
+        keep[match.start() + 1:match.end()] = False
+    return _WHITESPACE.sub(" ", lowered), np.flatnonzero(keep).astype(_index_dtype(len(text)), copy=False)
+
+
+def _index_dtype(n):
+    """Наименьший тип numpy для позиций текста длины n."""
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+def is_word_bounded(text, start, end):
+    """
+    Проверка, что фрагмент не является частью более длинного слова.
+
+    Args:
+        text (str): Текст.
+        start (int): Начало фрагмента.
+        end (int): Конец фрагмента.
+
+    Returns:
+        bool: True, если по краям фрагмента нет продолжения слова.
+    """
+    if start > 0 and text[start].isalnum() and text[start - 1].isalnum():
+        return False
+    if end < len(text) and text[end - 1].isalnum() and text[end].isalnum():
+        return False
+    return True
+
+
+def build_suffix_array(text):
+    """
+    Построение суффиксного массива удвоением префиксов.
+    На первом шаге в один ключ упаковывается несколько символов, поэтому
+    число шагов сортировки - около log2(n / символов в ключе).
+
+    Args:
+        text (str): Текст.
+
+    Returns:
+        numpy.ndarray: Начальные позиции суффиксов в лексикографическом порядке
+                       (int32, если текст короче 2^31 символов).
+    """
+    n = len(text)
+    dtype = _index_dtype(n)
+    if n == 0:
+        return np.empty(0, dtype=dtype)
+
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    alphabet, rank = np.unique(codes, return_inverse=True)
+    bits = (len(alphabet) + 1).bit_length()
+    width = max(1, 62 // bits)
+    # Ранг 0 обозначает конец текста: более короткий суффикс меньше своих продолжений
+    padded = np.concatenate((rank.astype(np.int64) + 1, np.zeros(width, dtype=np.int64)))
+    key = np.zeros(n, dtype=np.int64)
+    for offset in range(width):
+        key = (key << bits) | padded[offset:offset + n]
+
+    step = width
+    while True:
+        order = np.argsort(key).astype(dtype, copy=False)
+        sorted_key = key[order]
+        del key
+        rank = np.empty(n, dtype=dtype)
+        rank[order] = np.concatenate(([1], np.cumsum(sorted_key[1:] != sorted_key[:-1]) + 1))
+        del sorted_key
+        if rank[order[-1]] == n or step >= n:
+            return order
+        # Ключ из двух рангов не помещается в int32, поэтому собирается в int64
+        key = rank.astype(np.int64) * (n + 1)
+        key[:n - step] += rank[step:]
+        step *= 2
+
+
+class SpanIndex:
+    """
+    Индекс всех подстрок документа для поиска фрагментов без учета регистра,
+    различий в пробелах, кавычках, тире и "ё"/"е".
+    Суффиксный массив строится при первом обращении к нему.
+    """
+
+    def __init__(self, text):
+        """
+        Инициализация индекса.
+
+        Args:
+            text (str): Исходный текст.
+        """
+        self.text = text
+        self.normalized, self.positions = normalize(text)
+        self._suffix_array = None
+
+    @property
+    def suffix_array(self):
+        """Суффиксный массив нормализованного текста."""
+        if self._suffix_array is None:
+            self._suffix_array = build_suffix_array(self.normalized)
+        return self._suffix_array
+
+    def find(self, span):
+        """
+        Поиск всех вхождений фрагмента по суффиксному массиву.
+
+        Args:
+            span (str): Фрагмент (например, сущность из ответа модели).
+
+        Returns:
+            list: Пары (начало, конец) в исходном тексте, упорядоченные по началу.
+        """
+        query = normalize(span)[0].strip()
+        if not query:
+            return []
+
+        low, high = self._bounds(query)
+        return self._to_original(sorted(self.suffix_array[low:high].tolist()), len(query))
+
+    def scan(self, span):
+        """
+        Поиск всех вхождений фрагмента линейным просмотром, без суффиксного массива.
+
+        Args:
+            span (str): Фрагмент (например, сущность из ответа модели).
+
+        Returns:
+            list: Пары (начало, конец) в исходном тексте, упорядоченные по началу.
+        """
+        query = normalize(span)[0].strip()
+        if not query:
+            return []
+
+        normalized = self.normalized
+        starts = []
+        start = normalized.find(query)
+        while start != -1:
+            starts.append(start)
+            start = normalized.find(query, start + 1)
+        return self._to_original(starts, len(query))
+
+    def find_entities(self, mentions):
+        """
+        Поиск всех вхождений набора сущностей.
+        Из пересекающихся совпадений выбирается самое левое и самое длинное;
+        совпадения внутри слов отбрасываются. Суффиксный массив строится, только
+        если сущностей не меньше INDEX_MIN_MENTIONS.
+
+        Args:
+            mentions (iterable): Пары (тип сущности, текст сущности).
+
+        Returns:
+            list: Сущности с текстом и позициями из исходного текста, упорядоченные по позиции.
+        """
+        mentions = list(mentions)
+        use_index = self._suffix_array is not None or len(mentions) >= INDEX_MIN_MENTIONS
+        search = self.find if use_index else self.scan
+
+        text = self.text
+        candidates = []
+        for entity_type, entity_text in mentions:
+            matches = search(entity_text)
+            if not matches:
+                logger.debug(f"Entity not found in text: {entity_text}")
+            for start, end in matches:
+                if is_word_bounded(text, start, end):
+                    candidates.append((start, start - end, entity_type))
+
+        candidates.sort()
+        entities = []
+        last_end = 0
+        for start, negative_length, entity_type in candidates:
+            if start < last_end:
+                continue
+            end = start - negative_length
+            entities.append(Entity(text[start:end], entity_type, start, end))
+            last_end = end
+        return entities
+
+    def _to_original(self, starts, length):
+        """Перевод начал совпадений длины length в пары позиций исходного текста."""
+        positions = self.positions
+        return [(int(positions[start]), int(positions[start + length - 1]) + 1) for start in starts]
+
+    def _bounds(self, query):
+        """Диапазон суффиксного массива, суффиксы которого начинаются с query."""
+        normalized, suffix_array = self.normalized, self.suffix_array
+        length = len(query)
+
+        low, high = 0, len(suffix_array)
+        while low < high:
+            middle = (low + high) // 2
+            start = suffix_array[middle]
+            if normalized[start:start + length] < query:
+                low = middle + 1
+            else:
+                high = middle
+        first = low
+
+        high = len(suffix_array)
+        while low < high:
+            middle = (low + high) // 2
+            start = suffix_array[middle]
+            if normalized[start:start + length] <= query:
+                low = middle + 1
+            else:
+                high = middle
+        return first, low
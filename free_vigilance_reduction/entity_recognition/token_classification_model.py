@@ -0,0 +1,180 @@
+import torch
+from transformers import AutoModelForTokenClassification, AutoTokenizer
+from ..utils.logging import get_logger
+from ..utils.timing import stage
+from collections import OrderedDict
+from .model_backend import ModelBackend, select_device
+from .mmap_weights import load_mmap_model
+
+logger = get_logger(__name__)
+
+
+class TokenClassificationModel(ModelBackend):
+    """
+    Модель разметки токенов (NER-энкодер).
+    Метки сущностей для всего окна получаются за один прямой проход,
+    а точные позиции в тексте - из offset mapping токенизатора.
+    """
+
+    def __init__(self, model_path, window_size=1000, label_map=None, batch_size=8, max_length=512,
+                 mmap_weights=False):
+        """
+        Инициализация модели разметки токенов.
+
+        Args:
+            model_path (str): Путь к файлам модели.
+            window_size (int, optional): Максимальный размер окна текста в символах.
+            label_map (dict, optional): Соответствие меток модели типам сущностей профиля
+                                        (например, {"PERSON": "PER"}).
+            batch_size (int, optional): Количество окон в одном прямом проходе.
+            max_length (int, optional): Максимальное количество токенов в окне.
+            mmap_weights (bool, optional): Отобразить веса safetensors в память без копирования
+                                           (только CPU), чтобы процессы, порожденные через fork,
+                                           разделяли одну копию весов.
+        """
+        super().__init__(window_size)
+        logger.info(f"Initializing token classification model from {model_path}")
+
+        self.label_map = label_map or {}
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = "cpu" if mmap_weights else select_device()
+        logger.info(f"Using device: {self.device}")
+
+        try:
+            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+            if mmap_weights:
+                self.model = load_mmap_model(AutoModelForTokenClassification, model_path)
+            else:
+                self.model = AutoModelForTokenClassification.from_pretrained(model_path)
+                self.model.to(self.device)
+                self.model.eval()
+            logger.info("Token classification model successfully loaded")
+        except Exception as e:
+            logger.error(f"Failed to load model: {str(e)}")
+            raise
+
+        self.id2label = {int(k): v for k, v in self.model.config.id2label.items()}
+
+    def search_entities(self, text, entities, profile, windows=None):
+        """
+        Поиск дополнительных сущностей с помощью модели разметки токенов.
+
+        Args:
+            text (str): Текст для анализа.
+            entities (list): Список уже найденных сущностей.
+            profile (ConfigurationProfile): Профиль настроек.
+            windows (list, optional): Окна (смещение, текст) для передачи модели.
+                                      По умолчанию обрабатывается весь текст.
+
+        Returns:
+            list: Обновленный список сущностей.
+        """
+        logger.debug(f"Token classification model processing text of length {len(text)}")
+
+        if windows is None:
+            windows = self._split_into_windows(text)
+
+        mentions = OrderedDict()
+        for batch_start in range(0, len(windows), self.batch_size):
+            texts = [window for _, window in windows[batch_start:batch_start + self.batch_size]]
+            for window, spans in zip(texts, self._predict_spans(texts)):
+                for start, end, entity_type in spans:
+                    if entity_type in profile.entity_types:
+                        mentions[(entity_type, window[start:end])] = None
+
+        new_entities = self._propagate_mentions(mentions, text)
+        logger.debug(f"Token classification model found {len(mentions)} unique entities, {len(new_entities)} occurrences")
+        entities.extend(new_entities)
+
+        return entities
+
+    def _predict_spans(self, texts):
+        """
+        Разметка пакета окон.
+
+        Args:
+            texts (list): Тексты окон.
+
+        Returns:
+            list: Для каждого окна список кортежей (начало, конец, тип сущности).
+        """
+        with stage("model.tokenize"):
+            encoding = self.tokenizer(
+                texts,
+                return_offsets_mapping=True,
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=self.max_length
+            )
+        offsets = encoding.pop("offset_mapping").tolist()
+        inputs = {k: v.to(self.device) for k, v in encoding.items()}
+
+        try:
+            with torch.no_grad(), stage("model.forward"):
+                logits = self.model(**inputs).logits
+        except Exception as e:
+            logger.error(f"Error during model inference: {str(e)}")
+            raise
+
+        predictions = logits.argmax(dim=-1).tolist()
+        return [
+            self._decode_spans(text, token_offsets, token_labels)
+            for text, token_offsets, token_labels in zip(texts, offsets, predictions)
+        ]
+
+    def _decode_spans(self, text, offsets, label_ids):
+        """
+        Сборка сущностей из меток токенов (схемы BIO и IO).
+
+        Args:
+            text (str): Текст окна.
+            offsets (list): Позиции токенов в тексте окна.
+            label_ids (list): Идентификаторы предсказанных меток.
+
+        Returns:
+            list: Список кортежей (начало, конец, тип сущности).
+        """
+        spans = []
+        current = None
+
+        for (start, end), label_id in zip(offsets, label_ids):
+            if start == end:
+                # Служебные токены и паддинг
+                continue
+
+            prefix, entity_type = self._split_label(self.id2label.get(label_id, "O"))
+            if entity_type is None:
+                current = None
+                continue
+
+            # Подслова одного слова объединяются даже при метке "B-"
+            continues = (
+                current is not None
+                and current[2] == entity_type
+                and (prefix != "B" or start == current[1])
+                and not text[current[1]:start].strip()
+            )
+            if continues:
+                current[1] = end
+            else:
+                current = [start, end, entity_type]
+                spans.append(current)
+
+        result = []
+        for start, end, entity_type in spans:
+            while start < end and text[start].isspace():
+                start += 1
+            if start < end:
+                result.append((start, end, entity_type))
+        return result
+
+    def _split_label(self, label):
+        """Разбор метки вида "B-PER" на префикс и тип сущности профиля."""
+        if label == "O":
+            return None, None
+        prefix, _, entity_type = label.partition("-")
+        if not entity_type:
+            prefix, entity_type = None, label
+        return prefix, self.label_map.get(entity_type, entity_type)
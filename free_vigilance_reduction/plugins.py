@@ -0,0 +1,152 @@
+"""
+Модуль реестра подключаемых компонентов: обработчиков документов, регулярных выражений
+и правил замены.
+
+Компоненты записываются в реестр по имени вместе со ссылкой вида "модуль:атрибут"
+и импортируются только при первом обращении, поэтому зависимости форматов
+(python-docx, PyPDF2) загружаются, когда встречается документ такого формата.
+Сторонние пакеты добавляют компоненты через точки входа (entry points) без изменения
+кода библиотеки, например в pyproject.toml:
+
+    [project.entry-points."free_vigilance_reduction.processors"]
+    odt = "fvr_odt:OdtProcessor"
+
+    [project.entry-points."free_vigilance_reduction.patterns"]
+    IBAN = "fvr_banking:IBAN_PATTERN"
+
+    [project.entry-points."free_vigilance_reduction.replacement_rules"]
+    hash = "fvr_banking:hash_replacement"
+"""
+
+from functools import lru_cache
+from importlib.metadata import EntryPoint, entry_points
+from .utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+PROCESSORS_GROUP = "free_vigilance_reduction.processors"
+PATTERNS_GROUP = "free_vigilance_reduction.patterns"
+REPLACEMENT_RULES_GROUP = "free_vigilance_reduction.replacement_rules"
+
+
+@lru_cache(maxsize=None)
+def discover(group):
+    """
+    Точки входа группы из установленных пакетов. Метаданные пакетов читаются
+    один раз на группу и только при первом обращении к ней.
+
+    Args:
+        group (str): Группа точек входа.
+
+    Returns:
+        dict: Имя -> EntryPoint.
+    """
+    found = entry_points()
+    if hasattr(found, "select"):
+        found = found.select(group=group)
+    else:
+        found = found.get(group, ())
+    plugins = {entry_point.name: entry_point for entry_point in found}
+    if plugins:
+        logger.info(f"Discovered plugins in {group}: {', '.join(sorted(plugins))}")
+    return plugins
+
+
+class PluginRegistry:
+    """
+    Реестр компонентов одной группы с импортом при первом обращении.
+    Компоненты, зарегистрированные явно, имеют приоритет над точками входа
+    установленных пакетов с тем же именем.
+    """
+
+    def __init__(self, group, builtins=None):
+        """
+        Инициализация реестра.
+
+        Args:
+            group (str): Группа точек входа.
+            builtins (dict, optional): Имя -> компонент или ссылка "модуль:атрибут".
+        """
+        self.group = group
+        self._references = {}
+        self._loaded = {}
+        self._failed = set()
+        for name, plugin in (builtins or {}).items():
+            self.register(name, plugin)
+
+    def register(self, name, plugin):
+        """
+        Регистрация компонента.
+
+        Args:
+            name (str): Имя компонента.
+            plugin: Компонент или ссылка "модуль:атрибут" для импорта при первом обращении.
+        """
+        self._loaded.pop(name, None)
+        self._references.pop(name, None)
+        self._failed.discard(name)
+        if isinstance(plugin, str):
+            self._references[name] = EntryPoint(name, plugin, self.group)
+        else:
+            self._loaded[name] = plugin
+
+    def names(self):
+        """
+        Имена всех известных компонентов без их импорта.
+
+        Returns:
+            list: Имена зарегистрированных компонентов и точек входа.
+        """
+        names = dict.fromkeys(self._loaded)
+        names.update(dict.fromkeys(self._references))
+        names.update(dict.fromkeys(discover(self.group)))
+        return list(names)
+
+    def __contains__(self, name):
+        return name in self._loaded or name in self._references or name in discover(self.group)
+
+    def load(self, name):
+        """
+        Получение компонента с импортом при первом обращении.
+
+        Args:
+            name (str): Имя компонента.
+
+        Returns:
+            Компонент.
+
+        Raises:
+            KeyError: Если компонент с таким именем не известен.
+            ImportError: Если модуль компонента или его зависимости не установлены.
+        """
+        plugin = self._loaded.get(name)
+        if plugin is not None:
+            return plugin
+        reference = self._references.get(name) or discover(self.group).get(name)
+        if reference is None:
+            raise KeyError(name)
+        plugin = reference.load()
+        self._loaded[name] = plugin
+        logger.debug(f"Loaded plugin {name} from {reference.value}")
+        return plugin
+
+    def get(self, name):
+        """
+        Получение компонента, если он известен и импортируется.
+
+        Args:
+            name (str): Имя компонента.
+
+        Returns:
+            Компонент или None. Ошибка импорта записывается в лог один раз.
+        """
+        if name in self._failed:
+            return None
+        try:
+            return self.load(name)
+        except KeyError:
+            return None
+        except (ImportError, AttributeError) as e:
+            self._failed.add(name)
+            logger.error(f"Failed to load plugin {name} from {self.group}: {str(e)}")
+            return None
@@ -0,0 +1,172 @@
+"""
+Модуль для асинхронной доставки событий наблюдателям.
+"""
+
+import atexit
+import queue
+import threading
+import time
+import weakref
+from .observers import ProcessingObserver
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_live_observers = weakref.WeakSet()
+_STOP = object()
+
+
+class AsyncObserver(ProcessingObserver):
+    """
+    Обертка, передающая события наблюдателю через ограниченную очередь.
+    У каждого обернутого наблюдателя свой фоновый поток, поэтому медленный
+    наблюдатель не задерживает ни обработку документов, ни других наблюдателей.
+    События одного наблюдателя доставляются в порядке возникновения.
+    """
+
+    POLICIES = ("block", "drop")
+
+    def __init__(self, observer, queue_size=1000, full_policy="block"):
+        """
+        Инициализация обертки.
+
+        Args:
+            observer (ProcessingObserver): Наблюдатель, получающий события.
+            queue_size (int, optional): Максимальное число ожидающих событий.
+            full_policy (str, optional): Поведение при заполненной очереди:
+                                         "block" - ждать освобождения места,
+                                         "drop" - отбросить событие.
+        """
+        if full_policy not in self.POLICIES:
+            raise ValueError(f"Unknown full_policy: {full_policy}. Expected one of {self.POLICIES}")
+
+        self.observer = observer
+        self.full_policy = full_policy
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._stop_sent = False
+        self._close_lock = threading.Lock()
+        self._worker = threading.Thread(
+            target=self._run, name=f"fvr-observer-{type(observer).__name__}", daemon=True
+        )
+        self._worker.start()
+        _live_observers.add(self)
+
+    def on_process_start(self, document=None, text=None):
+        """Постановка события в очередь наблюдателя."""
+        self._submit("on_process_start", document, text)
+
+    def on_entities_detected(self, entities):
+        """Постановка события в очередь наблюдателя."""
+        self._submit("on_entities_detected", entities)
+
+    def on_text_reduced(self, reduced_text):
+        """Постановка события в очередь наблюдателя."""
+        self._submit("on_text_reduced", reduced_text)
+
+    def on_stage_timing(self, stage, duration):
+        """Постановка события в очередь наблюдателя."""
+        self._submit("on_stage_timing", stage, duration)
+
+    def on_process_complete(self, report):
+        """Постановка события в очередь наблюдателя."""
+        self._submit("on_process_complete", report)
+
+    def on_error(self, error):
+        """Постановка события в очередь наблюдателя."""
+        self._submit("on_error", error)
+
+    def _submit(self, method, *args):
+        """
+        Постановка события в очередь.
+
+        Args:
+            method (str): Имя метода наблюдателя.
+            *args: Аргументы метода.
+        """
+        if self._closed:
+            logger.warning(f"Event {method} sent to closed AsyncObserver for {self.observer}")
+            return
+
+        if self.full_policy == "block":
+            self._queue.put((method, args))
+            return
+
+        try:
+            self._queue.put_nowait((method, args))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Observer queue for {self.observer} is full, {self.dropped} events dropped")
+
+    def _run(self):
+        """Цикл фонового потока: доставка событий наблюдателю."""
+        while True:
+            method, args = self._queue.get()
+            try:
+                if method is _STOP:
+                    return
+                getattr(self.observer, method)(*args)
+            except Exception as e:
+                logger.error(f"Observer {self.observer} failed in {method}: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+        Ожидание доставки всех поставленных в очередь событий.
+
+        Args:
+            timeout (float, optional): Максимальное время ожидания в секундах.
+
+        Returns:
+            bool: True, если все события доставлены.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """
+        Доставка оставшихся событий и остановка фонового потока.
+        Новые события после вызова не принимаются; если ожидание прервано по timeout,
+        повторный вызов продолжает ожидание.
+
+        Args:
+            timeout (float, optional): Максимальное время ожидания в секундах, в том числе
+                                       места в заполненной очереди для сигнала остановки.
+
+        Returns:
+            bool: True, если все события доставлены и поток остановлен. Иначе поток
+                  продолжает доставку оставшихся событий в фоне.
+        """
+        self._closed = True
+        with self._close_lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            if not self._stop_sent:
+                try:
+                    self._queue.put((_STOP, ()), timeout=timeout)
+                except queue.Full:
+                    logger.warning(f"Observer queue for {self.observer} is still full after {timeout} s, "
+                                   f"{self._queue.qsize()} events are not delivered yet")
+                    return False
+                self._stop_sent = True
+                _live_observers.discard(self)
+            self._worker.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        return not self._worker.is_alive()
+
+    def __repr__(self):
+        return f"AsyncObserver({self.observer!r}, full_policy={self.full_policy!r})"
+
+
+@atexit.register
+def _close_live_observers():
+    """Доставка событий, оставшихся в очередях, при завершении интерпретатора."""
+    for observer in list(_live_observers):
+        observer.close(timeout=5.0)
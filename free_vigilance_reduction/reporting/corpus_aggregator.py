@@ -0,0 +1,454 @@
+"""
+Модуль для накопления сводной статистики по корпусу документов.
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import threading
+from .observers import ProcessingObserver
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class DistinctCounter:
+    """
+    Приближенный подсчет числа различных значений (HyperLogLog).
+    Память постоянна (2^precision байт), сами значения не хранятся.
+    Счетчики с одинаковой точностью объединяются без потери точности.
+    """
+
+    def __init__(self, precision=12):
+        """
+        Инициализация счетчика.
+
+        Args:
+            precision (int, optional): Число бит индекса регистра (4-16).
+                                       Относительная ошибка около 1.04 / sqrt(2^precision).
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        """
+        Учет значения.
+
+        Args:
+            value (str): Значение.
+        """
+        digest = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = digest >> (64 - self.precision)
+        rest = digest & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        Объединение с другим счетчиком.
+
+        Args:
+            other (DistinctCounter): Счетчик с той же точностью.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge distinct counters with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        """
+        Оценка числа различных значений.
+
+        Returns:
+            int: Оценка.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def to_dict(self):
+        """Сериализация счетчика."""
+        return {"precision": self.precision, "registers": base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Восстановление счетчика из результата to_dict."""
+        counter = cls(data["precision"])
+        counter.registers = bytearray(base64.b64decode(data["registers"]))
+        return counter
+
+
+class DurationStats:
+    """
+    Сводка длительностей: количество, сумма, минимум, максимум и
+    логарифмическая гистограмма для оценки квантилей.
+    """
+
+    MIN_SECONDS = 1e-4
+    BUCKETS = 32
+
+    def __init__(self):
+        """
+        Инициализация сводки.
+        """
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = [0] * self.BUCKETS
+
+    def add(self, seconds):
+        """
+        Учет длительности.
+
+        Args:
+            seconds (float): Длительность в секундах.
+        """
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.histogram[self._bucket(seconds)] += 1
+
+    def merge(self, other):
+        """
+        Объединение с другой сводкой.
+
+        Args:
+            other (DurationStats): Сводка.
+        """
+        self.count += other.count
+        self.total += other.total
+        for name, pick in (("min", min), ("max", max)):
+            values = [v for v in (getattr(self, name), getattr(other, name)) if v is not None]
+            setattr(self, name, pick(values) if values else None)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def quantile(self, q):
+        """
+        Оценка квантиля сверху (граница корзины гистограммы).
+
+        Args:
+            q (float): Уровень квантиля от 0 до 1.
+
+        Returns:
+            float: Оценка в секундах или None, если данных нет.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.histogram):
+            cumulative += count
+            if cumulative >= rank and count:
+                return min(self.MIN_SECONDS * 2 ** index, self.max)
+        return self.max
+
+    def _bucket(self, seconds):
+        """Номер корзины: верхняя граница корзины i равна MIN_SECONDS * 2^i."""
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        return min(self.BUCKETS - 1, math.ceil(math.log2(seconds / self.MIN_SECONDS)))
+
+    def to_dict(self):
+        """Сериализация сводки."""
+        return {"count": self.count, "total": self.total, "min": self.min, "max": self.max,
+                "histogram": self.histogram}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Восстановление сводки из результата to_dict."""
+        stats = cls()
+        stats.count = data["count"]
+        stats.total = data["total"]
+        stats.min = data["min"]
+        stats.max = data["max"]
+        stats.histogram = list(data["histogram"])
+        return stats
+
+
+class CorpusAggregator(ProcessingObserver):
+    """
+    Накопление сводной статистики по корпусу по мере обработки документов.
+    Отчеты не сохраняются: учитываются счетчики по типам сущностей, число
+    различных значений (приближенно), документы без находок и длительности этапов.
+    Сводка по каждому документу дописывается строкой в NDJSON-файл.
+    Частичные сводки параллельных обработчиков объединяются методом merge.
+
+    Может использоваться как наблюдатель FreeVigilanceReduction или напрямую через add.
+    """
+
+    def __init__(self, ndjson_path=None, distinct_precision=12):
+        """
+        Инициализация агрегатора.
+
+        Args:
+            ndjson_path (str, optional): Файл для построчных сводок по документам.
+            distinct_precision (int, optional): Точность приближенного подсчета различных значений.
+        """
+        self.ndjson_path = ndjson_path
+        self.distinct_precision = distinct_precision
+        self.documents = 0
+        self.failed_documents = 0
+        self.documents_without_entities = 0
+        self.characters = 0
+        self.entities = {}
+        self.replacements = {}
+        self.distinct_values = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def on_process_start(self, document=None, text=None):
+        """
+        Вызывается при начале обработки документа или текста.
+
+        Args:
+            document (str, optional): Путь к обрабатываемому документу.
+            text (str, optional): Обрабатываемый текст.
+        """
+        self._local.document = document
+        self._local.timings = {}
+
+    def on_entities_detected(self, entities):
+        """
+        Вызывается после обнаружения сущностей.
+
+        Args:
+            entities (list): Список обнаруженных сущностей.
+        """
+        pass
+
+    def on_text_reduced(self, reduced_text):
+        """
+        Вызывается после анонимизации текста.
+
+        Args:
+            reduced_text (str): Анонимизированный текст.
+        """
+        pass
+
+    def on_stage_timing(self, stage, duration):
+        """
+        Вызывается для каждого замеренного этапа.
+
+        Args:
+            stage (str): Имя этапа.
+            duration (float): Длительность этапа в секундах.
+        """
+        timings = getattr(self._local, "timings", None)
+        if timings is not None:
+            timings[stage] = duration
+
+    def on_process_complete(self, report):
+        """
+        Вызывается при завершении обработки.
+
+        Args:
+            report (ReductionReport): Отчет о результатах анонимизации.
+        """
+        self.add(report, document=getattr(self._local, "document", None),
+                 timings=getattr(self._local, "timings", None))
+
+    def on_error(self, error):
+        """
+        Вызывается при возникновении ошибки.
+
+        Args:
+            error (Exception): Возникшая ошибка.
+        """
+        with self._lock:
+            self.failed_documents += 1
+            self._append_line({
+                "document": getattr(self._local, "document", None),
+                "status": "error",
+                "error": str(error)
+            })
+
+    def add(self, report, document=None, timings=None):
+        """
+        Учет отчета об одном документе.
+
+        Args:
+            report (ReductionReport): Отчет о результатах анонимизации.
+            document (str, optional): Путь к документу.
+            timings (dict, optional): Длительности этапов в секундах.
+        """
+        entity_counts = {}
+        values = []
+        for entity in report.iter_entities():
+            entity_counts[entity.entity_type] = entity_counts.get(entity.entity_type, 0) + 1
+            values.append((entity.entity_type, " ".join(entity.text.lower().split())))
+        replacement_counts = report.replacement_counts()
+        timings = timings or {}
+
+        with self._lock:
+            self.documents += 1
+            self.characters += len(report.original_text)
+            if not entity_counts:
+                self.documents_without_entities += 1
+            _add_counts(self.entities, entity_counts)
+            _add_counts(self.replacements, replacement_counts)
+            for entity_type, value in values:
+                counter = self.distinct_values.get(entity_type)
+                if counter is None:
+                    counter = self.distinct_values[entity_type] = DistinctCounter(self.distinct_precision)
+                counter.add(value)
+            for stage, seconds in timings.items():
+                self.timings.setdefault(stage, DurationStats()).add(seconds)
+
+            self._append_line({
+                "document": document,
+                "request_id": report.request_id,
+                "status": "success",
+                "characters": len(report.original_text),
+                "entities": entity_counts,
+                "replacements": replacement_counts,
+                "timings": timings
+            })
+
+    def _append_line(self, record):
+        """Дописывание строки в NDJSON-файл (вызывается под блокировкой)."""
+        if self.ndjson_path is None:
+            return
+        with open(self.ndjson_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def merge(self, other):
+        """
+        Добавление частичной сводки другого агрегатора (например, из параллельного процесса).
+
+        Args:
+            other (CorpusAggregator|dict): Агрегатор или результат его to_dict.
+        """
+        if isinstance(other, dict):
+            other = self.from_dict(other)
+
+        with self._lock:
+            self.documents += other.documents
+            self.failed_documents += other.failed_documents
+            self.documents_without_entities += other.documents_without_entities
+            self.characters += other.characters
+            _add_counts(self.entities, other.entities)
+            _add_counts(self.replacements, other.replacements)
+            for entity_type, counter in other.distinct_values.items():
+                if entity_type in self.distinct_values:
+                    self.distinct_values[entity_type].merge(counter)
+                else:
+                    self.distinct_values[entity_type] = DistinctCounter.from_dict(counter.to_dict())
+            for stage, stats in other.timings.items():
+                self.timings.setdefault(stage, DurationStats()).merge(stats)
+
+    def summary(self):
+        """
+        Итоговые показатели по корпусу.
+
+        Returns:
+            dict: Сводка с оценками различных значений и квантилей длительности этапов.
+        """
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "failed_documents": self.failed_documents,
+                "documents_without_entities": self.documents_without_entities,
+                "characters": self.characters,
+                "entities": dict(self.entities),
+                "replacements": dict(self.replacements),
+                "distinct_entities": {t: c.estimate() for t, c in self.distinct_values.items()},
+                "timings": {
+                    stage: {
+                        "count": stats.count,
+                        "total_s": stats.total,
+                        "mean_s": stats.total / stats.count if stats.count else None,
+                        "max_s": stats.max,
+                        "p50_s": stats.quantile(0.5),
+                        "p95_s": stats.quantile(0.95)
+                    }
+                    for stage, stats in self.timings.items()
+                }
+            }
+
+    def to_dict(self):
+        """
+        Сериализация частичной сводки для объединения.
+
+        Returns:
+            dict: Состояние агрегатора.
+        """
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "failed_documents": self.failed_documents,
+                "documents_without_entities": self.documents_without_entities,
+                "characters": self.characters,
+                "entities": dict(self.entities),
+                "replacements": dict(self.replacements),
+                "distinct_precision": self.distinct_precision,
+                "distinct_values": {t: c.to_dict() for t, c in self.distinct_values.items()},
+                "timings": {stage: stats.to_dict() for stage, stats in self.timings.items()}
+            }
+
+    @classmethod
+    def from_dict(cls, data, ndjson_path=None):
+        """
+        Восстановление агрегатора из результата to_dict.
+
+        Args:
+            data (dict): Состояние агрегатора.
+            ndjson_path (str, optional): Файл для построчных сводок по документам.
+
+        Returns:
+            CorpusAggregator: Агрегатор.
+        """
+        aggregator = cls(ndjson_path, data["distinct_precision"])
+        aggregator.documents = data["documents"]
+        aggregator.failed_documents = data["failed_documents"]
+        aggregator.documents_without_entities = data["documents_without_entities"]
+        aggregator.characters = data["characters"]
+        aggregator.entities = dict(data["entities"])
+        aggregator.replacements = dict(data["replacements"])
+        aggregator.distinct_values = {t: DistinctCounter.from_dict(c) for t, c in data["distinct_values"].items()}
+        aggregator.timings = {stage: DurationStats.from_dict(s) for stage, s in data["timings"].items()}
+        return aggregator
+
+    def save(self, file_path):
+        """
+        Сохранение частичной сводки в JSON-файл.
+
+        Args:
+            file_path (str): Путь к файлу.
+        """
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+        logger.info(f"Corpus aggregate saved to {file_path}")
+
+    @classmethod
+    def load(cls, file_path, ndjson_path=None):
+        """
+        Загрузка частичной сводки из JSON-файла.
+
+        Args:
+            file_path (str): Путь к файлу.
+            ndjson_path (str, optional): Файл для построчных сводок по документам.
+
+        Returns:
+            CorpusAggregator: Агрегатор.
+        """
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return cls.from_dict(json.load(file), ndjson_path)
+
+
+def _add_counts(target, counts):
+    """Прибавление счетчиков из словаря counts к target."""
+    for key, count in counts.items():
+        target[key] = target.get(key, 0) + count
@@ -0,0 +1,194 @@
+"""
+Модуль для сбора метрик процесса анонимизации в формате Prometheus.
+"""
+
+import bisect
+import os
+import tempfile
+import threading
+from .observers import ProcessingObserver
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MetricsCollector(ProcessingObserver):
+    """
+    Наблюдатель, накапливающий счетчики и гистограммы длительности этапов.
+    Метрики выводятся в текстовом формате Prometheus (render) или записываются
+    в файл для node_exporter textfile collector (dump).
+    Один сборщик можно подключать к нескольким экземплярам FreeVigilanceReduction
+    из разных потоков.
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, prefix="fvr", buckets=None):
+        """
+        Инициализация сборщика.
+
+        Args:
+            prefix (str, optional): Префикс имен метрик.
+            buckets (tuple, optional): Верхние границы корзин гистограммы в секундах.
+        """
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.documents = {}
+        self.characters = 0
+        self.entities = {}
+        self.replacements = {}
+        self.stage_histograms = {}
+
+    def on_process_start(self, document=None, text=None):
+        """
+        Вызывается при начале обработки документа или текста.
+
+        Args:
+            document (str, optional): Путь к обрабатываемому документу.
+            text (str, optional): Обрабатываемый текст.
+        """
+        self._local.kind = "document" if document else "text"
+
+    def on_entities_detected(self, entities):
+        """
+        Вызывается после обнаружения сущностей.
+
+        Args:
+            entities (list): Список обнаруженных сущностей.
+        """
+        counts = {}
+        for entity in entities:
+            key = (entity.entity_type, getattr(entity, "source", None) or "unknown")
+            counts[key] = counts.get(key, 0) + 1
+
+        with self._lock:
+            for key, count in counts.items():
+                self.entities[key] = self.entities.get(key, 0) + count
+
+    def on_text_reduced(self, reduced_text):
+        """
+        Вызывается после анонимизации текста.
+
+        Args:
+            reduced_text (str): Анонимизированный текст.
+        """
+        pass
+
+    def on_stage_timing(self, stage, duration):
+        """
+        Вызывается для каждого замеренного этапа.
+
+        Args:
+            stage (str): Имя этапа.
+            duration (float): Длительность этапа в секундах.
+        """
+        with self._lock:
+            histogram = self.stage_histograms.get(stage)
+            if histogram is None:
+                histogram = self.stage_histograms[stage] = {
+                    "counts": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                    "count": 0
+                }
+            histogram["counts"][bisect.bisect_left(self.buckets, duration)] += 1
+            histogram["sum"] += duration
+            histogram["count"] += 1
+
+    def on_process_complete(self, report):
+        """
+        Вызывается при завершении обработки.
+
+        Args:
+            report (ReductionReport): Отчет о результатах анонимизации.
+        """
+        with self._lock:
+            self._count_document("success")
+            self.characters += len(report.original_text)
+            for entity_type, count in report.replacement_counts().items():
+                self.replacements[entity_type] = self.replacements.get(entity_type, 0) + count
+
+    def on_error(self, error):
+        """
+        Вызывается при возникновении ошибки.
+
+        Args:
+            error (Exception): Возникшая ошибка.
+        """
+        with self._lock:
+            self._count_document("error")
+
+    def _count_document(self, status):
+        """Увеличение счетчика обработанных документов (вызывается под блокировкой)."""
+        key = (getattr(self._local, "kind", "text"), status)
+        self.documents[key] = self.documents.get(key, 0) + 1
+
+    def render(self):
+        """
+        Представление метрик в текстовом формате Prometheus.
+
+        Returns:
+            str: Текст для отдачи по HTTP или записи в файл.
+        """
+        p = self.prefix
+        lines = []
+
+        with self._lock:
+            lines.append(f"# HELP {p}_documents_total Processed documents and texts.")
+            lines.append(f"# TYPE {p}_documents_total counter")
+            for (kind, status), value in sorted(self.documents.items()):
+                lines.append(f'{p}_documents_total{{kind="{kind}",status="{status}"}} {value}')
+
+            lines.append(f"# HELP {p}_characters_total Characters of successfully processed input.")
+            lines.append(f"# TYPE {p}_characters_total counter")
+            lines.append(f"{p}_characters_total {self.characters}")
+
+            lines.append(f"# HELP {p}_entities_total Detected entities by type and detection source.")
+            lines.append(f"# TYPE {p}_entities_total counter")
+            for (entity_type, source), value in sorted(self.entities.items()):
+                lines.append(f'{p}_entities_total{{type="{_escape(entity_type)}",source="{_escape(source)}"}} {value}')
+
+            lines.append(f"# HELP {p}_replacements_total Replacements made by entity type.")
+            lines.append(f"# TYPE {p}_replacements_total counter")
+            for entity_type, value in sorted(self.replacements.items()):
+                lines.append(f'{p}_replacements_total{{type="{_escape(entity_type)}"}} {value}')
+
+            lines.append(f"# HELP {p}_stage_duration_seconds Duration of processing stages.")
+            lines.append(f"# TYPE {p}_stage_duration_seconds histogram")
+            for stage, histogram in sorted(self.stage_histograms.items()):
+                label = f'stage="{_escape(stage)}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram["counts"]):
+                    cumulative += count
+                    lines.append(f'{p}_stage_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{p}_stage_duration_seconds_bucket{{{label},le="+Inf"}} {histogram["count"]}')
+                lines.append(f'{p}_stage_duration_seconds_sum{{{label}}} {histogram["sum"]}')
+                lines.append(f'{p}_stage_duration_seconds_count{{{label}}} {histogram["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, file_path):
+        """
+        Атомарная запись метрик в файл: читатель никогда не увидит файл записанным наполовину.
+
+        Args:
+            file_path (str): Путь к файлу (обычно *.prom).
+        """
+        directory = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                file.write(self.render())
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.debug(f"Metrics written to {file_path}")
+
+
+def _escape(value):
+    """Экранирование значения метки Prometheus."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
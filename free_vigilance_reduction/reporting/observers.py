@@ -2,6 +2,7 @@
 Модуль с интерфейсом наблюдателя для мониторинга процесса анонимизации.
 """
 
+import logging
 from abc import ABC, abstractmethod
 
 
@@ -52,6 +53,17 @@ class ProcessingObserver(ABC):
         """
         pass
     
+    def on_stage_timing(self, stage, duration):
+        """
+        Вызывается для каждого замеренного этапа перед завершением обработки
+        (или перед on_error). По умолчанию ничего не делает.
+        
+        Args:
+            stage (str): Имя этапа ("extraction", "detection", "model.decode" и т.д.).
+            duration (float): Суммарная длительность этапа в секундах.
+        """
+        pass
+    
     @abstractmethod
     def on_error(self, error):
         """
@@ -158,8 +170,9 @@ class LoggingObserver(ProcessingObserver):
             entities (list): Список обнаруженных сущностей.
         """
         self.logger.info(f"Detected {len(entities)} entities")
-        for entity in entities:
-            self.logger.debug(f"Detected entity: {entity}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for entity in entities:
+                self.logger.debug("Detected entity: %s", entity)
     
     def on_text_reduced(self, reduced_text):
         """
@@ -179,6 +192,16 @@ class LoggingObserver(ProcessingObserver):
         """
         self.logger.info(f"Processing completed. Made {report.reduction_count} replacements.")
     
+    def on_stage_timing(self, stage, duration):
+        """
+        Вызывается для каждого замеренного этапа.
+        
+        Args:
+            stage (str): Имя этапа.
+            duration (float): Длительность этапа в секундах.
+        """
+        self.logger.debug("Stage %s took %.1f ms", stage, duration * 1000)
+    
     def on_error(self, error):
         """
         Вызывается при возникновении ошибки.
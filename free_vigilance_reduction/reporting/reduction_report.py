@@ -5,20 +5,31 @@
 import json
 import csv
 import os
+from array import array
+from ..entity_recognition.entity import Entity
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+ENTITY_SOURCES = (None, "regex", "dictionary", "model")
+_SOURCE_IDS = {source: index for index, source in enumerate(ENTITY_SOURCES)}
+
 
 class ReductionReport:
     """
     Класс для создания отчетов о результатах анонимизации.
+
+    Сущности и замены хранятся компактно: позиции и идентификаторы типов в массивах,
+    а тексты сущностей и исходные фрагменты замен берутся срезами исходного текста
+    только при обращении или записи. Исходный и анонимизированный тексты хранятся
+    по ссылке, без копирования. Запись в JSON, NDJSON и CSV выполняется потоково
+    и требует постоянного объема дополнительной памяти.
     """
-    
+
     def __init__(self, original_text, reduced_text, entities, replacements):
         """
         Инициализация отчета.
-        
+
         Args:
             original_text (str): Исходный текст.
             reduced_text (str): Анонимизированный текст.
@@ -27,45 +38,258 @@ class ReductionReport:
         """
         self.original_text = original_text
         self.reduced_text = reduced_text
-        self.entities = entities
-        self.replacements = replacements
-        
+        self.request_id = None
+        self.profiling_artifacts = {}
+        self.profile_hash = None
+        self.output_path = None
+
+        self._types = []
+        type_ids = {}
+
+        def type_id(entity_type):
+            if entity_type not in type_ids:
+                type_ids[entity_type] = len(self._types)
+                self._types.append(entity_type)
+            return type_ids[entity_type]
+
+        # Сущности: позиции, тип и способ обнаружения; текст хранится, только если не совпадает со срезом
+        self._entity_starts = array('q')
+        self._entity_ends = array('q')
+        self._entity_types = array('I')
+        self._entity_sources = array('B')
+        self._entity_texts = {}
+        for index, entity in enumerate(entities):
+            self._entity_starts.append(entity.start_pos)
+            self._entity_ends.append(entity.end_pos)
+            self._entity_types.append(type_id(entity.entity_type))
+            self._entity_sources.append(_SOURCE_IDS.get(getattr(entity, "source", None), 0))
+            if original_text[entity.start_pos:entity.end_pos] != entity.text:
+                self._entity_texts[index] = entity.text
+
+        # Замены: группы по типу сущности, позиции и номер строки замены в общей таблице строк
+        self._strings = []
+        string_ids = {}
+        self._replacement_groups = []
+        self._replacement_starts = array('q')
+        self._replacement_ends = array('q')
+        self._replacement_strings = array('I')
+        self._replacement_originals = {}
+        for entity_type, items in replacements.items():
+            first = len(self._replacement_starts)
+            for item in items:
+                start, end = item['position']
+                replacement = item['replacement']
+                if replacement not in string_ids:
+                    string_ids[replacement] = len(self._strings)
+                    self._strings.append(replacement)
+                if original_text[start:end] != item['original']:
+                    self._replacement_originals[len(self._replacement_starts)] = item['original']
+                self._replacement_starts.append(start)
+                self._replacement_ends.append(end)
+                self._replacement_strings.append(string_ids[replacement])
+            self._replacement_groups.append((type_id(entity_type), first, len(self._replacement_starts)))
+
         # Подсчет количества замен
-        self.reduction_count = sum(len(items) for items in replacements.values())
-        
+        self.reduction_count = len(self._replacement_starts)
+
         logger.info(f"ReductionReport created with {self.reduction_count} replacements")
-    
+
+    @property
+    def entity_count(self):
+        """
+        Количество обнаруженных сущностей.
+
+        Returns:
+            int: Количество сущностей.
+        """
+        return len(self._entity_starts)
+
+    @property
+    def entities(self):
+        """
+        Список обнаруженных сущностей. Объекты создаются при каждом обращении;
+        для обхода без создания списка используйте iter_entities.
+
+        Returns:
+            list: Список сущностей.
+        """
+        return list(self.iter_entities())
+
+    @property
+    def replacements(self):
+        """
+        Словарь замен в исходном формате {тип: [{original, replacement, position}]}.
+        Создается при каждом обращении; для обхода используйте iter_replacements.
+
+        Returns:
+            dict: Словарь замен.
+        """
+        replacements = {}
+        for entity_type, item in self.iter_replacements():
+            replacements.setdefault(entity_type, []).append(item)
+        return replacements
+
+    def iter_entities(self):
+        """
+        Обход обнаруженных сущностей.
+
+        Yields:
+            Entity: Сущность.
+        """
+        for index in range(len(self._entity_starts)):
+            start = self._entity_starts[index]
+            end = self._entity_ends[index]
+            text = self._entity_texts.get(index)
+            if text is None:
+                text = self.original_text[start:end]
+            yield Entity(text, self._types[self._entity_types[index]], start, end,
+                         ENTITY_SOURCES[self._entity_sources[index]])
+
+    def iter_replacements(self):
+        """
+        Обход замен, сгруппированных по типу сущности.
+
+        Yields:
+            tuple: (тип сущности, словарь {original, replacement, position}).
+        """
+        for type_index, first, last in self._replacement_groups:
+            entity_type = self._types[type_index]
+            for index in range(first, last):
+                start = self._replacement_starts[index]
+                end = self._replacement_ends[index]
+                original = self._replacement_originals.get(index)
+                if original is None:
+                    original = self.original_text[start:end]
+                yield entity_type, {
+                    "original": original,
+                    "replacement": self._strings[self._replacement_strings[index]],
+                    "position": (start, end)
+                }
+
+    def replacement_counts(self):
+        """
+        Количество замен по типам сущностей.
+
+        Returns:
+            dict: Тип сущности -> количество замен.
+        """
+        counts = {}
+        for type_index, first, last in self._replacement_groups:
+            entity_type = self._types[type_index]
+            counts[entity_type] = counts.get(entity_type, 0) + last - first
+        return counts
+
+    def summary(self):
+        """
+        Сводные показатели отчета.
+
+        Returns:
+            dict: Длины текстов, количество сущностей и замен.
+        """
+        return {
+            "original_length": len(self.original_text),
+            "reduced_length": len(self.reduced_text),
+            "entities_found": self.entity_count,
+            "replacements_made": self.reduction_count
+        }
+
     def to_dict(self):
         """
         Преобразование отчета в словарь.
-        
+
         Returns:
             dict: Словарь с данными отчета.
         """
         return {
-            "summary": {
-                "original_length": len(self.original_text),
-                "reduced_length": len(self.reduced_text),
-                "entities_found": len(self.entities),
-                "replacements_made": self.reduction_count
-            },
-            "entities": [entity.to_dict() for entity in self.entities],
+            "summary": self.summary(),
+            "entities": [entity.to_dict() for entity in self.iter_entities()],
             "replacements": self.replacements
         }
-    
-    def to_json(self):
+
+    def to_json(self, indent=None):
         """
         Преобразование отчета в JSON.
-        
+
+        Args:
+            indent (int, optional): Отступ для форматированного вывода. По умолчанию компактный JSON.
+
         Returns:
             str: JSON-представление отчета.
         """
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=4)
-    
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+
+    def write_json(self, file):
+        """
+        Потоковая запись отчета в компактном JSON. Результат совпадает с to_json().
+
+        Args:
+            file: Текстовый файловый объект.
+        """
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        file.write('{"summary": ')
+        file.write(dumps(self.summary()))
+        file.write(', "entities": [')
+        for index, entity in enumerate(self.iter_entities()):
+            if index:
+                file.write(', ')
+            file.write(dumps(entity.to_dict()))
+        file.write('], "replacements": {')
+        current_type = None
+        for entity_type, item in self.iter_replacements():
+            if entity_type != current_type:
+                if current_type is not None:
+                    file.write('], ')
+                file.write(dumps(entity_type))
+                file.write(': [')
+                current_type = entity_type
+            else:
+                file.write(', ')
+            file.write(dumps(item))
+        if current_type is not None:
+            file.write(']')
+        file.write('}}')
+
+    def write_ndjson(self, file):
+        """
+        Потоковая запись отчета в NDJSON: строка сводки, затем по строке на каждую
+        сущность и замену.
+
+        Args:
+            file: Текстовый файловый объект.
+        """
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        file.write(dumps({"record": "summary", **self.summary()}))
+        file.write('\n')
+        for entity in self.iter_entities():
+            file.write(dumps({"record": "entity", **entity.to_dict()}))
+            file.write('\n')
+        for entity_type, item in self.iter_replacements():
+            file.write(dumps({"record": "replacement", "entity_type": entity_type, **item}))
+            file.write('\n')
+
+    def write_csv(self, file):
+        """
+        Потоковая запись замен в CSV.
+
+        Args:
+            file: Текстовый файловый объект, открытый с newline=''.
+        """
+        writer = csv.writer(file)
+        writer.writerow(['Entity Type', 'Original Text', 'Replacement', 'Start Position', 'End Position'])
+        for entity_type, item in self.iter_replacements():
+            writer.writerow([
+                entity_type,
+                item['original'],
+                item['replacement'],
+                item['position'][0],
+                item['position'][1]
+            ])
+
     def save_to_file(self, file_path):
         """
-        Сохранение отчета в файл.
-        
+        Сохранение отчета в файл. Формат определяется расширением:
+        .csv - CSV, .ndjson/.jsonl - NDJSON, иначе JSON.
+
         Args:
             file_path (str): Путь к файлу для сохранения отчета.
         """
@@ -73,42 +297,21 @@ class ReductionReport:
             directory = os.path.dirname(file_path)
             if directory and not os.path.exists(directory):
                 os.makedirs(directory)
-            
+
             _, ext = os.path.splitext(file_path)
             ext = ext.lower()
-            
-            if ext == '.json':
+
+            if ext == '.csv':
+                with open(file_path, 'w', encoding='utf-8', newline='') as file:
+                    self.write_csv(file)
+            elif ext in ('.ndjson', '.jsonl'):
                 with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(self.to_json())
-            elif ext == '.csv':
-                self._save_to_csv(file_path)
+                    self.write_ndjson(file)
             else:
                 with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(self.to_json())
-            
+                    self.write_json(file)
+
             logger.info(f"Report saved to file: {file_path}")
         except Exception as e:
             logger.error(f"Error saving report to file {file_path}: {str(e)}")
             raise
-    
-    def _save_to_csv(self, file_path):
-        """
-        Сохранение отчета в CSV-файл.
-        
-        Args:
-            file_path (str): Путь к файлу для сохранения отчета.
-        """
-        with open(file_path, 'w', encoding='utf-8', newline='') as file:
-            writer = csv.writer(file)
-            
-            writer.writerow(['Entity Type', 'Original Text', 'Replacement', 'Start Position', 'End Position'])
-            
-            for entity_type, items in self.replacements.items():
-                for item in items:
-                    writer.writerow([
-                        entity_type,
-                        item['original'],
-                        item['replacement'],
-                        item['position'][0],
-                        item['position'][1]
-                    ])
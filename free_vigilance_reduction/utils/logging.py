@@ -1,73 +1,383 @@
 """
 Модуль для настройки логирования в системе анонимизации.
+
+Записи не форматируются и не пишутся в потоке, который их создал: логгеры библиотеки
+передают их в очередь, а форматирование и вывод выполняет фоновый поток. Поток
+запускается при первой записи, а не при импорте; в дочернем процессе после fork
+он запускается заново при первой записи в этом процессе.
+Частые отладочные сообщения (например, по одному на каждую сущность) ограничиваются
+по частоте: сверх лимита пропускается только каждое N-е сообщение с одной строки кода.
 """
 
+import atexit
 import logging
 import os
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+PACKAGE_LOGGER_NAME = 'free_vigilance_reduction'
+
+_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+_pipeline_lock = threading.Lock()
+_pipeline = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Ограничение частоты отладочных сообщений.
+    Для каждой строки кода, порождающей сообщения уровня DEBUG, действует
+    "ведро токенов": burst сообщений сразу и rate сообщений в секунду далее.
+    Сверх лимита пропускается каждое sample_every-е сообщение, к нему дописывается
+    число отброшенных.
+    """
+
+    def __init__(self, rate=20.0, burst=100, sample_every=100):
+        """
+        Инициализация фильтра.
+
+        Args:
+            rate (float, optional): Сообщений в секунду с одной строки кода.
+            burst (int, optional): Допустимый всплеск сообщений.
+            sample_every (int, optional): Доля пропускаемых сообщений сверх лимита (1 из N).
+                                          0 - отбрасывать все.
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sample_every = sample_every
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """
+        Решение о пропуске записи.
+
+        Args:
+            record (logging.LogRecord): Запись лога.
+
+        Returns:
+            bool: True, если запись нужно вывести.
+        """
+        if record.levelno > logging.DEBUG:
+            return True
+
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                # [токены, время обновления, сообщений сверх лимита, отброшено с последнего вывода]
+                state = self._buckets[key] = [self.burst, now, 0, 0]
+            state[0] = min(self.burst, state[0] + (now - state[1]) * self.rate)
+            state[1] = now
+            if state[0] >= 1:
+                state[0] -= 1
+            else:
+                state[2] += 1
+                if not (self.sample_every and state[2] % self.sample_every == 0):
+                    state[3] += 1
+                    return False
+            dropped, state[3] = state[3], 0
+
+        if dropped and not isinstance(record.args, dict):
+            if record.args:
+                record.msg = f"{record.msg} (%d similar messages suppressed)"
+                record.args = (*_as_tuple(record.args), dropped)
+            else:
+                record.msg = f"{record.msg} ({dropped} similar messages suppressed)"
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Обработчик, помещающий запись в очередь без форматирования.
+    Сообщение собирается из шаблона и аргументов уже в фоновом потоке.
+    """
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        self.queue.put_nowait(record)
+        self.pipeline.start()
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """
+    Вывод в текущий sys.stdout: поток определяется в момент записи,
+    поэтому перенаправление stdout после настройки логирования учитывается.
+    """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _FanOutHandler(logging.Handler):
+    """
+    Обработчик фонового потока, передающий запись всем подключенным обработчикам.
+    Список обработчиков можно дополнять во время работы.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.handlers = []
+
+    def add(self, handler):
+        with self.lock:
+            self.handlers = self.handlers + [handler]
+
+    def emit(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level and handler.filter(record):
+                handler.handle(record)
+
+    def flush(self):
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+
+class _LoggingPipeline:
+    """
+    Очередь записей, фоновый поток вывода и общие обработчики.
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.rate_limit = RateLimitFilter()
+        self.queue_handler = _DeferredQueueHandler(self)
+        self.queue_handler.addFilter(self.rate_limit)
+        self.output = _FanOutHandler()
+        self.log_files = set()
+
+        console_handler = _StdoutHandler()
+        console_handler.setFormatter(_FORMATTER)
+        self.output.add(console_handler)
+
+        self.listener = QueueListener(self.queue, self.output)
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Запуск фонового потока, если он еще не запущен."""
+        if self.listener._thread is None:
+            with self._lock:
+                if self.listener._thread is None:
+                    self.listener.start()
+
+    def add_log_file(self, log_file, logger_name):
+        """Вывод записей логгера logger_name (и дочерних) в файл."""
+        key = (os.path.abspath(log_file), logger_name)
+        if key in self.log_files:
+            return
+        self.log_files.add(key)
+
+        log_dir = os.path.dirname(log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(_FORMATTER)
+        file_handler.addFilter(logging.Filter(logger_name))
+        self.output.add(file_handler)
+
+    def stop(self):
+        """
+        Вывод оставшихся в очереди записей и остановка фонового потока.
+        Следующая запись запускает поток снова.
+        """
+        with self._lock:
+            if self.listener._thread is not None:
+                self.listener.stop()
+            # Записи, помещенные в очередь после остановки потока, но до сброса его состояния
+            while True:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.output.handle(record)
+        self.output.flush()
+
+    def reset_after_fork(self):
+        """
+        Состояние дочернего процесса после fork: фонового потока родителя в нем нет,
+        а записи из очереди родителя выводит родитель.
+        """
+        self.queue = queue.SimpleQueue()
+        self.queue_handler.queue = self.queue
+        self.listener.queue = self.queue
+        self.listener._thread = None
+        self.output._at_fork_reinit()
+        self._lock = threading.Lock()
+
+
+def _get_pipeline():
+    """Создание общей очереди логирования при первом обращении."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = _LoggingPipeline()
+            atexit.register(shutdown_logging)
+        return _pipeline
+
+
+def _before_fork():
+    """
+    Ожидание окончания вывода текущей записи перед fork: дочерний процесс не должен
+    унаследовать поток вывода в середине записи. Фоновый поток не останавливается.
+    """
+    _pipeline_lock.acquire()
+    if _pipeline is not None:
+        _pipeline.output.acquire()
+
+
+def _after_fork_in_parent():
+    """Продолжение вывода в родительском процессе после fork."""
+    if _pipeline is not None:
+        _pipeline.output.release()
+    _pipeline_lock.release()
+
+
+def _after_fork_in_child():
+    """Новая очередь в дочернем процессе; фоновый поток запустится при первой записи."""
+    if _pipeline is not None:
+        _pipeline.reset_after_fork()
+    _pipeline_lock.release()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_in_parent,
+                        after_in_child=_after_fork_in_child)
 
 
 def get_logger(name, log_level=None, log_file=None):
     """
     Создание и настройка логгера.
-    
+
+    Логгеры модулей библиотеки передают записи общему логгеру пакета, к которому
+    подключена очередь; остальным логгерам очередь подключается напрямую.
+
     Args:
         name (str): Имя логгера.
         log_level (int, optional): Уровень логирования. По умолчанию INFO.
         log_file (str, optional): Путь к файлу лога. По умолчанию None.
-        
+
     Returns:
         logging.Logger: Настроенный логгер.
     """
     if log_level is None:
         log_level = logging.INFO
-    
+
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
-    
-    if logger.handlers:
-        return logger
-    
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+
+    pipeline = _get_pipeline()
+    if name == PACKAGE_LOGGER_NAME or not name.startswith(PACKAGE_LOGGER_NAME + '.'):
+        if pipeline.queue_handler not in logger.handlers:
+            logger.addHandler(pipeline.queue_handler)
+    else:
+        package_logger = logging.getLogger(PACKAGE_LOGGER_NAME)
+        if pipeline.queue_handler not in package_logger.handlers:
+            package_logger.addHandler(pipeline.queue_handler)
+
     if log_file:
-        log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-            
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
+        pipeline.add_log_file(log_file, name)
+
     return logger
 
 
+def set_debug_rate_limit(rate=20.0, burst=100, sample_every=100):
+    """
+    Настройка ограничения частоты отладочных сообщений.
+
+    Args:
+        rate (float, optional): Сообщений в секунду с одной строки кода.
+        burst (int, optional): Допустимый всплеск сообщений.
+        sample_every (int, optional): Сверх лимита пропускается 1 сообщение из sample_every.
+    """
+    rate_limit = _get_pipeline().rate_limit
+    with rate_limit._lock:
+        rate_limit.rate = rate
+        rate_limit.burst = burst
+        rate_limit.sample_every = sample_every
+        rate_limit._buckets.clear()
+
+
+def flush_logging():
+    """
+    Ожидание вывода всех сообщений, уже помещенных в очередь.
+    """
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+
+
+def shutdown_logging():
+    """
+    Запись всех накопленных сообщений и остановка фонового потока логирования.
+    Вызывается автоматически при завершении интерпретатора.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+            for logger in [logging.getLogger()] + list(logging.Logger.manager.loggerDict.values()):
+                if isinstance(logger, logging.Logger) and _pipeline.queue_handler in logger.handlers:
+                    logger.removeHandler(_pipeline.queue_handler)
+            _pipeline = None
+
+
 def setup_default_logging(log_dir=None):
     """
     Настройка логирования по умолчанию для всего приложения.
-    
+
     Args:
-        log_dir (str, optional): Директория для хранения логов. 
+        log_dir (str, optional): Директория для хранения логов.
                                 По умолчанию используется текущая директория.
-    
+
     Returns:
         logging.Logger: Корневой логгер.
     """
     if log_dir is None:
         log_dir = 'logs'
-    
+
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    
+
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     log_file = os.path.join(log_dir, f'free_vigilance_reduction_{timestamp}.log')
-    
-    return get_logger('free_vigilance_reduction', log_file=log_file)
+
+    return get_logger(PACKAGE_LOGGER_NAME, log_file=log_file)
+
+
+def _as_tuple(args):
+    """Аргументы записи лога в виде кортежа."""
+    if not args:
+        return ()
+    return args if isinstance(args, tuple) else (args,)
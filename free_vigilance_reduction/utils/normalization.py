@@ -0,0 +1,181 @@
+"""
+Модуль для нормализации текста, извлеченного из документов.
+
+Текст из PDF и DOCX содержит мягкие переносы, переносы слов по строкам ("Ива-\\nнов"),
+неразрывные и другие особые пробелы, символы нулевой ширины и буквы в разложенной
+форме Unicode ("и" + U+0306 вместо "й"). Нормализация выполняется один раз на документ
+за один проход регулярного выражения; все детекторы работают с чистым текстом,
+а таблица смещений переводит найденные позиции обратно в исходный текст.
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from ..entity_recognition.entity import Entity
+
+_SPACES = "\u00a0\u2000-\u200a\u202f\u205f\u3000"
+_INVISIBLE = "\u00ad\u200b-\u200d\u2060\ufeff"
+_COMBINING = "\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f"
+
+_PATTERN = re.compile(
+    # Опережающая проверка первого символа позволяет движку быстро пропускать обычный текст
+    rf"(?=[-\u2010{_INVISIBLE}{_SPACES}{_COMBINING}])(?:"
+    # Перенос по строке перед строчной буквой: "Ива-\nнов" -> "Иванов"
+    rf"(?P<hyphenation>[-\u00ad\u2010](?<=[^\W\d_].)[ \t{_SPACES}]*\r?\n[ \t{_SPACES}]*(?=[a-zа-яё]))"
+    rf"|(?P<invisible>[{_INVISIBLE}]+)"
+    rf"|(?P<space>[{_SPACES}])"
+    # Диакритические знаки объединяются с предшествующей буквой
+    rf"|(?P<composed>[{_COMBINING}]+))"
+)
+
+
+class NormalizedText:
+    """
+    Нормализованный текст и таблица смещений в исходный текст.
+
+    Таблица хранится отрезками: внутри отрезка символы нормализованного текста
+    соответствуют символам исходного по одному, поэтому ее размер пропорционален
+    числу изменений, а не длине текста. Отрезок с заданным концом в исходном тексте
+    соответствует целиком (например, составной символ из нескольких исходных).
+    """
+
+    def __init__(self, original, text, segment_starts, original_starts, original_ends):
+        """
+        Инициализация.
+
+        Args:
+            original (str): Исходный текст.
+            text (str): Нормализованный текст.
+            segment_starts (array): Начала отрезков в нормализованном тексте.
+            original_starts (array): Начала отрезков в исходном тексте.
+            original_ends (array): Концы неделимых отрезков в исходном тексте (-1 - посимвольный отрезок).
+        """
+        self.original = original
+        self.text = text
+        self.segment_starts = segment_starts
+        self.original_starts = original_starts
+        self.original_ends = original_ends
+
+    @property
+    def changed(self):
+        """Отличается ли нормализованный текст от исходного."""
+        return self.text is not self.original
+
+    def original_span(self, start, end):
+        """
+        Перевод фрагмента нормализованного текста в фрагмент исходного текста.
+
+        Args:
+            start (int): Начало в нормализованном тексте.
+            end (int): Конец в нормализованном тексте.
+
+        Returns:
+            tuple: (начало, конец) в исходном тексте.
+        """
+        if not self.changed:
+            return start, end
+        original_start = self._original_start(start)
+        if end <= start:
+            return original_start, original_start
+        return original_start, self._original_end(end - 1)
+
+    def map_entities(self, entities):
+        """
+        Перевод позиций сущностей в исходный текст. Текст сущности остается
+        нормализованным, чтобы одинаковые значения заменялись одинаково.
+
+        Args:
+            entities (list): Сущности с позициями в нормализованном тексте.
+
+        Returns:
+            list: Сущности с позициями в исходном тексте.
+        """
+        if not self.changed:
+            return entities
+        mapped = []
+        for entity in entities:
+            start, end = self.original_span(entity.start_pos, entity.end_pos)
+            mapped.append(Entity(entity.text, entity.entity_type, start, end, entity.source))
+        return mapped
+
+    def _segment(self, position):
+        """Номер отрезка, содержащего позицию нормализованного текста."""
+        return bisect_right(self.segment_starts, position) - 1
+
+    def _original_start(self, position):
+        """Начало в исходном тексте символа нормализованного текста."""
+        if position >= len(self.text):
+            return len(self.original)
+        index = self._segment(position)
+        if self.original_ends[index] >= 0:
+            return self.original_starts[index]
+        return self.original_starts[index] + position - self.segment_starts[index]
+
+    def _original_end(self, position):
+        """Конец в исходном тексте символа нормализованного текста."""
+        index = self._segment(position)
+        if self.original_ends[index] >= 0:
+            return self.original_ends[index]
+        return self.original_starts[index] + position - self.segment_starts[index] + 1
+
+
+class TextNormalizer:
+    """
+    Нормализация текста с сохранением соответствия позиций исходному тексту.
+    """
+
+    def normalize(self, text):
+        """
+        Нормализация текста: склейка переносов по строкам, удаление мягких переносов
+        и символов нулевой ширины, замена особых пробелов обычными, приведение
+        букв с диакритическими знаками к составной форме (NFC).
+
+        Args:
+            text (str): Исходный текст.
+
+        Returns:
+            NormalizedText: Нормализованный текст с таблицей смещений.
+        """
+        segment_starts = array('q', [0])
+        original_starts = array('q', [0])
+        original_ends = array('q', [-1])
+        pieces = []
+        length = 0
+        last = 0
+
+        for match in _PATTERN.finditer(text):
+            kind = match.lastgroup
+            start, end = match.span()
+            if kind == "space":
+                replacement = " "
+            elif kind == "composed":
+                start = max(start - 1, last)
+                replacement = unicodedata.normalize("NFC", text[start:end])
+            else:
+                replacement = ""
+            if len(replacement) == end - start:
+                # Посимвольная замена не меняет смещений
+                pieces.append(text[last:start])
+                pieces.append(replacement)
+                length += end - last
+                last = end
+                continue
+
+            pieces.append(text[last:start])
+            length += start - last
+            if replacement:
+                segment_starts.append(length)
+                original_starts.append(start)
+                original_ends.append(end)
+                pieces.append(replacement)
+                length += len(replacement)
+            segment_starts.append(length)
+            original_starts.append(end)
+            original_ends.append(-1)
+            last = end
+
+        if last == 0 and not pieces:
+            return NormalizedText(text, text, segment_starts, original_starts, original_ends)
+        pieces.append(text[last:])
+        return NormalizedText(text, "".join(pieces), segment_starts, original_starts, original_ends)
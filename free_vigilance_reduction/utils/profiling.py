@@ -0,0 +1,201 @@
+"""
+Модуль для профилирования отдельных запросов по CPU и памяти.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RequestProfiler:
+    """
+    Профилировщик запросов FreeVigilanceReduction.
+    Запрос профилируется по явному требованию или случайно с заданной вероятностью.
+    Для профилируемого запроса сохраняются:
+        <request_id>.prof         - данные cProfile (pstats, snakeviz);
+        <request_id>.cpu.txt      - функции с наибольшим накопленным временем;
+        <request_id>.memory.json  - пик памяти tracemalloc и основные места выделения.
+    Хранятся артефакты не более чем max_requests последних запросов, записанных этим
+    экземпляром; другие файлы в output_dir, в том числе артефакты прежних запусков,
+    не удаляются.
+
+    cProfile учитывает только поток, в котором выполняется профилируемый блок: окна,
+    которые планировщик модели отправляет в свои потоки, и поиск в процессах
+    parallel_detection в профиль CPU не попадают. tracemalloc учитывает выделения
+    памяти во всех потоках процесса, но не в дочерних процессах.
+    """
+
+    def __init__(self, output_dir, sample_rate=0.0, max_requests=50, top_functions=40,
+                 top_allocations=25, traceback_depth=1):
+        """
+        Инициализация профилировщика.
+
+        Args:
+            output_dir (str): Каталог для артефактов.
+            sample_rate (float, optional): Доля запросов, профилируемых без явного требования.
+            max_requests (int, optional): Сколько последних запросов хранить.
+            top_functions (int, optional): Количество функций в текстовой сводке cProfile.
+            top_allocations (int, optional): Количество мест выделения памяти в сводке.
+            traceback_depth (int, optional): Глубина стека, сохраняемая tracemalloc.
+        """
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.max_requests = max_requests
+        self.top_functions = top_functions
+        self.top_allocations = top_allocations
+        self.traceback_depth = traceback_depth
+        # cProfile и tracemalloc глобальны для процесса: одновременно профилируется один запрос
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        # Записанные артефакты: путь .prof -> пути всех артефактов запроса, от старых к новым
+        self._written = OrderedDict()
+
+    def should_profile(self, requested=None):
+        """
+        Решение о профилировании запроса.
+
+        Args:
+            requested (bool, optional): Явное требование (True/False). None - по sample_rate.
+
+        Returns:
+            bool: True, если запрос нужно профилировать.
+        """
+        if requested is not None:
+            return bool(requested)
+        return self.sample_rate > 0 and self._random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, request_id):
+        """
+        Профилирование блока кода как одного запроса.
+
+        Args:
+            request_id (str): Идентификатор запроса (имя артефактов).
+
+        Yields:
+            dict: Пути к артефактам; заполняется после выхода из блока.
+                  Пуст, если профилировщик занят другим запросом.
+        """
+        artifacts = {}
+        if not self._lock.acquire(blocking=False):
+            logger.warning(f"Profiler is busy, request {request_id} is not profiled")
+            yield artifacts
+            return
+
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(self.traceback_depth)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.take_snapshot()
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield artifacts
+            finally:
+                profiler.disable()
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+                try:
+                    artifacts.update(self._write_artifacts(request_id, profiler, snapshot, baseline, current, peak))
+                    key = artifacts["cpu_profile"]
+                    self._written.pop(key, None)
+                    self._written[key] = dict(artifacts)
+                    self._enforce_retention()
+                except OSError as e:
+                    logger.error(f"Failed to write profiling artifacts for request {request_id}: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def _write_artifacts(self, request_id, profiler, snapshot, baseline, current, peak):
+        """
+        Запись артефактов профилирования.
+
+        Returns:
+            dict: Пути к записанным файлам.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, _safe_name(request_id))
+        paths = {
+            "cpu_profile": base + ".prof",
+            "cpu_summary": base + ".cpu.txt",
+            "memory": base + ".memory.json"
+        }
+
+        profiler.dump_stats(paths["cpu_profile"])
+
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_functions)
+        with open(paths["cpu_summary"], 'w', encoding='utf-8') as file:
+            file.write(summary.getvalue())
+
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        snapshot = snapshot.filter_traces(filters)
+        top_sites = snapshot.compare_to(baseline.filter_traces(filters), "lineno")[:self.top_allocations]
+        memory = {
+            "request_id": request_id,
+            "peak_bytes": peak,
+            "current_bytes": current,
+            "top_allocations": [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_bytes": stat.size,
+                    "size_diff_bytes": stat.size_diff,
+                    "count": stat.count
+                }
+                for stat in top_sites
+            ]
+        }
+        with open(paths["memory"], 'w', encoding='utf-8') as file:
+            json.dump(memory, file, ensure_ascii=False, indent=4)
+
+        logger.info(f"Profiling artifacts for request {request_id} written to {self.output_dir} "
+                    f"(peak memory {peak / 1024 / 1024:.1f} MiB)")
+        return paths
+
+    def _enforce_retention(self):
+        """Удаление записанных артефактов запросов сверх max_requests, начиная с самых старых."""
+        expired = 0
+        while len(self._written) > self.max_requests:
+            _, paths = self._written.popitem(last=False)
+            for path in paths.values():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            expired += 1
+        if expired:
+            logger.debug(f"Removed profiling artifacts of {expired} old requests")
+
+
+def new_request_id():
+    """
+    Создание идентификатора запроса.
+
+    Returns:
+        str: Случайный идентификатор.
+    """
+    return uuid.uuid4().hex
+
+
+def _safe_name(request_id):
+    """Приведение идентификатора запроса к допустимому имени файла."""
+    return re.sub(r"[^\w.-]", "_", str(request_id))
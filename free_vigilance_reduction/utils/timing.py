@@ -0,0 +1,88 @@
+"""
+Модуль для замера длительности этапов обработки.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+_current_timer = contextvars.ContextVar("fvr_stage_timer", default=None)
+
+
+class StageTimer:
+    """
+    Накопитель длительностей этапов одного запроса.
+    Активный таймер хранится в контекстной переменной, поэтому этапы
+    можно отмечать в любом модуле без передачи таймера через аргументы.
+    """
+
+    def __init__(self):
+        """
+        Инициализация таймера.
+        """
+        self.timings = {}
+
+    def add(self, stage_name, seconds):
+        """
+        Добавление длительности этапа. Повторные замеры одного этапа суммируются.
+
+        Args:
+            stage_name (str): Имя этапа.
+            seconds (float): Длительность в секундах.
+        """
+        self.timings[stage_name] = self.timings.get(stage_name, 0.0) + seconds
+
+    @contextmanager
+    def activate(self):
+        """
+        Назначение таймера активным для текущего контекста.
+        """
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+
+def active_timer():
+    """
+    Активный таймер текущего контекста.
+
+    Returns:
+        StageTimer: Таймер или None, если замер не ведется.
+    """
+    return _current_timer.get()
+
+
+@contextmanager
+def stage(stage_name):
+    """
+    Замер длительности блока кода как этапа активного таймера.
+    Без активного таймера замер не выполняется.
+
+    Args:
+        stage_name (str): Имя этапа.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(stage_name, time.perf_counter() - started)
+
+
+def record_stage(stage_name, seconds):
+    """
+    Добавление уже измеренной длительности этапа в активный таймер.
+
+    Args:
+        stage_name (str): Имя этапа.
+        seconds (float): Длительность в секундах.
+    """
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(stage_name, seconds)
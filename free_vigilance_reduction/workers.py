@@ -0,0 +1,247 @@
+"""
+Модуль для параллельной обработки в нескольких процессах с общей копией модели.
+
+Родительский процесс один раз загружает модель (с mmap_weights=True веса отображаются
+из safetensors без копирования), после чего порождает рабочие процессы через fork.
+Рабочие процессы получают уже загруженную модель без повторной загрузки и разделяют
+страницы весов с родителем по принципу copy-on-write.
+"""
+
+import gc
+import multiprocessing
+import pickle
+import sys
+from .reporting.observers import ProcessingObserver
+from .utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_worker_instance = None
+_worker_capture = None
+
+
+class _StageCapture(ProcessingObserver):
+    """
+    Наблюдатель рабочего процесса, запоминающий длительности этапов текущего запроса
+    для передачи в родительский процесс.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    def on_process_start(self, document=None, text=None):
+        self.timings = {}
+
+    def on_entities_detected(self, entities):
+        pass
+
+    def on_text_reduced(self, reduced_text):
+        pass
+
+    def on_stage_timing(self, stage, duration):
+        self.timings[stage] = duration
+
+    def on_process_complete(self, report):
+        pass
+
+    def on_error(self, error):
+        pass
+
+
+def _init_worker(threads_per_worker):
+    """
+    Инициализация рабочего процесса после fork.
+
+    Args:
+        threads_per_worker (int): Количество потоков torch в процессе (None - не менять).
+    """
+    global _worker_capture
+    _worker_capture = _StageCapture()
+    _worker_instance.observers = [_worker_capture]
+    if threads_per_worker and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads_per_worker)
+
+
+def _run_task(task):
+    """
+    Обработка одного документа или текста в рабочем процессе.
+
+    Args:
+        task (tuple): (вид задачи "document"|"text", путь или текст, идентификатор профиля,
+                      каталог для анонимизированной копии документа).
+
+    Returns:
+        tuple: (отчет или None, ошибка или None, длительности этапов).
+    """
+    kind, item, profile_id, output_dir = task
+    try:
+        if kind == "document":
+            report = _worker_instance.reduce_document(item, profile_id, output_dir=output_dir)
+        else:
+            report = _worker_instance.reduce_text(item, profile_id)
+        return report, None, _worker_capture.timings
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(f"{type(e).__name__}: {str(e)}")
+        return None, e, _worker_capture.timings
+
+
+class PreforkWorkerPool:
+    """
+    Пул рабочих процессов, порожденных через fork от процесса с загруженной моделью.
+
+    Наблюдатели экземпляра FreeVigilanceReduction вызываются в родительском процессе
+    по результатам, полученным от рабочих процессов. Профили настроек фиксируются
+    на момент создания пула. Модель не должна выполнять инференс в родительском
+    процессе до создания пула: пулы потоков OpenMP не переживают fork.
+    """
+
+    def __init__(self, fvr, processes=None, threads_per_worker=1):
+        """
+        Создание пула.
+
+        Args:
+            fvr (FreeVigilanceReduction): Экземпляр с загруженной моделью.
+            processes (int, optional): Количество рабочих процессов. По умолчанию - по числу ядер.
+            threads_per_worker (int, optional): Количество потоков torch в рабочем процессе.
+
+        Raises:
+            RuntimeError: Если платформа не поддерживает fork.
+        """
+        global _worker_instance
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("PreforkWorkerPool requires the 'fork' start method")
+        if _worker_instance is not None:
+            raise RuntimeError("Only one PreforkWorkerPool can be active in a process")
+
+        self.fvr = fvr
+        _worker_instance = fvr
+        # Объекты, созданные до fork, исключаются из сборки мусора: иначе проход
+        # сборщика в рабочем процессе записывает в их заголовки и копирует страницы.
+        gc.collect()
+        gc.freeze()
+        self._pool = multiprocessing.get_context("fork").Pool(
+            processes, initializer=_init_worker, initargs=(threads_per_worker,)
+        )
+        logger.info(f"Started {self._pool._processes} prefork workers")
+
+    def reduce_documents(self, file_paths, profile_id=None, ordered=True, output_dir=None):
+        """
+        Анонимизация документов в рабочих процессах.
+
+        Args:
+            file_paths (iterable): Пути к документам.
+            profile_id (str, optional): Идентификатор профиля настроек.
+            ordered (bool, optional): Возвращать результаты в порядке входных данных.
+                                      Без упорядочивания результаты приходят по готовности.
+            output_dir (str|callable, optional): Каталог для анонимизированных копий или функция,
+                                                 возвращающая каталог по пути документа
+                                                 (вызывается в родительском процессе).
+
+        Yields:
+            tuple: (путь, отчет или None, ошибка или None).
+        """
+        yield from self._imap("document", file_paths, profile_id, ordered, output_dir)
+
+    def reduce_texts(self, texts, profile_id=None, ordered=True):
+        """
+        Анонимизация текстов в рабочих процессах.
+
+        Args:
+            texts (iterable): Тексты.
+            profile_id (str, optional): Идентификатор профиля настроек.
+            ordered (bool, optional): Возвращать результаты в порядке входных данных.
+
+        Yields:
+            tuple: (текст, отчет или None, ошибка или None).
+        """
+        yield from self._imap("text", texts, profile_id, ordered, None)
+
+    def close(self):
+        """
+        Завершение работы пула после обработки всех переданных задач.
+        """
+        global _worker_instance
+        if self._pool is None:
+            return
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
+        _worker_instance = None
+        gc.unfreeze()
+
+    def terminate(self):
+        """
+        Немедленная остановка рабочих процессов без обработки оставшихся задач.
+        """
+        global _worker_instance
+        if self._pool is None:
+            return
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+        _worker_instance = None
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def _imap(self, kind, items, profile_id, ordered, output_dir):
+        """Передача задач в пул и уведомление наблюдателей по мере получения результатов."""
+        tasks = (
+            (kind, item, profile_id, output_dir(item) if callable(output_dir) else output_dir)
+            for item in items
+        )
+        imap = self._pool.imap if ordered else self._pool.imap_unordered
+        for (_, item, _, _), (report, error, timings) in _with_tasks(tasks, imap):
+            self._notify(kind, item, report, error, timings)
+            yield item, report, error
+
+    def _notify(self, kind, item, report, error, timings):
+        """Повтор событий обработки для наблюдателей родительского процесса."""
+        fvr = self.fvr
+        fvr._notify_observers_start(document=item if kind == "document" else None,
+                                    text=item if kind == "text" else None)
+        if report is None:
+            fvr._notify_observers_failure(timings, error)
+            return
+        fvr._notify_observers_entities_detected(report.entities)
+        fvr._notify_observers_text_reduced(report.reduced_text)
+        fvr._notify_observers_stage_timing(timings)
+        fvr._notify_observers_complete(report)
+
+
+def _run_indexed_task(indexed_task):
+    """Обработка задачи с сохранением ее порядкового номера."""
+    index, task = indexed_task
+    return index, _run_task(task)
+
+
+def _with_tasks(tasks, imap):
+    """
+    Сопоставление результатов пула с исходными задачами.
+
+    Args:
+        tasks (iterable): Задачи.
+        imap (callable): Pool.imap или Pool.imap_unordered.
+
+    Yields:
+        tuple: (задача, результат _run_task).
+    """
+    pending = {}
+
+    def indexed():
+        for index, task in enumerate(tasks):
+            pending[index] = task
+            yield index, task
+
+    for index, result in imap(_run_indexed_task, indexed()):
+        yield pending.pop(index), result
@@ -0,0 +1,87 @@
+import pytest
+
+from free_vigilance_reduction.config.compiled_profile import CompiledProfile
+from free_vigilance_reduction.config.configuration import ConfigurationManager, ConfigurationProfile
+
+
+def test_compiled_profile_is_immutable_and_hashed():
+    profile = ConfigurationProfile.create_default()
+    compiled = profile.compile()
+
+    assert compiled.content_hash == ConfigurationProfile.create_default().compile().content_hash
+    assert compiled.replacement_lookup["PER"] == ("mask", "[ФИО]")
+    assert compiled.enabled_dictionaries == ("cities",)
+    assert compiled.to_dict() == profile.to_dict()
+    with pytest.raises(AttributeError):
+        compiled.entity_types = ()
+    with pytest.raises(TypeError):
+        compiled.replacement_rules["PER"]["method"] = "stars"
+
+    profile.replacement_rules["PER"]["method"] = "stars"
+    assert compiled.replacement_lookup["PER"] == ("mask", "[ФИО]")
+    assert profile.compile().content_hash != compiled.content_hash
+
+
+def test_configuration_manager_memoizes_compiled_profiles():
+    manager = ConfigurationManager()
+    compiled = manager.get_compiled_profile("default")
+    assert manager.get_compiled_profile("default") is compiled
+    assert compiled.derived("key", lambda: object()) is compiled.derived("key", lambda: object())
+
+    profile = ConfigurationProfile.create_default()
+    profile.entity_types = ["PER"]
+    manager.save_profile(profile)
+    recompiled = manager.get_compiled_profile("default")
+    assert isinstance(recompiled, CompiledProfile)
+    assert recompiled is not compiled and recompiled.entity_types == ("PER",)
+
+
+def _write_config(path, profiles, default_profile_id="default"):
+    import json
+    path.write_text(json.dumps({"profiles": [p.to_dict() for p in profiles],
+                                "default_profile_id": default_profile_id}), encoding="utf-8")
+
+
+def test_reload_swaps_profile_set_and_keeps_old_version_on_error(tmp_path):
+    config = tmp_path / "config.json"
+    default = ConfigurationProfile.create_default()
+    strict = ConfigurationProfile("strict", ["PER"])
+    strict.replacement_rules = {"PER": {"method": "remove", "placeholder": ""}}
+    _write_config(config, [default, strict])
+
+    manager = ConfigurationManager(str(config))
+    assert manager.reload() is False
+    in_flight = manager.get_compiled_profile("strict")
+    default_compiled = manager.get_compiled_profile()
+
+    strict.entity_types = ["PER", "PHONE"]
+    _write_config(config, [default, strict])
+    assert manager.reload() is True
+    assert manager.get_compiled_profile("strict").entity_types == ("PER", "PHONE")
+    assert in_flight.entity_types == ("PER",)
+    assert manager.get_compiled_profile() is default_compiled
+
+    version = manager.version
+    config.write_text('{"profiles": [{"profile_id": "bad id"}]}', encoding="utf-8")
+    assert manager.reload() is False
+    config.write_text('{"profiles": [', encoding="utf-8")
+    assert manager.reload() is False
+    assert manager.version == version
+    assert manager.get_available_profiles() == ["default", "strict"]
+
+
+def test_watcher_picks_up_config_changes(tmp_path):
+    import time
+
+    config = tmp_path / "config.json"
+    _write_config(config, [ConfigurationProfile.create_default()])
+    manager = ConfigurationManager(str(config))
+    manager.watch(interval=0.01)
+    try:
+        _write_config(config, [ConfigurationProfile.create_default(), ConfigurationProfile("extra", ["PER"])])
+        deadline = time.monotonic() + 5
+        while "extra" not in manager.get_available_profiles() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert manager.get_compiled_profile("extra").entity_types == ("PER",)
+    finally:
+        manager.stop_watching()
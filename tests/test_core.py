@@ -0,0 +1,262 @@
+import os
+
+from benchmarks.common import StubLanguageModel
+from free_vigilance_reduction.core import FreeVigilanceReduction
+from free_vigilance_reduction.reporting.metrics import MetricsCollector
+from free_vigilance_reduction.workers import PreforkWorkerPool
+
+
+def test_prefork_pool_matches_in_process_results():
+    fvr = FreeVigilanceReduction(backend=StubLanguageModel())
+    metrics = MetricsCollector()
+    fvr.register_observer(metrics)
+    texts = [f"Пациент Иванов Иван, запись {i}. Врач Петров Петр Петрович." for i in range(6)] + [None]
+
+    with PreforkWorkerPool(fvr, processes=2) as pool:
+        results = list(pool.reduce_texts(texts))
+
+    assert [item for item, _, _ in results] == texts
+    for text, report, error in results[:-1]:
+        assert error is None
+        assert report.reduced_text == fvr.reduce_text(text).reduced_text
+    assert results[-1][1] is None and results[-1][2] is not None
+    assert metrics.documents[("text", "success")] == 12
+    assert metrics.documents[("text", "error")] == 1
+    assert metrics.stage_histograms["total"]["count"] == 13
+
+
+def test_failing_observer_does_not_replace_processing_error(monkeypatch):
+    import pytest
+
+    class FailingObserver(MetricsCollector):
+        def on_stage_timing(self, stage, duration):
+            raise ValueError("observer failed")
+
+    fvr = FreeVigilanceReduction(backend=StubLanguageModel())
+    metrics = MetricsCollector()
+    fvr.register_observer(FailingObserver())
+    fvr.register_observer(metrics)
+
+    def fail(text, profile):
+        raise RuntimeError("detection failed")
+
+    monkeypatch.setattr(fvr.entity_recognizer, "detect_entities", fail)
+    with pytest.raises(RuntimeError, match="detection failed"):
+        fvr.reduce_text("Пациент Иванов Иван.")
+    assert metrics.documents == {("text", "error"): 1}
+    assert metrics.stage_histograms["total"]["count"] == 1
+
+
+def test_metrics_collector_renders_prometheus_exposition(tmp_path):
+    from free_vigilance_reduction.entity_recognition.entity import Entity
+
+    class Report:
+        original_text = "Иванов Иван"
+
+        @staticmethod
+        def replacement_counts():
+            return {"PER": 1}
+
+    metrics = MetricsCollector(prefix="t", buckets=(1.0, 0.1))
+    metrics.on_process_start(text=Report.original_text)
+    metrics.on_entities_detected([Entity("Иванов Иван", "PER", 0, 11, "model"), Entity('"А"', 'x"y', 0, 3)])
+    for duration in (0.05, 0.1, 5.0):
+        metrics.on_stage_timing("total", duration)
+    metrics.on_process_complete(Report())
+    metrics.on_process_start(document="card.txt")
+    metrics.on_error(RuntimeError())
+
+    assert metrics.render() == """\
+# HELP t_documents_total Processed documents and texts.
+# TYPE t_documents_total counter
+t_documents_total{kind="document",status="error"} 1
+t_documents_total{kind="text",status="success"} 1
+# HELP t_characters_total Characters of successfully processed input.
+# TYPE t_characters_total counter
+t_characters_total 11
+# HELP t_entities_total Detected entities by type and detection source.
+# TYPE t_entities_total counter
+t_entities_total{type="PER",source="model"} 1
+t_entities_total{type="x\\"y",source="unknown"} 1
+# HELP t_replacements_total Replacements made by entity type.
+# TYPE t_replacements_total counter
+t_replacements_total{type="PER"} 1
+# HELP t_stage_duration_seconds Duration of processing stages.
+# TYPE t_stage_duration_seconds histogram
+t_stage_duration_seconds_bucket{stage="total",le="0.1"} 2
+t_stage_duration_seconds_bucket{stage="total",le="1.0"} 2
+t_stage_duration_seconds_bucket{stage="total",le="+Inf"} 3
+t_stage_duration_seconds_sum{stage="total"} 5.15
+t_stage_duration_seconds_count{stage="total"} 3
+"""
+    metrics.dump(str(tmp_path / "fvr.prom"))
+    assert (tmp_path / "fvr.prom").read_text(encoding="utf-8") == metrics.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["fvr.prom"]
+
+
+def test_batch_processor_resumes_from_journal(tmp_path):
+    import json
+    from free_vigilance_reduction.batch import JOURNAL_FILENAME, BatchProcessor
+
+    corpus = tmp_path / "corpus"
+    (corpus / "a").mkdir(parents=True)
+    (corpus / "a" / "one.txt").write_text("пациент Иванов Иван.", encoding="utf-8")
+    (corpus / "two.txt").write_text("Врач Петров Петр.", encoding="utf-8")
+    (corpus / "broken.txt").write_bytes(b"\xff\xfe\xfa")
+    (corpus / "notes.md").write_text("не обрабатывается", encoding="utf-8")
+    output = tmp_path / "out"
+    fvr = FreeVigilanceReduction(backend=StubLanguageModel())
+
+    def run(**options):
+        return BatchProcessor(fvr, str(output), **options).run([str(corpus)])
+
+    assert run(fail_fast=True) == {"processed": 0, "skipped": 0, "failed": 1}
+    assert run() == {"processed": 2, "skipped": 0, "failed": 1}
+    assert (output / "corpus" / "a" / "one_redacted.txt").read_text(encoding="utf-8") == "пациент [ФИО]."
+    report = json.loads((output / "corpus" / "a" / "one.txt.report.json").read_text(encoding="utf-8"))
+    assert report["summary"]["replacements_made"] == 1
+
+    (corpus / "broken.txt").write_text("Иванов Иван", encoding="utf-8")
+    assert run(report_format="csv") == {"processed": 1, "skipped": 2, "failed": 0}
+    assert (output / "corpus" / "broken.txt.report.csv").exists()
+    entries = [json.loads(line) for line in (output / JOURNAL_FILENAME).read_text(encoding="utf-8").splitlines()]
+    assert [e["status"] for e in entries if e["path"].endswith("broken.txt")] == ["error", "error", "success"]
+
+
+def test_batch_processor_deduplicates_inputs_and_rejects_colliding_paths(tmp_path):
+    import pytest
+    from free_vigilance_reduction.batch import BatchProcessor
+
+    for name in ("a", "b"):
+        (tmp_path / name / "docs").mkdir(parents=True)
+        (tmp_path / name / "x.txt").write_text(f"Пациент Иванов Иван, каталог {name}.", encoding="utf-8")
+        (tmp_path / name / "docs" / "y.txt").write_text("Врач Петров Петр.", encoding="utf-8")
+    output = tmp_path / "out"
+    processor = BatchProcessor(FreeVigilanceReduction(backend=StubLanguageModel()), str(output))
+
+    (tmp_path / "b" / "x.pdf").write_bytes(b"%PDF-1.4")
+    for inputs in (["a/x.txt", "b/x.txt"], ["a/docs", "b/docs"], ["b"]):
+        with pytest.raises(ValueError, match="same output path"):
+            processor.run([str(tmp_path / path) for path in inputs])
+    assert not output.exists()
+    (tmp_path / "b" / "x.pdf").unlink()
+
+    a = tmp_path / "a"
+    stats = processor.run([str(a), str(a / "x.txt"), str(a), str(a / "docs" / "y.txt")])
+    assert stats == {"processed": 2, "skipped": 0, "failed": 0}
+    assert sorted(p.name for p in (output / "a").rglob("*_redacted.txt")) == ["x_redacted.txt", "y_redacted.txt"]
+
+
+def test_request_profiler_samples_and_keeps_only_its_own_recent_artifacts(tmp_path):
+    import json
+    from free_vigilance_reduction.utils.profiling import RequestProfiler
+
+    profiler = RequestProfiler(str(tmp_path), sample_rate=0.25, max_requests=2)
+    profiler._random.seed(0)
+    sampled = sum(profiler.should_profile() for _ in range(2000))
+    assert 400 < sampled < 600
+    assert profiler.should_profile(True) and not profiler.should_profile(False)
+    assert not any(RequestProfiler(str(tmp_path)).should_profile() for _ in range(100))
+
+    foreign = [tmp_path / "notes.prof", tmp_path / "old.cpu.txt", tmp_path / "old.memory.json"]
+    for path in foreign:
+        path.write_text("не артефакт профилировщика", encoding="utf-8")
+
+    fvr = FreeVigilanceReduction(backend=StubLanguageModel(), profiler=profiler)
+    assert fvr.reduce_text("Пациент Иванов Иван.", profiling=False).profiling_artifacts == {}
+    reports = [fvr.reduce_text("Пациент Иванов Иван.", request_id=f"r/{i}", profiling=True) for i in range(3)]
+
+    artifacts = reports[-1].profiling_artifacts
+    assert sorted(artifacts) == ["cpu_profile", "cpu_summary", "memory"]
+    assert artifacts["cpu_profile"] == str(tmp_path / "r_2.prof")
+    assert "detect_entities" in (tmp_path / "r_2.cpu.txt").read_text(encoding="utf-8")
+    memory = json.loads((tmp_path / "r_2.memory.json").read_text(encoding="utf-8"))
+    assert memory["request_id"] == "r/2" and memory["peak_bytes"] > 0
+
+    assert not any(os.path.exists(path) for path in reports[0].profiling_artifacts.values())
+    assert all(os.path.exists(path) for report in reports[1:] for path in report.profiling_artifacts.values())
+    assert all(path.exists() for path in foreign)
+
+    with profiler.profile("outer") as outer:
+        with profiler.profile("inner") as inner:
+            pass
+        assert inner == {}
+    assert outer and not list(tmp_path.glob("inner.*"))
+
+
+def test_debug_rate_limit_samples_messages_over_the_limit():
+    import logging
+    from free_vigilance_reduction.utils.logging import RateLimitFilter
+
+    rate_limit = RateLimitFilter(rate=0, burst=3, sample_every=5)
+
+    def record(level=logging.DEBUG, lineno=10):
+        return logging.LogRecord("free_vigilance_reduction.test", level, __file__, lineno, "entity %s", ("x",), None)
+
+    records = [record() for _ in range(20)]
+    passed = [r for r in records if rate_limit.filter(r)]
+    assert len(passed) == 6
+    assert passed[3] is records[7] and passed[3].getMessage() == "entity x (4 similar messages suppressed)"
+    assert rate_limit.filter(record(lineno=11)) and rate_limit.filter(record(level=logging.INFO))
+
+
+def test_logging_thread_starts_lazily_and_restarts_after_fork(tmp_path, monkeypatch):
+    import subprocess
+    import sys
+    import threading
+    from free_vigilance_reduction.utils.logging import flush_logging, get_logger
+
+    code = (
+        "import threading\n"
+        "import free_vigilance_reduction\n"
+        "assert threading.active_count() == 1, threading.enumerate()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+    log_file = tmp_path / "test.log"
+    logger = get_logger("free_vigilance_reduction.test_logging", log_file=str(log_file))
+    # Обработчик pytest форматировал бы записи в вызывающем потоке
+    monkeypatch.setattr(logger.parent, "propagate", False)
+
+    class Probe:
+        formatted_in = None
+
+        def __str__(self):
+            Probe.formatted_in = threading.current_thread()
+            return "probe"
+
+    logger.info("value %s", Probe())
+    flush_logging()
+    assert Probe.formatted_in not in (None, threading.current_thread())
+
+    logger.info("before fork")
+    pid = os.fork()
+    if pid == 0:
+        try:
+            logger.info("from child")
+            flush_logging()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    logger.info("after fork")
+    flush_logging()
+
+    messages = [line.rsplit(" - ", 1)[1] for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert messages == ["value probe", "before fork", "from child", "after fork"]
+
+
+def test_detectors_run_on_normalized_text_and_replace_original_spans():
+    from free_vigilance_reduction.utils.normalization import TextNormalizer
+
+    text = "пациент Ива-\nнов Иван\u00a0Петрович, врач Пе\u00adтров Пет\u200bр. И\u0306ошкар-Ола."
+    normalized = TextNormalizer().normalize(text)
+    assert normalized.text == "пациент Иванов Иван Петрович, врач Петров Петр. Йошкар-Ола."
+    start = normalized.text.index("Йошкар")
+    assert normalized.original_span(start, start + 6) == (text.index("И\u0306"), text.index("Ола") - 1)
+    assert TextNormalizer().normalize("Санкт-\nПетербург").text == "Санкт-\nПетербург"
+
+    fvr = FreeVigilanceReduction(backend=StubLanguageModel())
+    report = fvr.reduce_text(text)
+    assert report.reduced_text == "пациент [ФИО], врач [ФИО]. И\u0306ошкар-Ола."
+    assert [e.text for e in report.entities] == ["Иванов Иван Петрович", "Петров Петр"]
+    assert FreeVigilanceReduction(backend=StubLanguageModel(), normalize_text=False).reduce_text(text).entities == []
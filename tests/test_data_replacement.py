@@ -0,0 +1,98 @@
+from free_vigilance_reduction.config.configuration import ConfigurationProfile
+from free_vigilance_reduction.data_replacement.data_replacer import DataReplacer
+from free_vigilance_reduction.data_replacement.pseudonym_store import PseudonymStore
+from free_vigilance_reduction.entity_recognition.entity import Entity
+
+
+def _pseudonym_profile():
+    profile = ConfigurationProfile("test", entity_types=["PER"])
+    profile.replacement_rules = {"PER": {"method": "pseudonym", "placeholder": "[ФИО]"}}
+    return profile
+
+
+def _entities(text, value, entity_type="PER"):
+    entities = []
+    start = -1
+    while (start := text.find(value, start + 1)) != -1:
+        entities.append(Entity(value, entity_type, start, start + len(value)))
+    return entities
+
+
+def test_pseudonyms_are_stable_and_normalized():
+    store = PseudonymStore(secret_key="test")
+
+    ivanov = store.get_pseudonym("PER", "Иванов Иван")
+    petrov = store.get_pseudonym("PER", "Петров Петр")
+
+    assert ivanov != petrov
+    assert store.get_pseudonym("PER", "  иванов\nИВАН ") == ivanov
+    assert store.get_pseudonym("PER", "Сёмин") == store.get_pseudonym("PER", "Семин")
+    assert store.get_pseudonym("ORG", "Иванов Иван") not in (ivanov, petrov)
+
+    text = "Иванов Иван и Петров Петр. Повторно: Иванов Иван."
+    entities = _entities(text, "Иванов Иван") + _entities(text, "Петров Петр")
+    reduced_text, _ = DataReplacer(store).reduce_text(text, entities, _pseudonym_profile())
+    assert reduced_text == f"[ФИО-{ivanov}] и [ФИО-{petrov}]. Повторно: [ФИО-{ivanov}]."
+
+
+def test_pseudonyms_persist_across_reopen(tmp_path):
+    store = PseudonymStore(str(tmp_path), shards=4)
+    numbers = {name: store.get_pseudonym("PER", name) for name in ["Иванов", "Петров", "Сидоров"]}
+    store.close()
+
+    reopened = PseudonymStore(str(tmp_path), shards=8)
+    assert reopened.shards == 4
+    assert {name: reopened.get_pseudonym("PER", name) for name in numbers} == numbers
+    assert reopened.get_pseudonym("PER", "Кузнецов") not in numbers.values()
+    reopened.close()
+
+
+def test_hmac_key_separates_stores(tmp_path, monkeypatch):
+    monkeypatch.delenv("FVR_PSEUDONYM_KEY", raising=False)
+    first = PseudonymStore(secret_key="first")
+    second = PseudonymStore(secret_key="second")
+    assert first._digest("PER", "Иванов") != second._digest("PER", "Иванов")
+    assert first._digest("PER", "Иванов") == PseudonymStore(secret_key="first")._digest("PER", "Иванов")
+
+    store = PseudonymStore(str(tmp_path / "a"))
+    key = (tmp_path / "a" / "key").read_text()
+    assert (tmp_path / "a" / "key").stat().st_mode & 0o777 == 0o600
+    assert PseudonymStore(str(tmp_path / "b")).secret_key != store.secret_key
+    assert PseudonymStore(str(tmp_path / "a")).secret_key == key.encode()
+    for shard in (tmp_path / "a").glob("shard-*.tbl"):
+        assert "Иванов".encode() not in shard.read_bytes()
+
+
+def test_full_shards_grow_and_keep_numbers(tmp_path):
+    names = [f"Пациент {i}" for i in range(500)]
+
+    in_memory = PseudonymStore(secret_key="test", shards=2, shard_capacity=4)
+    numbers = [in_memory.get_pseudonym("PER", name) for name in names]
+    assert len(set(numbers)) == len(names)
+    assert [in_memory.get_pseudonym("PER", name) for name in names] == numbers
+
+    writer = PseudonymStore(str(tmp_path), secret_key="test", shards=2, shard_capacity=4)
+    reader = PseudonymStore(str(tmp_path), secret_key="test")
+    first = reader.get_pseudonym("PER", names[0])
+    numbers = [writer.get_pseudonym("PER", name) for name in names]
+    # Второй экземпляр отобразил таблицы до их увеличения и переоткрывает их при промахе
+    assert numbers[0] == first
+    assert [reader.get_pseudonym("PER", name) for name in names] == numbers
+    writer.close()
+    reader.close()
+
+    reopened = PseudonymStore(str(tmp_path), secret_key="test")
+    assert [reopened.get_pseudonym("PER", name) for name in names] == numbers
+    assert all(capacity > 4 for _, capacity, _ in reopened._tables)
+    reopened.close()
+
+
+def test_registered_pseudonym_rule_replaces_builtin():
+    replacer = DataReplacer()
+    replacer.register_replacement_rule("pseudonym", lambda text, placeholder: placeholder + "?")
+    text = "Пациент Иванов Иван."
+
+    reduced_text, _ = replacer.reduce_text(text, _entities(text, "Иванов Иван"), _pseudonym_profile())
+
+    assert reduced_text == "Пациент [ФИО]?."
+    assert replacer.pseudonym_store is None
@@ -0,0 +1,97 @@
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.common import StubLanguageModel
+from free_vigilance_reduction.config.configuration import ConfigurationProfile
+from free_vigilance_reduction.data_replacement.data_replacer import DataReplacer
+from free_vigilance_reduction.documents.document_factory import DocumentFactory
+from free_vigilance_reduction.entity_recognition.entity_recognizer import EntityRecognizer
+from free_vigilance_reduction.plugins import discover
+
+
+PLUGIN_MODULE = '''
+import hashlib
+from free_vigilance_reduction.documents.txt_processor import TxtProcessor
+
+IBAN_PATTERN = r"\\bRU\\d{2}[A-Z0-9]{10,30}\\b"
+
+
+class MarkdownProcessor(TxtProcessor):
+    def get_text(self):
+        return super().get_text().replace("**", "")
+
+
+def hash_replacement(text, placeholder):
+    return placeholder + hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+'''
+
+PLUGIN_ENTRY_POINTS = '''
+[free_vigilance_reduction.processors]
+md = fvr_test_plugin:MarkdownProcessor
+
+[free_vigilance_reduction.patterns]
+IBAN = fvr_test_plugin:IBAN_PATTERN
+
+[free_vigilance_reduction.replacement_rules]
+hash = fvr_test_plugin:hash_replacement
+'''
+
+
+@pytest.fixture
+def installed_plugin(tmp_path, monkeypatch):
+    (tmp_path / "fvr_test_plugin.py").write_text(PLUGIN_MODULE, encoding="utf-8")
+    dist_info = tmp_path / "fvr_test_plugin-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text("Metadata-Version: 2.1\nName: fvr-test-plugin\nVersion: 1.0\n")
+    (dist_info / "entry_points.txt").write_text(PLUGIN_ENTRY_POINTS)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    discover.cache_clear()
+    yield tmp_path
+    discover.cache_clear()
+    sys.modules.pop("fvr_test_plugin", None)
+
+
+def test_default_processors_are_imported_on_first_document(tmp_path):
+    code = (
+        "import sys\n"
+        "from free_vigilance_reduction.documents.document_factory import DocumentFactory\n"
+        "factory = DocumentFactory()\n"
+        "assert {'txt', 'docx', 'pdf'} <= set(factory.get_supported_formats())\n"
+        "assert 'docx' not in sys.modules and 'PyPDF2' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+    docx = pytest.importorskip("docx")
+    path = tmp_path / "card.docx"
+    document = docx.Document()
+    document.add_paragraph("Пациент Иванов Иван")
+    document.save(str(path))
+
+    processor = DocumentFactory().create_document(str(path))
+    assert type(processor).__name__ == "DocProcessor"
+    assert processor.get_text() == "Пациент Иванов Иван"
+
+
+def test_entry_point_plugins_are_loaded_on_first_need(installed_plugin):
+    factory = DocumentFactory()
+    assert "md" in factory.get_supported_formats()
+    assert "fvr_test_plugin" not in sys.modules
+
+    path = installed_plugin / "note.md"
+    path.write_text("Счет **RU0212345678901234** закрыт.", encoding="utf-8")
+    text = factory.create_document(str(path)).get_text()
+    assert text == "Счет RU0212345678901234 закрыт."
+
+    profile = ConfigurationProfile.create_default()
+    profile.entity_types.append("IBAN")
+    profile.replacement_rules["IBAN"] = {"method": "hash", "placeholder": "IBAN-"}
+    recognizer = EntityRecognizer(None, backend=StubLanguageModel())
+    entities = recognizer.detect_entities(text, profile)
+    assert [(e.text, e.entity_type) for e in entities] == [("RU0212345678901234", "IBAN")]
+
+    reduced_text, replacements = DataReplacer().reduce_text(text, entities, profile)
+    replacement = replacements["IBAN"][0]["replacement"]
+    assert replacement.startswith("IBAN-") and len(replacement) == 13
+    assert reduced_text == f"Счет {replacement} закрыт."
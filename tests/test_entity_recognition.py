@@ -0,0 +1,546 @@
+import os
+import re
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from free_vigilance_reduction.config.configuration import ConfigurationProfile
+from free_vigilance_reduction.entity_recognition.entity import Entity
+from free_vigilance_reduction.entity_recognition.entity_recognizer import EntityRecognizer
+from free_vigilance_reduction.entity_recognition.language_model import LanguageModel
+from free_vigilance_reduction.entity_recognition.token_classification_model import TokenClassificationModel
+from free_vigilance_reduction.utils.timing import StageTimer
+
+
+LABELS = ["O", "B-PER", "I-PER", "B-LOC", "I-LOC"]
+CYRILLIC = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+LETTERS = CYRILLIC + CYRILLIC.upper() + "abcdefghijklmnopqrstuvwxyz" + "ABCDEFGHIJKLMNOPQRSTUVWXYZ" + "0123456789"
+
+
+def _save_tokenizer(path):
+    """Сохранение посимвольного токенизатора для крошечных моделей."""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list(LETTERS + ".,:-[]") + ["##" + c for c in LETTERS + ".,:-[]"]
+    tokenizer = transformers.BertTokenizer(vocab={token: i for i, token in enumerate(vocab)}, do_lower_case=False)
+    tokenizer.save_pretrained(path)
+    return tokenizer
+
+
+@pytest.fixture(scope="module")
+def tiny_ner_model(tmp_path_factory):
+    """Крошечная случайно инициализированная модель разметки токенов."""
+    path = tmp_path_factory.mktemp("tiny_ner")
+    tokenizer = _save_tokenizer(path)
+    config = transformers.BertConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+        id2label=dict(enumerate(LABELS)),
+        label2id={label: i for i, label in enumerate(LABELS)},
+    )
+    torch.manual_seed(0)
+    transformers.BertForTokenClassification(config).save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def tiny_causal_model(tmp_path_factory):
+    """Крошечная случайно инициализированная генеративная модель."""
+    path = tmp_path_factory.mktemp("tiny_causal")
+    tokenizer = _save_tokenizer(path)
+    config = transformers.LlamaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        eos_token_id=tokenizer.sep_token_id,
+        pad_token_id=tokenizer.pad_token_id,
+    )
+    torch.manual_seed(0)
+    transformers.LlamaForCausalLM(config).save_pretrained(path)
+    return str(path)
+
+
+def test_token_classification_offsets_are_exact(tiny_ner_model):
+    model = TokenClassificationModel(tiny_ner_model, window_size=40, batch_size=2)
+    profile = ConfigurationProfile("test", entity_types=["PER", "LOC"])
+    text = "Пациент: Иванов Иван Иванович.\nАдрес: г. Москва, ул. Пушкина, д. 10.\nИванов выписан."
+
+    entities = model.search_entities(text, [], profile)
+
+    for entity in entities:
+        assert entity.entity_type in profile.entity_types
+        assert text[entity.start_pos:entity.end_pos] == entity.text
+        assert entity.text == entity.text.strip()
+
+
+def test_token_classification_decodes_bio_labels(tiny_ner_model):
+    model = TokenClassificationModel(tiny_ner_model)
+    text = "Иван Петров из Москвы"
+    offsets = [(0, 0), (0, 4), (5, 11), (12, 14), (15, 21), (0, 0)]
+    labels = [0, 1, 2, 0, 3, 0]
+
+    assert model._decode_spans(text, offsets, labels) == [(0, 11, "PER"), (15, 21, "LOC")]
+
+
+def test_onnx_backend_matches_torch_greedy_decoding(tiny_causal_model, tmp_path):
+    pytest.importorskip("onnxruntime")
+    from free_vigilance_reduction.entity_recognition.onnx_language_model import OnnxLanguageModel
+
+    generation_kwargs = {"do_sample": False, "max_new_tokens": 16}
+    torch_model = LanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs)
+    onnx_model = OnnxLanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs,
+                                   cache_dir=str(tmp_path / "onnx"), intra_op_num_threads=1)
+
+    for prompt in ["Найди сущности: Иванов Иван", "Адрес: г. Москва, ул. Ленина, д. 1"]:
+        assert onnx_model._generate_response(prompt) == torch_model._generate_response(prompt)
+
+    profile = ConfigurationProfile("test", entity_types=["PER", "LOC"])
+    text = "Пациент: Иванов Иван.\nАдрес: г. Москва."
+    assert [repr(e) for e in onnx_model.search_entities(text, [], profile)] == \
+        [repr(e) for e in torch_model.search_entities(text, [], profile)]
+
+
+def test_onnx_export_is_cached(tiny_causal_model, tmp_path):
+    import hashlib
+    import json
+    pytest.importorskip("onnxruntime")
+    from free_vigilance_reduction.entity_recognition.onnx_language_model import OnnxLanguageModel
+
+    cache_dir = tmp_path / "models"
+    cache_dir.mkdir()
+    (cache_dir / "notes.txt").write_text("чужой файл")
+    exports = {}
+    for name, source in [("stale", os.path.realpath(tiny_causal_model)), ("other", str(tmp_path / "other-model"))]:
+        exports[name] = cache_dir / f"{name}-export"
+        exports[name].mkdir()
+        (exports[name] / "model.onnx").write_bytes(b"")
+        source_key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        (exports[name] / "metadata.json").write_text(
+            json.dumps({"fingerprint": "old", "source": source_key, "eos_token_ids": []}))
+
+    model = OnnxLanguageModel(tiny_causal_model, cache_dir=str(cache_dir))
+    onnx_path = os.path.join(model.export_dir, "model.onnx")
+    exported_at = os.path.getmtime(onnx_path)
+    assert (cache_dir / "notes.txt").read_text() == "чужой файл"
+    assert not exports["stale"].exists()
+    assert exports["other"].exists()
+
+    assert OnnxLanguageModel(tiny_causal_model, cache_dir=str(cache_dir)).export_dir == model.export_dir
+    assert os.path.getmtime(onnx_path) == exported_at
+
+
+def test_copy_grammar_accepts_only_source_spans():
+    from free_vigilance_reduction.entity_recognition.constrained_decoding import CopyGrammar
+
+    grammar = CopyGrammar("Пациент Иванов Иван, г. Москва", ["PER", "LOC"])
+
+    assert grammar.advance(CopyGrammar.OUT, "[PER: Иванов Иван] [LOC: Москва]") == CopyGrammar.OUT
+    assert grammar.advance(CopyGrammar.OUT, "[PER: Петров]") is None
+    assert grammar.advance(CopyGrammar.OUT, "[ORG: Москва]") is None
+    assert grammar.advance(CopyGrammar.OUT, "[PER: ]") is None
+
+
+@pytest.mark.parametrize("backend", ["generative", "onnx"])
+def test_constrained_decoding_spans_resolve_to_source(tiny_causal_model, tmp_path, backend):
+    profile = ConfigurationProfile("test", entity_types=["PER", "LOC"])
+    text = "Пациент: Иванов Иван.\nАдрес: г. Москва, ул. Ленина."
+    generation_kwargs = {"do_sample": True, "max_new_tokens": 40}
+
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+        from free_vigilance_reduction.entity_recognition.onnx_language_model import OnnxLanguageModel
+        model = OnnxLanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs, constrained_decoding=True,
+                                  cache_dir=str(tmp_path / "onnx"), seed=0)
+    else:
+        torch.manual_seed(0)
+        model = LanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs, constrained_decoding=True)
+
+    for _ in range(3):
+        response = model._generate_response(model._generate_prompt(text, profile), text, profile.entity_types)
+        for entity_type, entity_text in model._extract_mentions(response, profile):
+            assert entity_type in profile.entity_types
+            assert entity_text in text
+
+
+@pytest.mark.parametrize("backend", ["generative", "onnx"])
+def test_generation_records_prefill_and_decode_stages(tiny_causal_model, tmp_path, backend):
+    generation_kwargs = {"do_sample": False, "max_new_tokens": 8}
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+        from free_vigilance_reduction.entity_recognition.onnx_language_model import OnnxLanguageModel
+        model = OnnxLanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs,
+                                  cache_dir=str(tmp_path / "onnx"))
+    else:
+        model = LanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs)
+
+    timer = StageTimer()
+    with timer.activate():
+        model._generate_response("Найди сущности: Иванов Иван")
+
+    assert {"model.tokenize", "model.prefill", "model.decode"} <= set(timer.timings)
+    assert all(seconds >= 0 for seconds in timer.timings.values())
+
+
+
+def test_combined_patterns_match_separate_scans():
+    from benchmarks.common import STANDARD_PATTERNS, StubLanguageModel
+    from benchmarks.synthetic_corpus import SyntheticCorpusGenerator
+
+    recognizer = EntityRecognizer(None, backend=StubLanguageModel())
+    for entity_type, pattern in STANDARD_PATTERNS.items():
+        recognizer.register_pattern(entity_type, pattern)
+    profile = ConfigurationProfile.create_default()
+    text, _ = SyntheticCorpusGenerator(seed=1).generate_document(20000)
+
+    separate = [
+        Entity(match.group(), entity_type, match.start(), match.end())
+        for entity_type in profile.entity_types if entity_type in recognizer.patterns
+        for match in recognizer.patterns[entity_type].finditer(text)
+    ]
+    combined = recognizer._find_pattern_matches(text, profile.compile())
+
+    assert [repr(e) for e in recognizer._remove_overlapping_entities(combined)] == \
+        [repr(e) for e in recognizer._remove_overlapping_entities(separate)]
+
+
+def test_remote_backend_matches_in_process_model(tiny_ner_model):
+    import tempfile
+    from free_vigilance_reduction.entity_recognition.model_server import ModelServer, RemoteModelBackend
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="fvr"), "model.sock")
+    local = TokenClassificationModel(tiny_ner_model, window_size=40)
+    server = ModelServer(local, socket_path, model_path=tiny_ner_model)
+    thread = server.start()
+    profile = ConfigurationProfile("test", entity_types=["PER", "LOC"]).compile()
+    text = "Пациент: Иванов Иван Иванович.\nАдрес: г. Москва, ул. Пушкина, д. 10.\nИванов выписан."
+    expected = [repr(e) for e in local.search_entities(text, [], profile)]
+
+    remote = RemoteModelBackend(socket_path, model_path=tiny_ner_model, fallback="token_classification")
+    timer = StageTimer()
+    with timer.activate():
+        assert [repr(e) for e in remote.search_entities(text, [], profile)] == expected
+    assert "model.forward" in timer.timings
+    assert [repr(e) for e in remote.search_entities(text, [], profile, windows=[(0, text)])] == \
+        [repr(e) for e in local.search_entities(text, [], profile, windows=[(0, text)])]
+
+    server.shutdown()
+    thread.join(5)
+    assert [repr(e) for e in remote.search_entities(text, [], profile, windows=[(0, text)])] == \
+        [repr(e) for e in local.search_entities(text, [], profile, windows=[(0, text)])]
+    assert isinstance(remote._local, TokenClassificationModel)
+    with pytest.raises(ConnectionError):
+        RemoteModelBackend(socket_path)
+
+
+def test_remote_backend_does_not_resend_timed_out_request(tmp_path):
+    import socket
+    import threading
+    from free_vigilance_reduction.entity_recognition.model_server import RemoteModelBackend, recv_frame, send_frame
+
+    socket_path = str(tmp_path / "model.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    searches = []
+    connections = []
+
+    def serve():
+        # Сервер отвечает на ping и зависает на поиске
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            connections.append(conn)
+            while True:
+                message = recv_frame(conn)
+                if message is None:
+                    break
+                if message["op"] == "ping":
+                    send_frame(conn, {"window_size": 100, "backend": "fake", "pid": 0})
+                else:
+                    searches.append(message["op"])
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        remote = RemoteModelBackend(socket_path, timeout=0.2)
+        profile = ConfigurationProfile("test", entity_types=["PER"]).compile()
+        with pytest.raises(ConnectionError):
+            remote.search_entities("Иванов пришел.", [], profile)
+        assert searches == ["search"]
+        assert len(connections) == 1
+    finally:
+        listener.close()
+        for conn in connections:
+            conn.close()
+        thread.join(5)
+
+
+def test_model_server_socket_is_private_to_its_user(tmp_path, monkeypatch):
+    from benchmarks.common import StubLanguageModel
+    from free_vigilance_reduction.entity_recognition import model_server
+    from free_vigilance_reduction.entity_recognition.model_server import ModelServer, RemoteModelBackend
+
+    monkeypatch.delenv("FVR_MODEL_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    server = ModelServer(StubLanguageModel())
+    assert server.socket_path == str(tmp_path / "fvr" / "model.sock")
+    assert (tmp_path / "fvr").stat().st_mode & 0o777 == 0o700
+
+    (tmp_path / "fvr").chmod(0o755)
+    with pytest.raises(PermissionError):
+        ModelServer(StubLanguageModel())
+    (tmp_path / "fvr").chmod(0o700)
+
+    thread = server.start()
+    try:
+        remote = RemoteModelBackend()
+        assert remote.timeout == model_server.DEFAULT_TIMEOUT
+        remote.close()
+
+        # Сервер другого пользователя не получает тексты
+        real_uid = os.getuid()
+        monkeypatch.setattr(model_server.os, "getuid", lambda: real_uid + 1)
+        with pytest.raises(ConnectionError, match="uid"):
+            RemoteModelBackend(server.socket_path)
+    finally:
+        server.shutdown()
+        thread.join(5)
+
+
+def test_mmap_weights_match_regular_loading(tiny_causal_model):
+    generation_kwargs = {"do_sample": False, "max_new_tokens": 8}
+    regular = LanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs)
+    mapped = LanguageModel(tiny_causal_model, generation_kwargs=generation_kwargs, mmap_weights=True)
+
+    assert not any(parameter.requires_grad for parameter in mapped.model.parameters())
+    prompt = "Найди сущности: Иванов Иван"
+    assert mapped._generate_response(prompt) == regular._generate_response(prompt)
+
+
+def test_scheduler_interleaves_interactive_windows_into_bulk_jobs():
+    import threading
+    import time
+    from benchmarks.common import StubLanguageModel
+    from free_vigilance_reduction.entity_recognition.scheduler import (
+        ScheduledModelBackend, TokenBudgetScheduler, request_priority)
+
+    executed = []
+
+    class RecordingModel(StubLanguageModel):
+        def search_entities(self, text, entities, profile, windows=None):
+            executed.append(text[:4])
+            return super().search_entities(text, entities, profile, windows)
+
+    scheduler = TokenBudgetScheduler(max_concurrency=1, max_tokens_in_flight=1000)
+    model = ScheduledModelBackend(RecordingModel(window_size=200, latency_per_window=0.005), scheduler)
+    profile = ConfigurationProfile.create_default()
+    bulk_text = "".join(f"BULK запись {i}: пациент Иванов Иван Иванович.\n" for i in range(200))
+    bulk_result = []
+    bulk = threading.Thread(target=lambda: bulk_result.extend(model.search_entities(bulk_text, [], profile)))
+    with request_priority("bulk"):
+        bulk.start()
+    while len(executed) < 5:
+        time.sleep(0.001)
+
+    submitted_after = len(executed)
+    timer = StageTimer()
+    with request_priority("interactive"), timer.activate():
+        small = model.search_entities("ITEM: врач Петров Петр Петрович.", [], profile)
+    position = executed.index("ITEM")
+    bulk.join()
+    scheduler.close()
+
+    assert [e.text for e in small] == ["Петров Петр Петрович"]
+    assert position <= submitted_after + 1 < len(executed) - 10
+    assert "model.queue_wait" in timer.timings
+    direct = RecordingModel(window_size=200).search_entities(bulk_text, [], profile)
+    assert [repr(e) for e in bulk_result] == [repr(e) for e in direct]
+
+
+def test_span_index_tolerates_model_output_differences():
+    import random
+    import numpy as np
+    from free_vigilance_reduction.entity_recognition.span_index import SpanIndex, build_suffix_array
+
+    text = "Пациент  Семёнов\tПётр обратился в «Клинику №1». СЕМЕНОВ ПЕТР - сын; Семеновский район."
+    index = SpanIndex(text)
+    assert [text[s:e] for s, e in index.find("Семенов Петр")] == ["Семёнов\tПётр", "СЕМЕНОВ ПЕТР"]
+    assert [text[s:e] for s, e in index.find('"клинику №1"')] == ["«Клинику №1»"]
+    assert index.find("Сидоров") == [] and index.find("  ") == []
+
+    for span in ["Семенов Петр", '"клинику №1"', "Сидоров", "  ", "е"]:
+        assert SpanIndex(text).scan(span) == index.find(span)
+
+    mentions = [("PER", "семенов"), ("PER", "Семёнов Пётр"), ("LOC", "Клинику")]
+    expected = [("PER", "Семёнов\tПётр", 9), ("LOC", "Клинику", 35), ("PER", "СЕМЕНОВ ПЕТР", 48)]
+    scanned = SpanIndex(text)
+    assert [(e.entity_type, e.text, e.start_pos) for e in scanned.find_entities(mentions)] == expected
+    assert scanned._suffix_array is None
+    assert [(e.entity_type, e.text, e.start_pos) for e in index.find_entities(mentions)] == expected
+
+    random.seed(0)
+    sample = "".join(random.choice("аб в") for _ in range(500))
+    suffix_array = build_suffix_array(sample)
+    assert suffix_array.dtype == np.int32 and index.positions.dtype == np.int32
+    assert suffix_array.tolist() == sorted(range(len(sample)), key=lambda i: sample[i:])
+
+
+def test_parallel_detection_matches_sequential_detection(tmp_path):
+    from benchmarks.common import STANDARD_PATTERNS, StubLanguageModel
+    from benchmarks.synthetic_corpus import SyntheticCorpusGenerator
+
+    dictionary_path = tmp_path / "cities.csv"
+    dictionary_path.write_text("Москва,LOC\nКазань,LOC\n", encoding="utf-8")
+    profile = ConfigurationProfile.create_default()
+    profile.dictionary_settings = {"cities": {"enabled": True}}
+    text, _ = SyntheticCorpusGenerator(seed=3).generate_document(60000)
+    text += "\nг. Москва, тел. +7 (495) 123-45-67. Повторно: Москва."
+
+    def detect(**options):
+        recognizer = EntityRecognizer(None, backend=StubLanguageModel(), **options)
+        for entity_type, pattern in STANDARD_PATTERNS.items():
+            recognizer.register_pattern(entity_type, pattern)
+        recognizer.dictionary_manager.load_dictionary("cities", str(dictionary_path))
+        if recognizer.parallel_detector is not None:
+            recognizer.parallel_detector.min_text_length = 0
+            recognizer.parallel_detector.segment_size = 4000
+        timer = StageTimer()
+        with timer.activate():
+            return recognizer.detect_entities(text, profile), timer.timings
+
+    sequential, _ = detect()
+    parallel, timings = detect(detection_processes=3)
+    assert [(repr(e), e.source) for e in parallel] == [(repr(e), e.source) for e in sequential]
+    assert "parallel_wait" in timings and "regex" in timings
+    assert [e.start_pos for e in sequential if e.text == "Москва"] == \
+        [m.start() for m in re.finditer(r"\bМосква\b", text)]
+
+
+def test_parallel_detection_fails_instead_of_hanging_when_a_worker_dies():
+    import signal
+    import time
+    from free_vigilance_reduction.entity_recognition import parallel_detection
+
+    class SlowRecognizer:
+        class dictionary_manager:
+            @staticmethod
+            def find_matches(text, profile, start, end):
+                return []
+
+        def _find_pattern_matches(self, text, profile, start, end):
+            time.sleep(0.1)
+            return []
+
+    detector = parallel_detection.ParallelDetector(processes=2, segment_size=10, min_text_length=0)
+    pending = detector.start(SlowRecognizer(), "слово " * 100, ConfigurationProfile.create_default())
+    assert parallel_detection._task is None
+    time.sleep(0.3)
+    os.kill(pending._workers[0].pid, signal.SIGKILL)
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="exited"):
+        pending.result()
+    assert time.monotonic() - started < 10
+
+
+def test_compiled_profile_keeps_one_matcher_for_enabled_dictionaries(tmp_path):
+    from free_vigilance_reduction.entity_recognition.dictionary_manager import DictionaryManager
+
+    (tmp_path / "cities.csv").write_text("Москва,LOC\nКазань,LOC\n", encoding="utf-8")
+    (tmp_path / "clinics.csv").write_text("Казань,ORG\nБоткинская,ORG\n", encoding="utf-8")
+    manager = DictionaryManager()
+    manager.load_dictionary("cities", str(tmp_path / "cities.csv"))
+    manager.load_dictionary("clinics", str(tmp_path / "clinics.csv"))
+    profile = ConfigurationProfile("test", ["LOC", "ORG"])
+    profile.dictionary_settings = {"cities": {"enabled": True}, "clinics": {"enabled": True},
+                                   "missing": {"enabled": True}}
+    compiled = profile.compile()
+
+    text = "Москва, Казань, Боткинская, Самара"
+    matches = [(e.text, e.entity_type) for e in manager.find_matches(text, compiled)]
+    assert matches == [("Москва", "LOC"), ("Казань", "LOC"), ("Боткинская", "ORG")]
+    assert [(e.text, e.entity_type) for e in manager.find_matches(text, profile)] == matches
+    assert manager.matcher(compiled) is manager.matcher(compiled)
+
+    manager.dictionaries["clinics"].add_term("Самара", "ORG")
+    assert manager.find_matches(text, compiled)[-1].text == "Самара"
+    manager.dictionaries["clinics"].add_term("Боткинская", "LOC")
+    assert [e.entity_type for e in manager.find_matches(text, compiled)][2] == "LOC"
+    profile.dictionary_settings["clinics"]["enabled"] = False
+    assert manager.matcher(profile.compile()) is manager.dictionaries["cities"]
+    assert DictionaryManager().find_matches(text, compiled) == []
+
+
+def test_candidate_filter_keeps_corroborated_sentence_initial_names():
+    from free_vigilance_reduction.entity_recognition.candidate_filter import CandidateFilter
+
+    candidate_filter = CandidateFilter()
+    profile = ConfigurationProfile("test", entity_types=["PER"])
+    text = "Погода была хорошей. Иванов пришел домой. Потом все ушли. Врач осмотрел пациента Иванова."
+
+    windows = candidate_filter.select_windows(text, profile, 1000)
+
+    selected = "".join(window for _, window in windows)
+    assert "Иванов пришел домой." in selected
+    assert "Погода была хорошей." not in selected
+    assert "Потом все ушли." not in selected
+    assert candidate_filter.score_sentence("Иванов пришел домой.") == 0
+    assert candidate_filter.score_sentence("Он пришел домой.", proper_stems=frozenset({"он"})) == 1
+
+
+def test_candidate_filter_does_not_split_on_abbreviations():
+    from free_vigilance_reduction.entity_recognition.candidate_filter import CandidateFilter
+
+    text = "Адрес: г. Москва, ул. Ленина, д. 5. Явка через пять дней. Тел. не указан.\nВыписан домой."
+
+    sentences = [text[start:end] for start, end in CandidateFilter().split_sentences(text)]
+
+    assert sentences == ["Адрес: г. Москва, ул. Ленина, д. 5.", " Явка через пять дней.", " Тел. не указан.",
+                         "Выписан домой."]
+
+
+def test_candidate_filter_skips_boilerplate_of_synthetic_corpus():
+    from benchmarks.synthetic_corpus import BOILERPLATE, SyntheticCorpusGenerator
+    from free_vigilance_reduction.entity_recognition.candidate_filter import CandidateFilter
+
+    candidate_filter = CandidateFilter()
+    profile = ConfigurationProfile.create_default()
+    for pii_density, max_share in ((0.05, 0.1), (0.3, 0.4)):
+        text, entities = SyntheticCorpusGenerator(seed=0, pii_density=pii_density).generate_document(100000)
+        windows = candidate_filter.select_windows(text, profile, 1000)
+
+        selected = "".join(window for _, window in windows)
+        assert len(selected) < max_share * len(text)
+        assert not any(sentence in selected for sentence in BOILERPLATE)
+        assert all(entity.text in selected for entity in entities)
+
+
+def test_candidate_filter_packs_sentences_into_bounded_windows():
+    from free_vigilance_reduction.entity_recognition.candidate_filter import CandidateFilter
+
+    candidate_filter = CandidateFilter()
+    profile = ConfigurationProfile("test", entity_types=["PER"])
+    sentences = [f"Врач Петров принял пациента номер {i}. " for i in range(20)] + ["x" * 150 + " Иванов."]
+    text = "".join(sentences)
+
+    windows = candidate_filter.select_windows(text, profile, 100)
+
+    assert all(len(window) <= 100 for _, window in windows)
+    assert "".join(window for _, window in windows) == text
+    for offset, window in windows:
+        assert text[offset:offset + len(window)] == window
+
+    # Невыбранное предложение между кандидатами закрывает окно
+    text = "Врач Петров пришел. Погода была хорошей. Врач Сидоров ушел. "
+    windows = candidate_filter.select_windows(text, profile, 1000)
+    assert [window.strip() for _, window in windows] == ["Врач Петров пришел.", "Врач Сидоров ушел."]
+    for offset, window in windows:
+        assert text[offset:offset + len(window)] == window
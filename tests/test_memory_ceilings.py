@@ -0,0 +1,158 @@
+import ctypes
+import ctypes.util
+import gc
+import math
+import os
+import tracemalloc
+
+import pytest
+
+from benchmarks.common import RssSampler
+from benchmarks.run_benchmarks import write_pdf
+from benchmarks.synthetic_corpus import SyntheticCorpusGenerator
+from free_vigilance_reduction.config.configuration import ConfigurationProfile
+from free_vigilance_reduction.data_replacement.data_replacer import DataReplacer
+from free_vigilance_reduction.documents.pdf_processor import PdfProcessor
+from free_vigilance_reduction.documents.txt_processor import TxtProcessor
+from free_vigilance_reduction.reporting.reduction_report import ReductionReport
+
+
+# Допустимый прирост пиковой памяти на байт входа (наклон линейной аппроксимации):
+# (пик объектов Python по tracemalloc, прирост RSS). RSS учитывает память C-расширений
+# (дерево lxml при чтении DOCX) и фрагментацию кучи и зависит от истории процесса
+# (порог mmap в glibc подстраивается), поэтому его потолки заданы с большим запасом.
+CEILINGS = {
+    "txt": (4.8, 4.0),
+    "pdf": (5.8, 16.0),
+    "docx": (1.5, 10.0),
+    "reduce_text": (4.8, 20.0),
+    "to_json": (9.7, 14.0),
+}
+MAX_EXPONENT = 1.25
+RSS_REPEATS = 2
+SIZES = (50_000, 100_000, 200_000, 400_000)
+# Разбор PDF заметно медленнее остальных этапов
+PDF_SIZES = (20_000, 40_000, 80_000, 160_000)
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"))
+    _malloc_trim = _libc.malloc_trim
+except (OSError, TypeError, AttributeError):
+    _malloc_trim = None
+
+
+def _rss_growth(func):
+    """
+    Прирост пикового RSS при вызове в дочернем процессе: потоки и куча других тестов
+    не влияют на замер. None, если fork, malloc_trim или /proc недоступны.
+    """
+    if _malloc_trim is None or not hasattr(os, "fork"):
+        return None
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_end)
+            gc.collect()
+            # Возврат освобожденной памяти системе, иначе повторные выделения не видны в RSS
+            _malloc_trim(0)
+            with RssSampler(interval=0.001) as sampler:
+                func()
+            os.write(write_end, str(sampler.peak_growth).encode())
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end, "rb") as pipe:
+        output = pipe.read()
+    os.waitpid(pid, 0)
+    return int(output) if output.isdigit() else None
+
+
+def _peak_bytes(func):
+    """
+    Пиковая память вызова: пик tracemalloc и прирост RSS (None, если не измерен).
+    Замеры выполняются в отдельных вызовах, чтобы трассировка не искажала RSS;
+    из нескольких замеров RSS берется наименьший, так как шум только завышает прирост.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        traced = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    rss = [_rss_growth(func) for _ in range(RSS_REPEATS)]
+    return traced, None if None in rss else min(rss)
+
+
+def _fit(sizes, peaks):
+    """Наклон линейной аппроксимации и показатель степени в логарифмическом масштабе."""
+    def slope(xs, ys):
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+    return slope(sizes, peaks), slope([math.log(x) for x in sizes], [math.log(y) for y in peaks])
+
+
+def _txt_stage(text, entities, workdir):
+    path = workdir / f"{len(text)}.txt"
+    path.write_text(text, encoding="utf-8")
+    return TxtProcessor(str(path)).get_text
+
+
+def _pdf_stage(text, entities, workdir):
+    path = workdir / f"{len(text)}.pdf"
+    write_pdf(str(path), text)
+    return PdfProcessor(str(path)).get_text
+
+
+def _docx_stage(text, entities, workdir):
+    docx = pytest.importorskip("docx")
+    from free_vigilance_reduction.documents.docx_processor import DocProcessor
+
+    path = workdir / f"{len(text)}.docx"
+    document = docx.Document()
+    for paragraph in text.split("\n"):
+        document.add_paragraph(paragraph)
+    document.save(str(path))
+    return DocProcessor(str(path)).get_text
+
+
+def _reduce_text_stage(text, entities, workdir):
+    profile = ConfigurationProfile.create_default()
+    return lambda: DataReplacer().reduce_text(text, entities, profile)
+
+
+def _to_json_stage(text, entities, workdir):
+    reduced_text, replacements = DataReplacer().reduce_text(text, entities, ConfigurationProfile.create_default())
+    return ReductionReport(text, reduced_text, entities, replacements).to_json
+
+
+@pytest.mark.parametrize("stage, build, sizes, ascii_only", [
+    ("txt", _txt_stage, SIZES, False),
+    ("pdf", _pdf_stage, PDF_SIZES, True),
+    ("docx", _docx_stage, SIZES, False),
+    ("reduce_text", _reduce_text_stage, SIZES, False),
+    ("to_json", _to_json_stage, SIZES, False),
+])
+def test_peak_memory_grows_linearly_within_ceiling(tmp_path, stage, build, sizes, ascii_only):
+    input_bytes, measurements = [], []
+    # Первый вызов прогревает кэши и импорты и в аппроксимацию не входит
+    for index, size in enumerate((sizes[0],) + sizes):
+        text, entities = SyntheticCorpusGenerator(seed=0).generate_document(size)
+        if ascii_only:
+            text = text.encode("ascii", "replace").decode("ascii")
+        measurement = _peak_bytes(build(text, entities, tmp_path))
+        if index:
+            input_bytes.append(len(text.encode("utf-8")))
+            measurements.append(measurement)
+
+    for kind, ceiling, peaks in zip(("traced", "rss"), CEILINGS[stage], zip(*measurements)):
+        if None in peaks:
+            continue
+        peaks = [max(peak, 1) for peak in peaks]
+        per_byte, exponent = _fit(input_bytes, peaks)
+        report = ", ".join(f"{size}: {peak / size:.1f}" for size, peak in zip(input_bytes, peaks))
+        assert per_byte <= ceiling, f"{stage} {kind}: {per_byte:.2f} bytes per input byte ({report})"
+        assert exponent <= MAX_EXPONENT, f"{stage} {kind}: peak grows as n^{exponent:.2f} ({report})"
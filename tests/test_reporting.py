@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+
+from free_vigilance_reduction.config.configuration import ConfigurationProfile
+from free_vigilance_reduction.data_replacement.data_replacer import DataReplacer
+from free_vigilance_reduction.entity_recognition.entity import Entity
+from free_vigilance_reduction.reporting.reduction_report import ReductionReport
+
+
+TEXT = "Пациент Иванов Иван, тел. +7 (912) 123-45-67. Повторно: Иванов Иван. Адрес: г. Москва."
+
+
+def _make_report():
+    entities = []
+    for text, entity_type, source in [("Иванов Иван", "PER", "model"), ("+7 (912) 123-45-67", "PHONE", "regex"),
+                                      ("г. Москва", "LOC", "dictionary")]:
+        start = -1
+        while (start := TEXT.find(text, start + 1)) != -1:
+            entities.append(Entity(text, entity_type, start, start + len(text), source))
+    entities.append(Entity("внешний текст", "ORG", 0, 7))
+    profile = ConfigurationProfile.create_default()
+    reduced_text, replacements = DataReplacer().reduce_text(TEXT, entities[:-1], profile)
+    return ReductionReport(TEXT, reduced_text, entities, replacements), entities, replacements
+
+
+def test_report_keeps_entities_and_replacements():
+    report, entities, replacements = _make_report()
+
+    assert [repr(e) for e in report.entities] == [repr(e) for e in entities]
+    assert [e.source for e in report.entities] == [e.source for e in entities]
+    assert report.replacements == replacements
+    assert report.replacement_counts() == {t: len(items) for t, items in replacements.items()}
+
+
+def test_streaming_writers_match_in_memory_serialization():
+    report, _, _ = _make_report()
+
+    buffer = io.StringIO()
+    report.write_json(buffer)
+    assert buffer.getvalue() == report.to_json()
+    assert json.loads(buffer.getvalue()) == json.loads(report.to_json(indent=4))
+
+    buffer = io.StringIO()
+    report.write_ndjson(buffer)
+    records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+    assert records[0]["record"] == "summary"
+    assert sum(r["record"] == "entity" for r in records) == report.entity_count
+    assert sum(r["record"] == "replacement" for r in records) == report.reduction_count
+
+    buffer = io.StringIO()
+    report.write_csv(buffer)
+    rows = list(csv.reader(io.StringIO(buffer.getvalue())))
+    assert len(rows) == report.reduction_count + 1
+
+
+def test_distinct_counter_estimate_and_merge():
+    from free_vigilance_reduction.reporting.corpus_aggregator import DistinctCounter
+
+    left, right, whole = DistinctCounter(), DistinctCounter(), DistinctCounter()
+    for i in range(20000):
+        (left if i % 2 else right).add(f"value-{i % 10000}")
+        whole.add(f"value-{i % 10000}")
+    left.merge(right)
+
+    assert left.registers == whole.registers
+    assert abs(whole.estimate() - 10000) < 500
+
+
+def test_corpus_aggregator_merges_partials(tmp_path):
+    from free_vigilance_reduction.reporting.corpus_aggregator import CorpusAggregator
+
+    report, entities, replacements = _make_report()
+    empty = ReductionReport("Нет данных.", "Нет данных.", [], {})
+    partials = [CorpusAggregator(str(tmp_path / f"part{i}.ndjson")) for i in range(2)]
+    partials[0].add(report, document="a.txt", timings={"total": 0.2})
+    partials[1].add(empty, document="b.txt", timings={"total": 0.01})
+
+    merged = CorpusAggregator.from_dict(json.loads(json.dumps(partials[0].to_dict())))
+    merged.merge(partials[1].to_dict())
+    summary = merged.summary()
+
+    assert summary["documents"] == 2
+    assert summary["documents_without_entities"] == 1
+    assert summary["entities"]["PER"] == sum(e.entity_type == "PER" for e in entities)
+    assert summary["replacements"] == report.replacement_counts()
+    assert summary["distinct_entities"]["PER"] == 1
+    assert summary["timings"]["total"]["count"] == 2
+    line = json.loads((tmp_path / "part0.ndjson").read_text(encoding="utf-8"))
+    assert line["document"] == "a.txt" and line["status"] == "success"
+
+
+class _BlockingObserver:
+    """Наблюдатель, записывающий события; доставка ждет release, пока gate закрыт."""
+
+    def __init__(self, gated=False):
+        import threading
+
+        self.events = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not gated:
+            self.release.set()
+
+    def on_stage_timing(self, stage, duration):
+        self.started.set()
+        self.release.wait()
+        self.events.append(stage)
+
+
+def test_async_observer_delivers_in_order_and_flushes():
+    from free_vigilance_reduction.reporting.async_observer import AsyncObserver
+
+    observer = _BlockingObserver()
+    wrapper = AsyncObserver(observer, queue_size=8)
+    stages = [f"stage-{i}" for i in range(200)]
+    for stage in stages:
+        wrapper.on_stage_timing(stage, 0.0)
+
+    assert wrapper.flush(timeout=5.0)
+    assert observer.events == stages and wrapper.dropped == 0
+    assert wrapper.close(timeout=5.0)
+    wrapper.on_stage_timing("after close", 0.0)
+    assert observer.events == stages
+
+
+def test_async_observer_drops_when_full_and_flush_times_out():
+    import threading
+    from free_vigilance_reduction.reporting.async_observer import AsyncObserver
+
+    observer = _BlockingObserver(gated=True)
+    wrapper = AsyncObserver(observer, queue_size=2, full_policy="drop")
+    wrapper.on_stage_timing("busy", 0.0)
+    assert observer.started.wait(5.0)
+    for i in range(5):
+        wrapper.on_stage_timing(f"queued-{i}", 0.0)
+
+    assert wrapper.dropped == 3
+    assert not wrapper.flush(timeout=0.05)
+    observer.release.set()
+    assert wrapper.flush(timeout=5.0)
+    assert observer.events == ["busy", "queued-0", "queued-1"]
+    wrapper.close()
+
+    observer = _BlockingObserver(gated=True)
+    wrapper = AsyncObserver(observer, queue_size=1, full_policy="block")
+    wrapper.on_stage_timing("busy", 0.0)
+    assert observer.started.wait(5.0)
+    wrapper.on_stage_timing("queued", 0.0)
+    producer = threading.Thread(target=wrapper.on_stage_timing, args=("blocked", 0.0))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    observer.release.set()
+    producer.join(5.0)
+    assert wrapper.close(timeout=5.0)
+    assert observer.events == ["busy", "queued", "blocked"] and wrapper.dropped == 0
+
+
+def test_async_observer_close_while_busy_respects_timeout():
+    import time
+    from free_vigilance_reduction.reporting.async_observer import AsyncObserver
+
+    observer = _BlockingObserver(gated=True)
+    wrapper = AsyncObserver(observer, queue_size=1)
+    wrapper.on_stage_timing("busy", 0.0)
+    assert observer.started.wait(5.0)
+    wrapper.on_stage_timing("queued", 0.0)
+
+    started = time.monotonic()
+    assert not wrapper.close(timeout=0.1)
+    assert time.monotonic() - started < 2.0
+    observer.release.set()
+    assert wrapper.flush(timeout=5.0)
+    assert wrapper.close(timeout=5.0)
+    assert observer.events == ["busy", "queued"]
+
+    observer = _BlockingObserver(gated=True)
+    wrapper = AsyncObserver(observer, queue_size=4)
+    for stage in ("busy", "queued"):
+        wrapper.on_stage_timing(stage, 0.0)
+    assert observer.started.wait(5.0)
+    assert not wrapper.close(timeout=0.05)
+    observer.release.set()
+    assert wrapper.close(timeout=5.0)
+    assert observer.events == ["busy", "queued"]
+
+
+def test_async_observer_events_are_delivered_at_exit(tmp_path):
+    import subprocess
+    import sys
+
+    output = tmp_path / "events.txt"
+    code = (
+        "import time\n"
+        "from free_vigilance_reduction.reporting.async_observer import AsyncObserver\n"
+        "class Slow:\n"
+        "    def on_stage_timing(self, stage, duration):\n"
+        "        time.sleep(0.01)\n"
+        f"        open({str(output)!r}, 'a').write(stage + '\\n')\n"
+        "wrapper = AsyncObserver(Slow())\n"
+        "for i in range(20):\n"
+        "    wrapper.on_stage_timing(str(i), 0.0)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+    assert output.read_text().split() == [str(i) for i in range(20)]